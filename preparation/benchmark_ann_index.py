@@ -0,0 +1,99 @@
+"""
+Recall@k vs latency of the approximate index types against the exact flat index.
+
+The catalog is scaled up synthetically: every synthetic series is a noisy copy of a real
+series vector from files/series_index.faiss, so the clusters look like the real catalog.
+Queries are held-out noisy copies as well; ground truth is the flat index top-k.
+
+Usage: python preparation/benchmark_ann_index.py [--n-series 100000] [--n-queries 500] [--top-k 8]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import faiss
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from series_index import SeriesIndex
+
+NOISE = 0.35   # relative noise of the synthetic copies, keeps neighbors distinct but clustered
+
+# search-time settings swept per index type
+SWEEPS = {
+    "flat":  [{}],
+    "hnsw":  [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)],
+    "ivfpq": [{"nprobe": nprobe} for nprobe in (1, 4, 16, 64, 128)],
+}
+
+def synthetic_vectors(base, n, rng):
+    picks = base[rng.integers(0, len(base), size=n)]
+    vectors = picks + NOISE * rng.standard_normal(picks.shape).astype("float32") / np.sqrt(base.shape[1])
+    vectors = vectors.astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def catalog_vectors(index):
+    """stored (or, for ivfpq, decoded) vectors of the current catalog index"""
+    if isinstance(index, faiss.IndexIDMap):
+        return index.index.reconstruct_n(0, index.ntotal)
+    index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+def build(index_type, vectors, **index_params):
+    index = SeriesIndex(vectors.shape[1], index_type=index_type, **index_params)
+    start = time.perf_counter()
+    if not index.index.is_trained:
+        index.index.train(vectors)
+    index.index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+    return index, time.perf_counter() - start
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+def run_benchmark(n_series=100000, n_queries=500, top_k=8, nlist=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    base_vectors = catalog_vectors(SeriesIndex.load().index)
+
+    vectors = synthetic_vectors(base_vectors, n_series, rng)
+    queries = synthetic_vectors(base_vectors, n_queries, rng)
+    print(f"{n_series} series, {n_queries} queries, dimension {vectors.shape[1]}, top-{top_k}")
+
+    flat, _ = build("flat", vectors)
+    _, truth = flat.search(queries, top_k)
+
+    rows = []
+    for index_type, sweep in SWEEPS.items():
+        params = {"nlist": nlist} if index_type == "ivfpq" else {}
+        index, build_time = build(index_type, vectors, **params)
+        size_mb = faiss.serialize_index(index.index).nbytes / 1e6
+        print(f"built {index_type} in {build_time:.1f}s ({size_mb:.1f} MB)")
+
+        for search_params in sweep:
+            index.set_search_params(**search_params)
+            start = time.perf_counter()
+            _, found = index.search(queries, top_k)
+            elapsed = time.perf_counter() - start
+
+            rows.append({
+                "index": index_type,
+                "setting": ", ".join(f"{k}={v}" for k, v in search_params.items()) or "-",
+                f"recall@{top_k}": round(recall_at_k(found, truth), 4),
+                "ms/query": round(1000 * elapsed / n_queries, 4),
+                "index MB": round(size_mb, 1),
+            })
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-series", type=int, default=100000)
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--nlist", type=int, default=1024)
+    args = parser.parse_args()
+
+    run_benchmark(args.n_series, args.n_queries, args.top_k, args.nlist)
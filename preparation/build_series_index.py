@@ -1,63 +1,93 @@
 """
 Run this once to build the FAISS index from output_with_descriptions.json
 """
+import os
+import sys
 import json
+import argparse
 import numpy as np
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from indicator_metadata import indicator_registry
+from embedding_cache import CachedEncoder  # all-MiniLM-L6-v2: lightweight, fast, good quality
+from query_cache import normalize_query
+from few_shot_examples import FEW_SHOT_EXAMPLES
+from series_index import SeriesIndex, INDEX_TYPES, build_text, read_manifest
+from query_router import TRAINING_FILES
 
 INDEX_PATH = "series_index"
-DATA_PATH = "output_with_descriptions.json"
-MODEL_NAME = "all-MiniLM-L6-v2"  # lightweight, fast, good quality
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data")
 
-def build_text(series: dict) -> str:
-    """
-    Combine all fields into a single string for embedding.
-    Richer text = better retrieval.
+def build_index(index_type: str = "flat", **index_params):
     """
-    period_map = {"M": "Monthly", "Q": "Quarterly", "W": "Weekly", "D": "Daily", "A": "Annual"}
-    period = period_map.get(series.get("PERIOD", ""), series.get("PERIOD", ""))
-
-    return (
-        f"{series['SERIES']}: {series['INDICATOR']}. "
-        f"Category: {series['CATEGORY']} - {series['SUB-CATEGORY']}. "
-        f"Unit: {series['UNITS']}. Frequency: {period}. "
-        f"{series.get('description', '')}"
-    )
+    Full rebuild of the index; for catalog edits use preparation/sync_series_index.py,
+    which only re-embeds the series that changed.
 
-def build_index():
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        series_list = json.load(f)
+    Args:
+        index_type: "flat" (exact), "hnsw" or "ivfpq" (approximate, for large catalogs),
+                    see series_index.INDEX_TYPES for the parameters and their defaults
+    """
+    series_list = indicator_registry.as_list()
 
-    print(f"Loaded {len(series_list)} series from {DATA_PATH}")
+    print(f"Loaded {len(series_list)} series from {indicator_registry.path}")
 
-    model = SentenceTransformer(MODEL_NAME)
+    # torch or onnx, both give the same embeddings (see preparation/check_encoder_parity.py);
+    # only texts missing from the embedding cache are encoded, the model is not loaded otherwise
+    model = CachedEncoder()
+    print(f"Encoder backend: {model.name}")
 
     texts = [build_text(s) for s in series_list]
 
     print("Generating embeddings...")
     embeddings = model.encode(texts, show_progress_bar=True, batch_size=32)
     embeddings = np.array(embeddings).astype("float32")
+    print(f"  {model.hits} cached, {model.misses} encoded")
 
-    # normalize for cosine similarity
-    faiss.normalize_L2(embeddings)
-
-    # use IndexFlatIP (inner product) for cosine similarity after normalization
+    # inner product (cosine after normalization) under stable series ids
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)
-    index.add(embeddings)
+    index = SeriesIndex(dimension, backend=model.name, index_type=index_type, **index_params)
+    index.add(series_list, embeddings)
 
-    # save index and metadata
-    faiss.write_index(index, f"files/{INDEX_PATH}.faiss")
-    with open(f"files/{INDEX_PATH}_meta.pkl", "wb") as f:
-        pickle.dump({"series": series_list, "texts": texts}, f)
+    # save index, metadata and manifest
+    index.save()
 
-    print(f"Index built and saved:")
-    print(f"  files/{INDEX_PATH}.faiss")
-    print(f"  files/{INDEX_PATH}_meta.pkl")
+    generation = read_manifest()["generation"]
+    print(f"Index built and saved (generation {generation}):")
+    print(f"  files/{INDEX_PATH}.{generation}.faiss")
+    print(f"  files/{INDEX_PATH}.{generation}_meta.npy, files/{INDEX_PATH}.{generation}_meta.bin")
+    print(f"  files/{INDEX_PATH}_manifest.json")
+    print(f"  Index type: {index.index_type} {index.index_params}")
     print(f"  Embedding dimension: {dimension}")
     print(f"  Total series indexed: {len(series_list)}")
 
+    precompute_question_embeddings(model)
+    model.cache.save()
+
+def precompute_question_embeddings(model: CachedEncoder):
+    """
+    Embed the few-shot, benchmark and query router training questions into the embedding cache,
+    keyed like SeriesRetriever queries (normalized text), so evaluation runs and the router never
+    hit the model for them.
+    """
+    questions = [example["question"] for example in FEW_SHOT_EXAMPLES]
+    for name in ("QA_test.json",) + TRAINING_FILES:
+        with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+            questions += [item["question"] for item in json.load(f) if item.get("question")]
+
+    hits, misses = model.hits, model.misses
+    model.encode([normalize_query(q) for q in questions], batch_size=32)
+    print(f"Question embeddings: {model.hits - hits} cached, {model.misses - misses} encoded")
+
 if __name__ == "__main__":
-    build_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index-type", choices=list(INDEX_TYPES), default="flat")
+    parser.add_argument("--nlist", type=int, help="ivfpq: number of inverted lists")
+    parser.add_argument("--pq-m", type=int, help="ivfpq: sub-quantizers per vector (must divide 384)")
+    parser.add_argument("--nprobe", type=int, help="ivfpq: lists visited per query")
+    parser.add_argument("--hnsw-m", type=int, help="hnsw: graph neighbors per node")
+    parser.add_argument("--ef-search", type=int, help="hnsw: search beam width")
+    args = parser.parse_args()
+
+    # only the parameters of the chosen index type
+    overrides = {k: v for k, v in vars(args).items() if k in INDEX_TYPES[args.index_type] and v is not None}
+    build_index(args.index_type, **overrides)
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Check that the onnx encoder backend can serve the existing series_index.faiss:
+embeds the index texts and the test questions with both backends and compares
+cosine similarity and top-k retrieval overlap. Exits non-zero if parity is below the thresholds.
+
+Usage: python preparation/check_encoder_parity.py [--top-k 8]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from encoders import TorchEncoder, OnnxEncoder
+from series_index import SeriesIndex
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MIN_COSINE = 0.98       # per-text cosine between torch and onnx embeddings
+MIN_TOPK_OVERLAP = 0.9  # mean |top-k torch ∩ top-k onnx| / k over the questions
+
+def load_questions():
+    with open(os.path.join(BASE_DIR, "data/QA_test.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item["question"] for item in data if item.get("question")]
+
+def timed_encode(encoder, texts):
+    start = time.perf_counter()
+    embeddings = encoder.encode(texts, batch_size=32)
+    return embeddings, time.perf_counter() - start
+
+def check_parity(top_k: int = 8):
+    index = SeriesIndex.load()
+    texts = index.texts()
+    questions = load_questions()
+
+    torch_encoder = TorchEncoder()
+    onnx_encoder = OnnxEncoder()
+
+    results = {}
+    for label, batch in (("index texts", texts), ("questions", questions)):
+        torch_emb, torch_time = timed_encode(torch_encoder, batch)
+        onnx_emb, onnx_time = timed_encode(onnx_encoder, batch)
+        cosine = np.sum(torch_emb * onnx_emb, axis=1)
+        results[label] = {"torch": torch_emb, "onnx": onnx_emb}
+
+        print(f"{label} ({len(batch)}):")
+        print(f"  cosine  min {cosine.min():.4f}  mean {cosine.mean():.4f}")
+        print(f"  encode  torch {torch_time:.2f}s  onnx {onnx_time:.2f}s  ({torch_time / max(onnx_time, 1e-9):.1f}x)")
+
+    # the onnx question embeddings must find the same series in the torch-built index
+    _, torch_ids = index.search(results["questions"]["torch"], top_k)
+    _, onnx_ids = index.search(results["questions"]["onnx"], top_k)
+    overlap = np.mean([len(set(t) & set(o)) / top_k for t, o in zip(torch_ids, onnx_ids)])
+    top1 = np.mean(torch_ids[:, 0] == onnx_ids[:, 0])
+    print(f"top-{top_k} overlap {overlap:.4f}, top-1 agreement {top1:.4f}")
+
+    min_cosine = min(float(np.sum(r["torch"] * r["onnx"], axis=1).min()) for r in results.values())
+    passed = min_cosine >= MIN_COSINE and overlap >= MIN_TOPK_OVERLAP
+    print("PASS" if passed else f"FAIL (min cosine >= {MIN_COSINE}, top-{top_k} overlap >= {MIN_TOPK_OVERLAP} required)")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=8)
+    args = parser.parse_args()
+
+    sys.exit(0 if check_parity(args.top_k) else 1)
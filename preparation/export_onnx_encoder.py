@@ -0,0 +1,55 @@
+"""
+Run this once to export all-MiniLM-L6-v2 to an int8-quantized ONNX model for the onnx encoder backend.
+Needs torch, transformers and onnxruntime at export time only; serving just needs onnxruntime and tokenizers.
+
+Afterwards run preparation/check_encoder_parity.py and set FRED_ENCODER_BACKEND=onnx.
+"""
+import os
+import sys
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from encoders import MODEL_NAME, ONNX_MODEL_DIR, ONNX_MODEL_FILE
+
+HF_MODEL = f"sentence-transformers/{MODEL_NAME}"
+
+def export_model(output_dir: str = ONNX_MODEL_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL)
+    model = AutoModel.from_pretrained(HF_MODEL)
+    model.eval()
+
+    # tokenizer.json is all the onnx backend needs to tokenize
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["How is the job market?"], return_tensors="pt")
+    inputs = (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"])
+    dynamic_axes = {name: {0: "batch", 1: "sequence"}
+                    for name in ("input_ids", "attention_mask", "token_type_ids", "last_hidden_state")}
+
+    print(f"Exporting {HF_MODEL} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            inputs,
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    print(f"Quantizing to int8: {int8_path}...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    print("Export done:")
+    print(f"  fp32: {os.path.getsize(fp32_path) / 1e6:.1f} MB")
+    print(f"  int8: {os.path.getsize(int8_path) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    export_model()
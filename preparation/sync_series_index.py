@@ -0,0 +1,58 @@
+"""
+Sync the FAISS index with output_with_descriptions.json: embeds added series and series whose
+text changed, drops removed ones and leaves the rest alone. Running agents pick up the new
+index on their next retrieval. A different encoder backend, or a different index type or
+build parameters given on the command line, rebuild the whole index instead.
+
+Usage: python preparation/sync_series_index.py [--dry-run] [--index-type ivfpq --nlist 256 ...]
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from indicator_metadata import indicator_registry
+from embedding_cache import CachedEncoder
+from series_index import SeriesIndex, INDEX_TYPES
+
+def sync_index(dry_run: bool = False, index_type: str = None, **index_params):
+    series_list = indicator_registry.as_list()
+    print(f"Loaded {len(series_list)} series from {indicator_registry.path}")
+
+    index = SeriesIndex.load()
+    print(f"Index holds {len(index)} series (model: {index.model}, backend: {index.backend})")
+
+    # only the parameters of the target index type
+    index_params = {k: v for k, v in index_params.items() if k in INDEX_TYPES[index_type or index.index_type]}
+    model = CachedEncoder()
+    changes = index.sync(series_list, model, dry_run=dry_run, index_type=index_type, **index_params)
+    if changes["rebuild"]:
+        print(f"  rebuild: backend {model.name}, {index_type or index.index_type} index")
+
+    for kind in ("added", "updated", "removed"):
+        print(f"  {kind}: {len(changes[kind])} {', '.join(changes[kind])}")
+    print(f"  unchanged: {len(changes['unchanged'])}")
+
+    if dry_run:
+        print("Dry run, index not written")
+        return changes
+
+    index.save()
+    model.cache.save()
+    print(f"Index synced: {len(index)} series, {model.misses} texts encoded")
+    return changes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--index-type", choices=list(INDEX_TYPES), help="switch the index type (full rebuild)")
+    parser.add_argument("--nlist", type=int, help="ivfpq: number of inverted lists")
+    parser.add_argument("--pq-m", type=int, help="ivfpq: sub-quantizers per vector (must divide 384)")
+    parser.add_argument("--nprobe", type=int, help="ivfpq: lists visited per query")
+    parser.add_argument("--hnsw-m", type=int, help="hnsw: graph neighbors per node")
+    parser.add_argument("--ef-search", type=int, help="hnsw: search beam width")
+    args = parser.parse_args()
+
+    overrides = {k: v for k, v in vars(args).items()
+                 if k not in ("dry_run", "index_type") and v is not None}
+    sync_index(args.dry_run, args.index_type, **overrides)
@@ -0,0 +1,157 @@
+import math
+import re
+
+"""
+Deterministic Check C: scans the final answer for every fetched series before the LLM
+verifier is asked.
+
+A series counts as discussed when a sentence of the answer names it (series ID or indicator
+name) and quotes one of its key numbers (latest value, extremes, total change), and as
+missing when neither appears anywhere. Every series needs a number of its own: one number
+quoted for several series in the same sentence covers only one of them. Anything in between
+(named without a number, a number without the name) is uncertain, and only then does the
+agent fall back to validate_final_answer_completeness. A series that is certainly missing is
+enough to call the answer incomplete.
+
+The scan only judges data coverage, so it leaves "question_addressed" to the LLM (None).
+"""
+
+NAME_WORD_SHARE = 0.6   # share of the indicator name words that must appear in the answer
+SIGNIFICANT_DIGITS = 2  # a quote matches when it agrees with the value to this many digits
+# answers quote billions as trillions, thousands as millions etc.
+SCALES = (1, 1e-3, 1e3)
+
+STOPWORDS = {"for", "and", "the", "all", "of", "in", "on", "to", "by", "with", "from", "rate", "total", "u.s."}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_YEAR = re.compile(r"(19|20)\d{2}")
+# sentence and clause ends; a period between digits is a decimal point
+_SENTENCE_END = re.compile(r"(?<!\d)[.!?;](?!\d)|\.(?=\s)|\n")
+
+
+def sentences(text):
+    """sentences and ;-separated clauses of `text`"""
+    return [s for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def answer_numbers(text):
+    """numbers quoted in `text`, thousands separators removed and years skipped"""
+    tokens = _NUMBER.findall(re.sub(r"(\d),(\d)", r"\1\2", text))
+    return [float(n) for n in tokens if not _YEAR.fullmatch(n)]
+
+
+def key_numbers(analysis):
+    """headline numbers of a call_fred_api analysis, detailed or compact summary"""
+    values = []
+    if "overview" in analysis:
+        values.append(analysis["overview"]["latest_value"]["value"])
+        stats = analysis.get("key_statistics", {})
+        values += [stats.get("all_time_high", {}).get("value"), stats.get("all_time_low", {}).get("value")]
+        values.append(analysis.get("trend_analysis", {}).get("total_change", {}).get("percentage"))
+    else:
+        values.append(analysis.get("current", {}).get("value"))
+        extremes = analysis.get("extremes", {})
+        values += [extremes.get("max", {}).get("value"), extremes.get("min", {}).get("value")]
+        values.append(analysis.get("total_change_pct"))
+    return [float(v) for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def quotes(expected, number):
+    """`number` is `expected` rounded to SIGNIFICANT_DIGITS or more, possibly in another unit scale"""
+    for scale in SCALES:
+        target = expected * scale
+        if target:
+            tolerance = 0.5 * 10 ** (math.floor(math.log10(abs(target))) - SIGNIFICANT_DIGITS + 1)
+            if abs(number - target) <= tolerance:
+                return True
+    return False
+
+
+def quotes_any(expected_values, numbers):
+    """one of `expected_values` appears among `numbers`"""
+    return any(quotes(expected, n) for expected in expected_values for n in numbers)
+
+
+def _assign(candidates):
+    """
+    give every series a distinct number (bipartite matching by augmenting paths)
+
+    Args:
+        candidates: series -> list of number occurrences quoting it
+    Returns:
+        the series that got a number of their own
+    """
+    owner = {}
+
+    def claim(series, seen):
+        for occurrence in candidates[series]:
+            if occurrence in seen:
+                continue
+            seen.add(occurrence)
+            if occurrence not in owner or claim(owner[occurrence], seen):
+                owner[occurrence] = series
+                return True
+        return False
+
+    return {series for series in candidates if claim(series, set())}
+
+
+def _name_words(name):
+    head = re.split(r"[:,(]", name)[0].lower()
+    return [w for w in re.findall(r"[a-z0-9.]+", head) if len(w) > 2 and w not in STOPWORDS]
+
+
+def is_named(result, text):
+    """answer mentions the series ID or most words of the indicator name"""
+    lowered = text.lower()
+    if re.search(rf"\b{re.escape(result['series_id'].lower())}\b", lowered):
+        return True
+    words = _name_words(result.get("indicator_name") or "")
+    if not words:
+        return False
+    present = sum(1 for w in words if re.search(rf"\b{re.escape(w)}", lowered))
+    return present / len(words) >= NAME_WORD_SHARE
+
+
+def check_completeness(final_answer, api_results):
+    """
+    Args:
+        final_answer: generated answer
+        api_results: call_fred_api results the answer was generated from
+
+    Returns:
+        the validate_final_answer_completeness dict
+        {"complete", "missing_series", "question_addressed": None, "gap"} when the scan is conclusive,
+        None when the LLM verifier should decide
+    """
+    parts = sentences(final_answer)
+    part_numbers = [answer_numbers(part) for part in parts]
+    all_numbers = [n for numbers in part_numbers for n in numbers]
+    candidates, missing = {}, []
+
+    for result in api_results:
+        if not result.get("success"):
+            continue
+        expected = key_numbers(result.get("analysis") or {})
+        # numbers only count for a series in the sentences that name it
+        candidates[result["series_id"]] = [
+            (i, j) for i, part in enumerate(parts) if is_named(result, part)
+            for j, n in enumerate(part_numbers[i]) if any(quotes(e, n) for e in expected)
+        ]
+        if not is_named(result, final_answer) and not quotes_any(expected, all_numbers):
+            missing.append(result["series_id"])
+
+    quoted = _assign(candidates)
+    uncertain = [series for series in candidates if series not in quoted and series not in missing]
+
+    if missing:
+        return {
+            "complete": False,
+            "missing_series": missing,
+            "question_addressed": None,
+            "gap": ""
+        }
+    if uncertain:
+        return None
+    # every series is discussed with a number of its own; whether that answers the question is for the LLM
+    return {"complete": True, "missing_series": [], "question_addressed": None, "gap": ""}
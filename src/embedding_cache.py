@@ -0,0 +1,123 @@
+import os
+import pickle
+import hashlib
+import threading
+import numpy as np
+from encoders import MODEL_NAME, get_encoder, resolve_backend
+
+"""
+Content-hashed embedding cache shared by index building, retrieval and evaluation.
+
+Vectors are keyed by sha256(model, backend, text), so an unchanged series description or
+question is never re-encoded, and a changed one simply misses. CachedEncoder wraps an
+encoder backend behind the cache and only loads the model when something actually misses.
+The cache is unbounded, so only the offline builders (series texts, benchmark and training
+questions) add to it; live query paths read it with store=False and keep new user queries
+in the bounded QueryCache.
+"""
+
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../files/embedding_cache.pkl")
+
+
+def text_hash(text: str, namespace: str) -> str:
+    return hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        """
+        Args:
+            path: pickle file holding {text hash: float32 vector}, None keeps the cache in memory
+        """
+        self.path = path
+        self.vectors = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.vectors = pickle.load(f)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def get_many(self, keys):
+        """cached vector or None for every key"""
+        with self._lock:
+            return [self.vectors.get(key) for key in keys]
+
+    def put_many(self, keys, vectors):
+        with self._lock:
+            for key, vec in zip(keys, vectors):
+                self.vectors[key] = np.asarray(vec, dtype="float32")
+            self.dirty = True
+
+    def save(self):
+        """write the cache to `path` if anything was added since loading"""
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            vectors = dict(self.vectors)
+            self.dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(vectors, f)
+        os.replace(tmp_path, self.path)
+
+
+class CachedEncoder:
+    """
+    Drop-in for an encoder backend (same `encode` contract) that consults an EmbeddingCache first.
+    """
+    def __init__(self, cache=None, backend=None, encoder=None, store=True):
+        """
+        Args:
+            cache: EmbeddingCache, the shared on-disk cache by default
+            backend: encoder backend, see encoders.get_encoder
+            encoder: already loaded encoder, otherwise one is loaded on the first cache miss
+            store: add newly encoded texts to the cache, False only reads it
+        """
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.store = store
+        self.name = encoder.name if encoder is not None else resolve_backend(backend)
+        self.namespace = f"{MODEL_NAME}/{self.name}"
+        self._encoder = encoder
+        self._encoder_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            with self._encoder_lock:
+                if self._encoder is None:
+                    self._encoder = get_encoder(self.name)
+        return self._encoder
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        """
+        Returns:
+            float32 array of shape (len(texts), dim); only texts missing from the cache hit the model
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        keys = [text_hash(t, self.namespace) for t in texts]
+        vectors = self.cache.get_many(keys)
+
+        # distinct texts that need the model, in first-seen order
+        missing = {}
+        for key, text, vec in zip(keys, texts, vectors):
+            if vec is None:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            encoded = self.encoder.encode(list(missing.values()), batch_size=batch_size, **kwargs)
+            if self.store:
+                self.cache.put_many(missing.keys(), encoded)
+            fresh = dict(zip(missing.keys(), encoded))
+            vectors = [fresh[key] if vec is None else vec for key, vec in zip(keys, vectors)]
+
+        return np.stack(vectors).astype("float32")
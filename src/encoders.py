@@ -0,0 +1,130 @@
+import os
+import numpy as np
+
+"""
+Pluggable sentence encoders for series retrieval.
+
+Both backends produce L2-normalized, mean-pooled all-MiniLM-L6-v2 embeddings, so an
+index built with one can be searched with the other:
+    torch: SentenceTransformer (default)
+    onnx:  ONNX Runtime on an int8-quantized export, no torch needed at serving time
+           (export it with preparation/export_onnx_encoder.py)
+
+The backend is chosen with the FRED_ENCODER_BACKEND environment variable.
+"""
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+MAX_SEQ_LENGTH = 256   # SentenceTransformer's max_seq_length for all-MiniLM-L6-v2
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODEL_DIR = os.path.join(_BASE_DIR, f"../files/onnx/{MODEL_NAME}-int8")
+ONNX_MODEL_FILE = "model_quantized.onnx"
+
+BACKEND_ENV = "FRED_ENCODER_BACKEND"
+DEFAULT_BACKEND = "torch"
+
+
+def _l2_normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class TorchEncoder:
+    name = "torch"
+
+    def __init__(self, model_name=MODEL_NAME):
+        # imported here so the onnx backend never pulls in torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        """
+        Returns:
+            float32 array of shape (len(texts), dim), L2-normalized
+        """
+        embeddings = self.model.encode(texts, batch_size=batch_size, **kwargs)
+        return _l2_normalize(np.asarray(embeddings, dtype="float32")).astype("float32")
+
+
+class OnnxEncoder:
+    name = "onnx"
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, model_file=ONNX_MODEL_FILE, num_threads=None):
+        """
+        Args:
+            model_dir: directory holding the exported model and tokenizer.json
+            model_file: onnx file inside model_dir
+            num_threads: intra-op threads for onnxruntime, None lets it decide
+        """
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx encoder backend needs `onnxruntime` and `tokenizers` "
+                "(pip install onnxruntime tokenizers)"
+            ) from e
+
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found, run `python preparation/export_onnx_encoder.py` first"
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype="int64")
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # mean pooling over real tokens, as in the SentenceTransformer pooling layer
+        mask = attention_mask[:, :, None].astype("float32")
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.maximum(mask.sum(axis=1), 1e-9)
+        return summed / counts
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        """
+        Same contract as TorchEncoder.encode; extra SentenceTransformer kwargs
+        (e.g. show_progress_bar) are accepted and ignored.
+
+        Returns:
+            float32 array of shape (len(texts), dim), L2-normalized
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        batches = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return _l2_normalize(np.concatenate(batches)).astype("float32")
+
+
+def resolve_backend(backend=None):
+    """backend name for `backend`, defaulting to $FRED_ENCODER_BACKEND or torch"""
+    return (backend or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).lower()
+
+
+def get_encoder(backend=None):
+    """
+    Encoder for `backend` ("torch" or "onnx"), defaulting to $FRED_ENCODER_BACKEND or torch.
+    """
+    backend = resolve_backend(backend)
+    if backend == "torch":
+        return TorchEncoder()
+    if backend == "onnx":
+        return OnnxEncoder()
+    raise ValueError(f"Unknown encoder backend '{backend}', expected 'torch' or 'onnx'")
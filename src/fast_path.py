@@ -0,0 +1,94 @@
+import re
+import json
+
+"""
+Deterministic fast path for simple single-series questions.
+
+When the question names one series (or retrieval clearly prefers one) and the date parser
+resolved an explicit range, the tool call is emitted directly instead of asking the LLM to
+produce it; the LLM is only used for the final summary. Anything that looks like a
+comparison, or where retrieval or dates are not decisive, goes through the LLM as before.
+"""
+
+TOOL_NAME = "get_fred_data"
+
+# thresholds on the dense similarity of the best hit and its lead over the runner-up
+MIN_SIMILARITY = 0.55
+MIN_MARGIN = 0.1
+
+# multi-series or analytical phrasing, left to the LLM
+MULTI_SERIES_PATTERN = re.compile(
+    r"\b(?:and|or|vs|versus|compare[ds]?|comparison|relationship|between|correlat\w*|"
+    r"impact\w*|affect\w*|effects?|both|why)\b|[,;&/]"
+)
+
+
+def plan_direct_tool_call(question, context, date_range, valid_series,
+                          min_similarity=MIN_SIMILARITY, min_margin=MIN_MARGIN):
+    """
+    Decide whether `question` can skip LLM tool extraction.
+
+    Args:
+        context: RetrievalContext of the question
+        date_range: (start_date, end_date) from parse_date_range
+        valid_series: container of known series IDs
+
+    Returns:
+        dict with {series_id, start_date, end_date, reason}, or None when the LLM should decide
+    """
+    start_date, end_date = date_range
+    if not start_date or not end_date or not context.results:
+        return None
+    if MULTI_SERIES_PATTERN.search(question.lower()):
+        return None
+
+    exact = [r for r in context.results if r.get("match") == "exact"]
+    if len(exact) > 1:
+        return None
+    if exact:
+        best = exact[0]
+        reason = "series ID named in the question"
+    else:
+        ranked = sorted(context.results, key=lambda r: r["similarity"], reverse=True)
+        best = ranked[0]
+        runner_up = ranked[1]["similarity"] if len(ranked) > 1 else 0.0
+        margin = best["similarity"] - runner_up
+        if best["similarity"] < min_similarity or margin < min_margin:
+            return None
+        reason = f"similarity {best['similarity']:.3f}, margin {margin:.3f}"
+
+    if best["SERIES"] not in valid_series:
+        return None
+
+    return {
+        "series_id": best["SERIES"],
+        "start_date": start_date,
+        "end_date": end_date,
+        "reason": reason,
+    }
+
+
+def _arguments(call):
+    return {"series_id": call["series_id"], "start_date": call["start_date"], "end_date": call["end_date"]}
+
+
+def ollama_tool_message(call, tool_call_id):
+    """assistant message carrying `call`, as Ollama returns it"""
+    return {
+        "role": "assistant",
+        "content": "",
+        "tool_calls": [{"id": tool_call_id, "function": {"name": TOOL_NAME, "arguments": _arguments(call)}}],
+    }
+
+
+def openai_tool_message(call, tool_call_id):
+    """assistant message carrying `call`, in OpenAI chat format"""
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": tool_call_id,
+            "type": "function",
+            "function": {"name": TOOL_NAME, "arguments": json.dumps(_arguments(call))},
+        }],
+    }
@@ -1,11 +1,16 @@
 from fred_key import fred_key
-import requests
+from http_client import fred_client, async_fred_client
+import asyncio
 import pandas as pd
 import json
 from datetime import datetime, timedelta
-from metrics_computing import TimeSeriesAnalyzer
+from metrics_computing import TimeSeriesAnalyzer, IncrementalTimeSeriesAnalyzer
+from observation_store import ObservationStore
+from indicator_metadata import indicator_registry
 import os
 import sys
+import threading
+from collections import OrderedDict
 #import matplotlib.pyplot as plt
 
 # observations
@@ -19,34 +24,148 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 # add the current directory to Python's path so that imports like `from fred_key import fred_key` can locate modules in the same directory
 sys.path.insert(0, base_dir)
 
+# local on-disk store of fetched observations, shared by all calls in the process
+observation_store = ObservationStore()
+
+# incremental analyzer state per (series_id, frequency, start date), least recently used first
+MAX_INCREMENTAL_STATES = 256
+_incremental_states = OrderedDict()
+_incremental_lock = threading.Lock()
+
+# shorter series only get the compact summary
+DETAILED_MIN_OBSERVATIONS = 180
+
+class _HeldSeries:
+    """incremental state of one requested range and the valid observations it consumed"""
+    def __init__(self):
+        self.analyzer = IncrementalTimeSeriesAnalyzer()
+        self.observations = []
+        self.revision = None    # observation store revision they were read at, None if fetched directly
+
+def compact_summary(series_id, frequency, start_date, observations, revision=None):
+    """
+    compact analysis of `observations`, reusing the running statistics of an earlier call
+    so only observations appended since then are processed
+
+    Args:
+        revision: observation store revision `observations` were read at; while it is unchanged
+                  the consumed observations are known to be unchanged, otherwise they are hashed
+
+    Returns:
+        dict: same as TimeSeriesAnalyzer.generate_summary(compact_mode=True)
+    """
+    key = (series_id, frequency, start_date)
+    with _incremental_lock:
+        state = _incremental_states.pop(key, None)
+        if state is not None:
+            consumed = state.analyzer.raw_count
+            unrevised = (revision is not None and revision == state.revision and len(observations) >= consumed
+                         and observations[consumed - 1]["date"] == state.analyzer.last_raw_date)
+            if not unrevised and not state.analyzer.can_extend(observations):
+                state = None
+        if state is None:
+            state = _HeldSeries()
+        state.analyzer.extend(observations)
+        state.observations, state.revision = observations, revision
+
+        _incremental_states[key] = state
+        if len(_incremental_states) > MAX_INCREMENTAL_STATES:
+            _incremental_states.popitem(last=False)
+
+        return state.analyzer.generate_compact_summary()
+
+def _held_prefix(series_id, frequency, start_date, end_date):
+    """
+    Returns:
+        (observations, revision) an incremental state consumed from the store for this range,
+        (None, None) if there is none to extend
+    """
+    with _incremental_lock:
+        state = _incremental_states.get((series_id, frequency, start_date))
+        if state is None or state.revision is None or not state.observations:
+            return None, None
+        if state.observations[-1]["date"] > end_date:
+            return None, None
+        return state.observations, state.revision
+
+def _valid_observations(observations):
+    # filter out value == "."
+    return [o for o in observations if o.get("value", ".") != "."]
+
+def _store_observations(series_id, start_date, end_date, frequency):
+    """
+    observations from the local store; when an incremental state holds the start of the range
+    and the store has not revised it, only the observations after it are read
+
+    Returns:
+        (valid observations, store revision, error)
+    """
+    fetch = lambda gap_start, gap_end: fetch_observations(series_id, gap_start, gap_end, frequency)
+    prefix, held_revision = _held_prefix(series_id, frequency, start_date, end_date)
+    if prefix is not None:
+        tail, revision, error = observation_store.get_held(
+            series_id, start_date, end_date, fetch, frequency, after=prefix[-1]["date"]
+        )
+        if error is not None:
+            return None, None, error
+        if revision == held_revision:
+            return prefix + _valid_observations(tail), revision, None
+
+    observations, revision, error = observation_store.get_held(series_id, start_date, end_date, fetch, frequency)
+    if error is not None:
+        return None, None, error
+    return _valid_observations(observations), revision, None
+
+async def _astore_observations(series_id, start_date, end_date, frequency):
+    """_store_observations on the async client"""
+    fetch = lambda gap_start, gap_end: afetch_observations(series_id, gap_start, gap_end, frequency)
+    prefix, held_revision = _held_prefix(series_id, frequency, start_date, end_date)
+    if prefix is not None:
+        tail, revision, error = await observation_store.aget_held(
+            series_id, start_date, end_date, fetch, frequency, after=prefix[-1]["date"]
+        )
+        if error is not None:
+            return None, None, error
+        if revision == held_revision:
+            return prefix + _valid_observations(tail), revision, None
+
+    observations, revision, error = await observation_store.aget_held(series_id, start_date, end_date, fetch, frequency)
+    if error is not None:
+        return None, None, error
+    return _valid_observations(observations), revision, None
+
+def _detailed_summary(observations, frequency):
+    analyzer = TimeSeriesAnalyzer(observations, frequency=frequency)
+    return analyzer.generate_summary(
+        include_full_timeseries=False,
+        include_inflections=True,
+        compact_mode=False
+    )
+
+def detailed_analysis(result):
+    """
+    detailed analysis of a call_fred_api(..., compact_mode=True) result, from its raw observations
+    (the prompt budget asks for it only for series it keeps at the detailed level)
+
+    Returns:
+        dict, None when call_fred_api would have returned the compact summary anyway
+    """
+    observations = result.get("raw_observations")
+    if not result.get("success") or "analysis" not in result or len(observations) < DETAILED_MIN_OBSERVATIONS:
+        return None
+    indicator = indicator_registry.get(result["series_id"])
+    frequency = indicator["PERIOD"].lower() if indicator is not None else None
+    try:
+        return _detailed_summary(observations, frequency)
+    except Exception as e:
+        print(f"Warning: Analysis failed: {e}")
+        return None
+
 def load_indicator_metadata():
-    with open(os.path.join(base_dir, "output_with_descriptions.json"), "r", encoding="utf-8") as f:
-        indicators = json.load(f)
-    return {item["SERIES"]: item for item in indicators}
-
-def call_fred_api(series_id, start_date, end_date, compact_mode=False):
-    """call FRED API to get data"""
-    indicators_map = load_indicator_metadata()
-    indicator_name = None
-    frequency = None
-    units = None 
-    
-    if series_id in indicators_map:
-        frequency = indicators_map[series_id]["PERIOD"].lower()
-        indicator_name = indicators_map[series_id]["INDICATOR"]
-        units = indicators_map[series_id]["UNITS"]
-        description = indicators_map[series_id]['description']
-    
-    # make sure time range is greater than freq unit
-    if frequency:
-        freq_mapping = {'a': 365, 'q': 90, 'm': 30, 'w': 7, 'd': 1}
-        date_delta = timedelta(days=freq_mapping[frequency])
-        temp = date_delta - (datetime.strptime(start_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d"))
-        if datetime.strptime(start_date, "%Y-%m-%d") > datetime.strptime(end_date, "%Y-%m-%d") - date_delta:
-            start_date = (datetime.strptime(start_date, "%Y-%m-%d") - temp / 2).strftime("%Y-%m-%d")
-            end_date = (datetime.strptime(end_date, "%Y-%m-%d") + temp / 2).strftime("%Y-%m-%d")
-            print(f'Frequency check: shift start date to {start_date}, end date to {end_date}')
+    """series_id -> indicator dict, served from the shared registry (parsed once per file change)"""
+    return indicator_registry.as_map()
 
+def _observation_params(series_id, start_date, end_date, frequency):
     params = {
         "series_id":         series_id,
         "api_key":           fred_key,
@@ -56,16 +175,65 @@ def call_fred_api(series_id, start_date, end_date, compact_mode=False):
     }
     if frequency:
         params["frequency"] = frequency
+    return params
+
+def _parse_observations(series_id, response):
+    if response.status_code != 200:
+        return None, f"Failed to fetch {series_id}: Status {response.status_code}, Response: {response.text}"
+
+    observations = response.json().get("observations", [])
+    return [{"date": o["date"], "value": o["value"]} for o in observations], None
+
+def fetch_observations(series_id, start_date, end_date, frequency=None):
+    """
+    request observations from FRED for a single date range
+
+    Returns:
+        (observations, error): list of FRED observation dicts, or None with an error message
+    """
+    params = _observation_params(series_id, start_date, end_date, frequency)
+    response = fred_client.get(base_url + obs_endpoint, params=params)
+    return _parse_observations(series_id, response)
+
+async def afetch_observations(series_id, start_date, end_date, frequency=None):
+    """fetch_observations on the async client"""
+    params = _observation_params(series_id, start_date, end_date, frequency)
+    response = await async_fred_client.get(base_url + obs_endpoint, params=params)
+    return _parse_observations(series_id, response)
+
+def _resolve_request(series_id, start_date, end_date):
+    """
+    Returns:
+        (indicator fields, start_date, end_date, frequency), the range widened to at least one period
+    """
+    indicator = indicator_registry.get(series_id)
+    fields = {"indicator_name": None, "description": None, "units": None}
+    frequency = None
     
-    response = requests.get(base_url + obs_endpoint, params=params)
+    if indicator is not None:
+        frequency = indicator["PERIOD"].lower()
+        fields = {
+            "indicator_name": indicator["INDICATOR"],
+            "description": indicator['description'],
+            "units": indicator["UNITS"],
+        }
     
-    if response.status_code == 200:
-        data = response.json()
-        observations = data.get("observations", [])
+    # make sure time range is greater than freq unit
+    if frequency:
+        freq_mapping = {'a': 365, 'q': 90, 'm': 30, 'w': 7, 'd': 1}
+        date_delta = timedelta(days=freq_mapping[frequency])
+        temp = date_delta - (datetime.strptime(start_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d"))
+        if datetime.strptime(start_date, "%Y-%m-%d") > datetime.strptime(end_date, "%Y-%m-%d") - date_delta:
+            start_date = (datetime.strptime(start_date, "%Y-%m-%d") - temp / 2).strftime("%Y-%m-%d")
+            end_date = (datetime.strptime(end_date, "%Y-%m-%d") + temp / 2).strftime("%Y-%m-%d")
+            print(f'Frequency check: shift start date to {start_date}, end date to {end_date}')
 
-        # filter out value == "."
-        observations = [o for o in observations if o.get("value", ".") != "."]
+    return fields, start_date, end_date, frequency
 
+def _build_result(series_id, fields, start_date, end_date, frequency, observations, error, compact_mode,
+                  revision=None):
+    """analyze fetched valid observations (see _valid_observations) into the call_fred_api result"""
+    if error is None:
         if not observations:
             return {
                 "success": False,
@@ -74,33 +242,16 @@ def call_fred_api(series_id, start_date, end_date, compact_mode=False):
             }
 
         try:
-            analyzer = TimeSeriesAnalyzer(observations)
-
-            if len(observations) < 5:
-                summary = analyzer.generate_summary(
-                    include_full_timeseries=False,
-                    include_inflections=False,
-                    compact_mode=True
-                )
-            elif compact_mode or len(observations) < 180:
-                summary = analyzer.generate_summary(
-                    include_full_timeseries=False,
-                    include_inflections=True,
-                    compact_mode=True,
-                )
+            # short series and compact mode only need the compact summary, served from running statistics
+            if compact_mode or len(observations) < DETAILED_MIN_OBSERVATIONS:
+                summary = compact_summary(series_id, frequency, start_date, observations, revision)
             else:
-                summary = analyzer.generate_summary(
-                    include_full_timeseries=False,
-                    include_inflections=True,
-                    compact_mode=False
-                )
+                summary = _detailed_summary(observations, frequency)
 
             return {
                 "success": True,
                 "series_id": series_id,
-                "indicator_name": indicator_name,
-                "description": description,
-                "units": units,
+                **fields,
                 "analysis": summary,
                 "raw_observations": observations,   # always keep the original data available for use in charts
             }
@@ -110,9 +261,7 @@ def call_fred_api(series_id, start_date, end_date, compact_mode=False):
             return {
                 "success": True,
                 "series_id": series_id,
-                "indicator_name": indicator_name,
-                "description": description,
-                "units": units,
+                **fields,
                 "data": observations,
                 "raw_observations": observations,   # ← 同上
             }
@@ -120,9 +269,109 @@ def call_fred_api(series_id, start_date, end_date, compact_mode=False):
     return {
         "success": False,
         "series_id": series_id,
-        "error": f"Failed to fetch {series_id}: Status {response.status_code}, Response: {response.text}"
+        "error": error
     }
 
+def call_fred_api(series_id, start_date, end_date, compact_mode=False, use_cache=True):
+    """
+    call FRED API to get data
+
+    Args:
+        use_cache: serve already held date ranges from the local observation store
+                   and only fetch the missing head/tail gaps from FRED
+    """
+    fields, start_date, end_date, frequency = _resolve_request(series_id, start_date, end_date)
+
+    revision = None
+    if use_cache:
+        observations, revision, error = _store_observations(series_id, start_date, end_date, frequency)
+    else:
+        observations, error = fetch_observations(series_id, start_date, end_date, frequency)
+        if error is None:
+            observations = _valid_observations(observations)
+
+    return _build_result(series_id, fields, start_date, end_date, frequency, observations, error, compact_mode,
+                         revision)
+
+async def acall_fred_api(series_id, start_date, end_date, compact_mode=False, use_cache=True):
+    """
+    call_fred_api for asyncio: FRED requests go through the async client, the local store
+    and the analysis run in worker threads so the event loop is never blocked
+    """
+    fields, start_date, end_date, frequency = _resolve_request(series_id, start_date, end_date)
+
+    revision = None
+    if use_cache:
+        observations, revision, error = await _astore_observations(series_id, start_date, end_date, frequency)
+    else:
+        observations, error = await afetch_observations(series_id, start_date, end_date, frequency)
+        if error is None:
+            observations = _valid_observations(observations)
+
+    return await asyncio.to_thread(
+        _build_result, series_id, fields, start_date, end_date, frequency, observations, error, compact_mode,
+        revision
+    )
+
+def call_fred_api_with_fallback(series_id, start_date, end_date, max_retries=1, compact_mode=False):
+    """
+    call FRED API, fall back if fail
+    
+    strategy:
+    1. try with original dates
+    2. if no data returns, push start_date 1 year earlier 
+    
+    Args:
+        series_id: FRED series ID
+        start_date
+        end_date
+        max_retries
+    
+    Returns:
+        dict: API results
+    """
+    
+    for attempt in range(max_retries):
+        result = call_fred_api(series_id, start_date, end_date, compact_mode=compact_mode)
+        
+        if result["success"] and result.get("data"):
+            if attempt > 0:
+                print(f"  Retry {attempt} succeeded with date range: {start_date} to {end_date}")
+            return result
+        
+        # fall back
+        if attempt < max_retries - 1:
+            try:
+                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+                start_dt = start_dt - timedelta(days=365)
+                start_date = start_dt.strftime("%Y-%m-%d")
+                print(f"  No data found, retrying with start_date: {start_date}")
+            except:
+                break
+    
+    return result
+
+async def acall_fred_api_with_fallback(series_id, start_date, end_date, max_retries=1, compact_mode=False):
+    """call_fred_api_with_fallback on the async FRED client"""
+    for attempt in range(max_retries):
+        result = await acall_fred_api(series_id, start_date, end_date, compact_mode=compact_mode)
+        
+        if result["success"] and result.get("data"):
+            if attempt > 0:
+                print(f"  Retry {attempt} succeeded with date range: {start_date} to {end_date}")
+            return result
+        
+        # fall back
+        if attempt < max_retries - 1:
+            try:
+                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+                start_dt = start_dt - timedelta(days=365)
+                start_date = start_dt.strftime("%Y-%m-%d")
+                print(f"  No data found, retrying with start_date: {start_date}")
+            except:
+                break
+    
+    return result
 
 if __name__ == "__main__":
     # INDICATORS_MAP = load_indicator_metadata()
@@ -1,24 +1,50 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from gpt_key import gpt_key
-from fred_api import load_indicator_metadata, call_fred_api
-from series_retriever import SeriesRetriever
+from fred_api import (load_indicator_metadata, call_fred_api, acall_fred_api, call_fred_api_with_fallback,
+                      acall_fred_api_with_fallback, detailed_analysis)
+from series_retriever import shared_retriever
+from indicator_metadata import indicator_registry
 from llama_api import (
     TOOLS,
-    fix_date_parameters,
-    call_fred_api_with_fallback
+    fix_date_parameters
 )
-from llama_api_semantic_retriever import GUIDE_SUFFIX, build_indicator_guide
+from llama_api_semantic_retriever import GUIDE_SUFFIX
 from date_parser import parse_date_range
+from fast_path import plan_direct_tool_call, openai_tool_message
+from prefetch import Prefetch, prefetch_candidates, PREFETCH_SERIES
+from completeness import check_completeness
+from prompt_budget import PROMPT_BUDGET, fit_prompt, get_token_counter
+from wire_format import format_tool_result, DEFAULT_WIRE_FORMAT
+from query_router import get_router, direct_answer_messages, ROUTE_DIRECT, ROUTE_FULL
+from streaming import (event, collect_result, acollect_result, Step, GENERATE, run_pipeline, arun_pipeline,
+                       iter_openai_chunks, aiter_openai_chunks)
 import json
 from datetime import datetime, timedelta
 import time
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 import re
 
 client = OpenAI(api_key=gpt_key)
 MODEL = "gpt-4o-mini"
 
-retriever = SeriesRetriever()
-VALID_SERIES = retriever.get_all_series_ids()
+_async_client = None
+_async_client_lock = threading.Lock()
+
+def get_async_client():
+    """AsyncOpenAI client of aprocess_question / astream_question, created on first use"""
+    global _async_client
+    if _async_client is None:
+        with _async_client_lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(api_key=gpt_key)
+    return _async_client
+
+# loaded on first use and shared with the other agents
+retriever = shared_retriever
+# shared registry, supports `in` and follows metadata file changes
+VALID_SERIES = indicator_registry
 
 def convert_tools_to_openai_format(tools):
     """convert Ollama tool format to OpenAI tool format"""
@@ -116,10 +142,22 @@ def is_relative_date(value: str) -> bool:
     return resolve_relative_date(value) is not None
 
 class OpenAIFredAgent:
-    def __init__(self, model=MODEL, verbose=True, top_k=5):
+    def __init__(self, model=MODEL, verbose=True, top_k=5, max_workers=4, fast_path=True, route=False, router=None,
+                 prefetch=PREFETCH_SERIES, heuristic_check=True, prompt_budget=PROMPT_BUDGET,
+                 wire_format=DEFAULT_WIRE_FORMAT):
         self.model = model
         self.verbose = verbose
         self.top_k = top_k
+        self.max_workers = max_workers  # concurrent FRED fetches per question, 1 runs tool calls sequentially
+        self.fast_path = fast_path  # emit the tool call without the LLM for simple single-series questions
+        # pick direct answer / single series / full pipeline per question, see query_router.py; off until
+        # tests/query_router_evaluation.py has measured it with the real encoder, a wrong "direct" loses the data
+        self.route = route
+        self.router = router  # QueryRouter to use, the shared one trained on data/QA*.json by default
+        self.prefetch = prefetch  # top series fetched while the LLM extracts tool calls, 0 disables, see prefetch.py
+        self.heuristic_check = heuristic_check  # scan the answer before asking the LLM in Check C, see completeness.py
+        self.prompt_budget = prompt_budget  # summarization prompt tokens, None keeps full analyses, see prompt_budget.py
+        self.wire_format = wire_format  # "json" or "terse" tool messages in the summarization prompt, see wire_format.py
 
     def call_llm(self, messages, use_tools=True):
         """call OpenAI API"""
@@ -134,7 +172,56 @@ class OpenAIFredAgent:
         response = client.chat.completions.create(**kwargs)
         return response
 
-    def validate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0):
+    async def acall_llm(self, messages, use_tools=True):
+        """call OpenAI API with the async client"""
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+        }
+        if use_tools:
+            kwargs["tools"] = OPENAI_TOOLS
+            kwargs["tool_choice"] = "auto"
+
+        return await get_async_client().chat.completions.create(**kwargs)
+
+    def stream_llm(self, messages, use_tools=True):
+        """
+        Call the OpenAI API with stream=True.
+
+        Yields:
+            answer text chunks as they are generated
+        """
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+        }
+        if use_tools:
+            kwargs["tools"] = OPENAI_TOOLS
+            kwargs["tool_choice"] = "auto"
+
+        yield from iter_openai_chunks(client.chat.completions.create(**kwargs))
+
+    async def astream_llm(self, messages, use_tools=True):
+        """stream_llm with the async client"""
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+        }
+        if use_tools:
+            kwargs["tools"] = OPENAI_TOOLS
+            kwargs["tool_choice"] = "auto"
+
+        stream = await get_async_client().chat.completions.create(**kwargs)
+        async for chunk in aiter_openai_chunks(stream):
+            yield chunk
+
+    def answer_text(self, response):
+        """answer text of a non-streaming completion"""
+        return response.choices[0].message.content or "No response generated"
+
+    def validate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0, context=None):
         """
         Check B: validate that all series_ids exist in the known FRED series list.
         Re-prompts the LLM with a correction hint if invalid series are found.
@@ -144,6 +231,7 @@ class OpenAIFredAgent:
             question: original user question
             max_retries: maximum number of correction attempts
             _depth: internal recursion depth counter
+            context: RetrievalContext of the question, reused when re-prompting
 
         Returns:
             list of validated tool_calls
@@ -161,34 +249,162 @@ class OpenAIFredAgent:
         )
 
         extraction = self.extract_tool_calls(
-            question + f"\n\n[Correction hint: {correction_hint}]"
+            question + f"\n\n[Correction hint: {correction_hint}]",
+            context=context,
+            prefetch=0
         )
 
         return self.validate_tool_calls(
             extraction.get("tool_calls", tool_calls),
             question,
             max_retries,
-            _depth + 1
+            _depth + 1,
+            context=context
+        )
+
+    async def avalidate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0, context=None):
+        """validate_tool_calls with the async client"""
+        invalid = [c for c in tool_calls if c["series_id"] not in VALID_SERIES]
+        if not invalid or _depth >= max_retries:
+            return tool_calls
+
+        if self.verbose:
+            print(f"  [Check B] Invalid series: {[c['series_id'] for c in invalid]}, re-prompting...")
+
+        correction_hint = (
+            f"The following series IDs do not exist: {[c['series_id'] for c in invalid]}. "
+            f"Please use only series from the provided list."
+        )
+
+        extraction = await self.aextract_tool_calls(
+            question + f"\n\n[Correction hint: {correction_hint}]",
+            context=context,
+            prefetch=0
+        )
+
+        return await self.avalidate_tool_calls(
+            extraction.get("tool_calls", tool_calls),
+            question,
+            max_retries,
+            _depth + 1,
+            context=context
         )
 
-    def extract_tool_calls(self, question, min_similarity=0.3):
+    def extract_tool_calls(self, question, min_similarity=0.3, context=None, fast_path=None, prefetch=None):
         """
         Extract tool calls from LLM response.
         Includes Check A (relevance gate) and Check B (series_id validation).
+        The question is retrieved once (unless `context` is given) and the
+        RetrievalContext is shared by Check A, the indicator guide and logging.
+        `fast_path` / `prefetch` override self.fast_path / self.prefetch for this question.
 
         Returns:
             dict: {
                 "success": bool,
                 "tool_calls": list of dict with {series_id, start_date, end_date},
+                "prefetch": Prefetch started during the LLM call (if any), for execute_tool_calls,
                 "raw_response": response object,
                 "direct_answer": str (if no tool calls needed),
                 "error": str (if failed)
             }
         """
+        extraction, request = self._prepare_extraction(question, min_similarity, context, fast_path)
+        if extraction is not None:
+            return extraction
+
+        # fetch the likely series while waiting for the LLM
+        prefetch = self._start_prefetch(request, self.prefetch if prefetch is None else prefetch)
+
+        try:
+            response = self.call_llm(request["messages"], use_tools=True)
+            extraction = self._parse_extraction(response)
+
+            # Check B: validate that series_ids are in the known list
+            if extraction["tool_calls"]:
+                extraction["tool_calls"] = self.validate_tool_calls(
+                    extraction["tool_calls"], question, context=request["context"]
+                )
+
+        except Exception as e:
+            extraction = {
+                "success": False,
+                "error": str(e),
+                "raw_response": None
+            }
+
+        return self._attach_prefetch(extraction, prefetch)
+
+    async def aextract_tool_calls(self, question, min_similarity=0.3, context=None, fast_path=None, prefetch=None):
+        """extract_tool_calls with the async client; retrieval runs in a worker thread"""
+        extraction, request = await asyncio.to_thread(
+            self._prepare_extraction, question, min_similarity, context, fast_path
+        )
+        if extraction is not None:
+            return extraction
+
+        prefetch = self._start_prefetch(request, self.prefetch if prefetch is None else prefetch, run_async=True)
+
+        try:
+            response = await self.acall_llm(request["messages"], use_tools=True)
+            extraction = self._parse_extraction(response)
+
+            if extraction["tool_calls"]:
+                extraction["tool_calls"] = await self.avalidate_tool_calls(
+                    extraction["tool_calls"], question, context=request["context"]
+                )
+
+        except Exception as e:
+            extraction = {
+                "success": False,
+                "error": str(e),
+                "raw_response": None
+            }
+
+        return self._attach_prefetch(extraction, prefetch)
+
+    def _start_prefetch(self, request, n, run_async=False):
+        """
+        Speculatively fetch the top-n retrieved series for the date range parsed from the question.
+        GPT chooses its own dates, so only calls that agree with the parsed range take the results.
+
+        Returns:
+            Prefetch, None when there is nothing to prefetch
+        """
+        candidates = prefetch_candidates(request["context"], request["pre_start"], request["pre_end"], n)
+        if not candidates:
+            return None
+
+        if self.verbose:
+            print(f"  [Prefetch] fetching {', '.join(c[0] for c in candidates)} during tool extraction")
+
+        # fetched the way _pipeline executes tool calls: with fallback, compact only above 2 calls
+        prefetch = Prefetch(use_fallback=True, compact_mode=False)
+        if run_async:
+            return prefetch.create_tasks(acall_fred_api_with_fallback, candidates)
+        return prefetch.submit(call_fred_api_with_fallback, candidates)
+
+    def _attach_prefetch(self, extraction, prefetch):
+        """Hand the prefetch on to execute_tool_calls, or cancel it when there is nothing to execute."""
+        if prefetch is not None:
+            if extraction.get("tool_calls"):
+                extraction["prefetch"] = prefetch
+            else:
+                prefetch.cancel()
+        return extraction
+
+    def _prepare_extraction(self, question, min_similarity, context, fast_path):
+        """
+        Everything before the extraction LLM call: retrieval, Check A, date parsing and the fast path.
+
+        Returns:
+            (extraction, None) when no LLM call is needed,
+            otherwise (None, {"messages", "context", "pre_start", "pre_end"})
+        """
         # before calling the LLM,  a semantic retriever is used to find the top-k most relevant series for the given question, 
         # and only those are passed into the prompt.
-        relevant = retriever.retrieve(question, top_k=self.top_k)
-        top_score = relevant[0]["similarity"] if relevant else 0
+        if context is None:
+            context = retriever.build_context(question, top_k=self.top_k)
+        top_score = context.top_score
 
         # Check A:
         # if the maximum similarity score is too low, indicating that the question may lie outside the scope of the data
@@ -201,7 +417,7 @@ class OpenAIFredAgent:
                 "success": False,
                 "error": f"No relevant FRED series found (best score: {top_score:.3f}). "
                         f"This question may be outside FRED's coverage."
-            }
+            }, None
 
         # pre-parse date range from question before calling LLM
         pre_start, pre_end = parse_date_range(question)
@@ -212,12 +428,34 @@ class OpenAIFredAgent:
             else:
                 print(f"  [DateParser] No unambiguous date found, LLM will decide")
 
-        # dynamically retrieve top-k relevant series for this question
-        guide = build_indicator_guide(question, top_k=self.top_k)
+        # fast path: one decisive series and an explicit date range need no LLM round trip
+        if fast_path is None:
+            fast_path = self.fast_path
+        if fast_path:
+            direct = plan_direct_tool_call(question, context, (pre_start, pre_end), VALID_SERIES)
+            if direct:
+                if self.verbose:
+                    print(f"  [FastPath] {direct['series_id']} ({direct['reason']}), skipping LLM tool extraction")
+                call = {
+                    "tool_call_id": "call_0",
+                    "series_id": direct["series_id"],
+                    "start_date": direct["start_date"],
+                    "end_date": direct["end_date"]
+                }
+                return {
+                    "success": True,
+                    "tool_calls": [call],
+                    "assistant_message": openai_tool_message(call, call["tool_call_id"]),
+                    "fast_path": True,
+                    "raw_response": None
+                }, None
+
+        # top-k relevant series for this question
+        guide = context.prompt_section() + GUIDE_SUFFIX
 
         if self.verbose:
             print(f"\n  [Retriever] top-{self.top_k} series for this question:")
-            for s in relevant:
+            for s in context.results:
                 print(f"    [{s['similarity']:.3f}] {s['SERIES']}: {s['INDICATOR']}")
 
         messages = [
@@ -231,93 +469,183 @@ class OpenAIFredAgent:
             }
         ]
 
-        try:
-            response = self.call_llm(messages, use_tools=True)
-            msg = response.choices[0].message
+        return None, {"messages": messages, "context": context, "pre_start": pre_start, "pre_end": pre_end}
 
-            # no tool calls -> direct answer
-            if not msg.tool_calls:
-                return {
-                    "success": True,
-                    "tool_calls": [],
-                    "direct_answer": msg.content or "",
-                    "raw_response": response
-                }
+    def _parse_extraction(self, response):
+        """Turn the extraction completion into tool calls (before Check B)."""
+        msg = response.choices[0].message
+
+        # no tool calls -> direct answer
+        if not msg.tool_calls:
+            return {
+                "success": True,
+                "tool_calls": [],
+                "direct_answer": msg.content or "",
+                "raw_response": response
+            }
 
-            extracted_calls = []
-            for tc in msg.tool_calls:
-                args = json.loads(tc.function.arguments)
+        extracted_calls = []
+        for tc in msg.tool_calls:
+            args = json.loads(tc.function.arguments)
 
-                start_date = args.get("start_date", "")
-                end_date = args.get("end_date", "")
-                start_date, end_date = fix_date_parameters(start_date, end_date)
+            start_date = args.get("start_date", "")
+            end_date = args.get("end_date", "")
+            start_date, end_date = fix_date_parameters(start_date, end_date)
 
-                extracted_calls.append({
-                    "tool_call_id": tc.id,
-                    "series_id": args.get("series_id", "").strip(),
-                    "start_date": start_date,
-                    "end_date": end_date
-                })
+            extracted_calls.append({
+                "tool_call_id": tc.id,
+                "series_id": args.get("series_id", "").strip(),
+                "start_date": start_date,
+                "end_date": end_date
+            })
 
-            # Check B: validate that series_ids are in the known list
-            extracted_calls = self.validate_tool_calls(extracted_calls, question)
+        return {
+            "success": True,
+            "tool_calls": extracted_calls,
+            "raw_response": response
+        }
 
+    def _execute_tool_call(self, idx, call, use_fallback, use_compact, prefetch=None):
+        """
+        Fetch and analyze a single tool call.
+
+        Returns:
+            dict with API result, its tool_call_id and the time spent in seconds
+        """
+        call_start = time.time()
+        series_id = call["series_id"]
+        start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
+        end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
+        tool_call_id = call.get("tool_call_id", f"call_{idx}")
+
+        if not series_id:
             return {
-                "success": True,
-                "tool_calls": extracted_calls,
-                "raw_response": response
+                "success": False,
+                "error": "No series_id provided",
+                "tool_call_id": tool_call_id
             }
 
-        except Exception as e:
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
+
+        pending = prefetch.take(series_id, start_date, end_date, use_fallback, use_compact) if prefetch else None
+        if pending is not None:
+            # copied, the prefetched dict is shared with whoever else holds the future
+            api_result = dict(pending.result())
+            api_result["prefetched"] = True
+        elif use_fallback:
+            api_result = call_fred_api_with_fallback(
+                series_id, start_date, end_date,
+                compact_mode=use_compact
+            )
+        else:
+            api_result = call_fred_api(
+                series_id, start_date, end_date,
+                compact_mode=use_compact
+            )
+
+        api_result["tool_call_id"] = tool_call_id
+        api_result["fetch_time"] = round(time.time() - call_start, 3)
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} done in {api_result['fetch_time']:.2f}s"
+                  f"{' (prefetched)' if api_result.get('prefetched') else ''}")
+
+        return api_result
+
+    async def _aexecute_tool_call(self, idx, call, use_fallback, use_compact, prefetch=None):
+        """_execute_tool_call on the async FRED client."""
+        call_start = time.time()
+        series_id = call["series_id"]
+        start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
+        end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
+        tool_call_id = call.get("tool_call_id", f"call_{idx}")
+
+        if not series_id:
             return {
                 "success": False,
-                "error": str(e),
-                "raw_response": None
+                "error": "No series_id provided",
+                "tool_call_id": tool_call_id
             }
 
-    def execute_tool_calls(self, tool_calls, use_fallback=False):
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
+
+        pending = prefetch.take(series_id, start_date, end_date, use_fallback, use_compact) if prefetch else None
+        if pending is not None:
+            api_result = dict(await pending)
+            api_result["prefetched"] = True
+        else:
+            fetch = acall_fred_api_with_fallback if use_fallback else acall_fred_api
+            api_result = await fetch(series_id, start_date, end_date, compact_mode=use_compact)
+
+        api_result["tool_call_id"] = tool_call_id
+        api_result["fetch_time"] = round(time.time() - call_start, 3)
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} done in {api_result['fetch_time']:.2f}s"
+                  f"{' (prefetched)' if api_result.get('prefetched') else ''}")
+
+        return api_result
+
+    def execute_tool_calls(self, tool_calls, use_fallback=False, prefetch=None):
         """
         Execute tool calls and return FRED API results.
+        Tool calls run concurrently on up to `self.max_workers` threads;
+        results keep the order of `tool_calls`.
 
         Args:
             tool_calls: list of dict with {series_id, start_date, end_date}
             use_fallback: whether to use date-fallback retry on empty results
+            prefetch: Prefetch from extract_tool_calls; matching calls take its results,
+                      the rest of it is cancelled
 
         Returns:
             list of dict with API results
         """
-        results = []
+        # compact above 2 calls; with a prompt budget fit_prompt upgrades the series it keeps at the detailed level
         use_compact = len(tool_calls) > 2
+        start_time = time.time()
 
-        for idx, call in enumerate(tool_calls):
-            series_id = call["series_id"]
-            start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
-            end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
+        if self.max_workers <= 1 or len(tool_calls) <= 1:
+            results = [self._execute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                       for idx, call in enumerate(tool_calls)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tool_calls))) as pool:
+                results = list(pool.map(
+                    lambda item: self._execute_tool_call(item[0], item[1], use_fallback, use_compact, prefetch),
+                    enumerate(tool_calls)
+                ))
+        if prefetch:
+            prefetch.cancel()
+
+        if self.verbose and tool_calls:
+            print(f"  Executed {len(tool_calls)} tool call(s) in {time.time() - start_time:.2f}s")
 
-            if not series_id:
-                results.append({
-                    "success": False,
-                    "error": "No series_id provided",
-                    "tool_call_id": call.get("tool_call_id", f"call_{idx}")
-                })
-                continue
+        return results
 
-            if self.verbose:
-                print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
+    async def aexecute_tool_calls(self, tool_calls, use_fallback=False, prefetch=None):
+        """
+        execute_tool_calls on the event loop: the calls run concurrently instead of on
+        a thread pool (sequentially when max_workers <= 1); results keep their order.
+        """
+        # compact above 2 calls; with a prompt budget fit_prompt upgrades the series it keeps at the detailed level
+        use_compact = len(tool_calls) > 2
+        start_time = time.time()
 
-            if use_fallback:
-                api_result = call_fred_api_with_fallback(
-                    series_id, start_date, end_date,
-                    compact_mode=use_compact
-                )
-            else:
-                api_result = call_fred_api(
-                    series_id, start_date, end_date,
-                    compact_mode=use_compact
-                )
+        if self.max_workers <= 1:
+            results = [await self._aexecute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                       for idx, call in enumerate(tool_calls)]
+        else:
+            results = list(await asyncio.gather(*(
+                self._aexecute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                for idx, call in enumerate(tool_calls)
+            )))
+        if prefetch:
+            prefetch.cancel()
 
-            api_result["tool_call_id"] = call.get("tool_call_id", f"call_{idx}")
-            results.append(api_result)
+        if self.verbose and tool_calls:
+            print(f"  Executed {len(tool_calls)} tool call(s) in {time.time() - start_time:.2f}s")
 
         return results
 
@@ -339,6 +667,53 @@ class OpenAIFredAgent:
                 "gap": str
             }
         """
+        check_response = self.call_llm(
+            self._completeness_messages(question, final_answer, api_results),
+            use_tools=False
+        )
+        return self._parse_completeness(check_response)
+
+    async def avalidate_final_answer_completeness(self, question, final_answer, api_results):
+        """validate_final_answer_completeness with the async client."""
+        check_response = await self.acall_llm(
+            self._completeness_messages(question, final_answer, api_results),
+            use_tools=False
+        )
+        return self._parse_completeness(check_response)
+
+    def validate_question_addressed(self, question, final_answer):
+        """
+        Question relevance half of Check C, asked when the answer scan already found every series.
+
+        Returns:
+            dict: {"question_addressed": bool, "gap": str}
+        """
+        check_response = self.call_llm(self._relevance_messages(question, final_answer), use_tools=False)
+        return self._parse_completeness(check_response)
+
+    async def avalidate_question_addressed(self, question, final_answer):
+        """validate_question_addressed with the async client."""
+        check_response = await self.acall_llm(self._relevance_messages(question, final_answer), use_tools=False)
+        return self._parse_completeness(check_response)
+
+    def _relevance_messages(self, question, final_answer):
+        verification_prompt = f"""
+        You are reviewing an economic data analysis response.
+
+        Original question: "{question}"
+        Answer provided: "{final_answer[:600]}..."
+
+        Does the answer actually address what was asked in the original question?
+
+        Reply with JSON only, no explanation:
+        {{
+        "question_addressed": true/false,
+        "gap": "one sentence describing what's missing from the answer, or empty string if it is addressed"
+        }}
+        """
+        return [{"role": "user", "content": verification_prompt}]
+
+    def _completeness_messages(self, question, final_answer, api_results):
         series_used = [r["series_id"] for r in api_results if r["success"]]
 
         verification_prompt = f"""
@@ -360,12 +735,9 @@ class OpenAIFredAgent:
         "gap": "one sentence describing what's missing from the answer, or empty string if complete"
         }}
         """
+        return [{"role": "user", "content": verification_prompt}]
 
-        check_response = self.call_llm(
-            [{"role": "user", "content": verification_prompt}],
-            use_tools=False
-        )
-
+    def _parse_completeness(self, check_response):
         try:
             content = check_response.choices[0].message.content or "{}"
             # strip possible markdown code fences (only for gpt model)
@@ -374,20 +746,74 @@ class OpenAIFredAgent:
         except Exception:
             return {"complete": True, "missing": [], "question_addressed": True, "gap": ""}
 
-    def process_question(self, question, max_self_check_loop=1):
+    def route_question(self, question):
+        """
+        Returns:
+            "direct", "single" or "full" (see query_router.py), None when routing is off
+        """
+        if not self.route:
+            return None
+        decision = (self.router or get_router()).route(question, VALID_SERIES)
+        if self.verbose:
+            print(f"\n[Router] {decision['route']} (confidence {decision['confidence']:.2f}, {decision['reason']})")
+        return decision["route"]
+
+    def fit_prompt(self, fixed_messages, tool_results, api_results, optional_messages=()):
+        """
+        prompt_budget.fit_prompt with this agent's tokenizer and budget, compact analyses upgraded
+        from the raw observations of `api_results`, logged when verbose.
+
+        Returns:
+            (optional messages kept, fitted tool results)
+        """
+        optional_messages, tool_results, report = fit_prompt(
+            fixed_messages, tool_results, self.prompt_budget, get_token_counter(self.model), optional_messages,
+            self.wire_format, detail=lambda i: detailed_analysis(api_results[i])
+        )
+        if self.verbose:
+            levels = ", ".join(f"{r.get('series_id', '?')} {level}" for r, level in zip(api_results, report["levels"]))
+            print(f"  [Budget] {report['tokens']}/{report['budget']} prompt tokens ({report['tokenizer']}): {levels}")
+        return optional_messages, tool_results
+
+    def build_context(self, question):
+        """RetrievalContext of the series relevant to `question`"""
+        return retriever.build_context(question, top_k=self.top_k)
+
+    def process_question(self, question, max_self_check_loop=1, stream=False):
         """
         Full pipeline: extract tool calls -> execute -> generate final answer -> self-check.
 
         Args:
             question: user question string
             max_self_check_loop: max Check C iterations when tool calls were made
+            stream: return a generator of progress events and answer tokens instead,
+                    ending with the result dict (see streaming.py)
 
         Returns:
             dict: {
                 "question", "tool_calls", "api_results",
-                "final_answer", "execution_time", "success"
+                "final_answer", "route", "execution_time", "success"
             }
         """
+        events = run_pipeline(self, self._pipeline(question, max_self_check_loop), stream)
+        return events if stream else collect_result(events)
+
+    async def aprocess_question(self, question, max_self_check_loop=1):
+        """
+        process_question as a coroutine on the async OpenAI and FRED clients,
+        so many questions can be answered concurrently on one event loop.
+        """
+        return await acollect_result(arun_pipeline(self, self._pipeline(question, max_self_check_loop), False))
+
+    def astream_question(self, question, max_self_check_loop=1):
+        """process_question(stream=True) as an async generator of events."""
+        return arun_pipeline(self, self._pipeline(question, max_self_check_loop), True)
+
+    def _pipeline(self, question, max_self_check_loop):
+        """
+        process_question as a generator of events and Steps, driven by
+        streaming.run_pipeline / arun_pipeline.
+        """
         if self.verbose:
             print(f"\n{"="*60}")
             print(f"Question: {question}")
@@ -395,19 +821,47 @@ class OpenAIFredAgent:
 
         start_time = time.time()
 
+        # step 0: route the question
+        route = yield Step("route_question", question)
+        if route:
+            yield event("route", route=route)
+
+        if route == ROUTE_DIRECT:
+            # a single LLM call without tools; the retrieved series are still listed
+            # so the model can recommend indicators
+            context = yield Step("build_context", question)
+            messages = direct_answer_messages(question, context, datetime.today().strftime('%Y-%m-%d'))
+            final_answer = yield Step(GENERATE, messages, use_tools=False)
+            if self.verbose:
+                print("\nDirect answer:")
+                print(final_answer)
+            yield event("result", result={
+                "question": question,
+                "success": True,
+                "tool_calls": [],
+                "api_results": [],
+                "final_answer": final_answer,
+                "route": route,
+                "execution_time": time.time() - start_time
+            })
+            return
+
         # step 1: extract tool calls (includes Check A and Check B)
         if self.verbose:
             print("\nStep 1: Extracting tool calls from LLM...")
 
-        extraction = self.extract_tool_calls(question)
+        # questions routed to the full pipeline are never single-series, skip the fast path check
+        extraction = yield Step("extract_tool_calls", question, fast_path=False if route == ROUTE_FULL else None)
 
         if not extraction["success"]:
-            return {
+            yield event("result", result={
                 "question": question,
                 "success": False,
                 "error": extraction.get("error"),
+                "route": route,
                 "execution_time": time.time() - start_time
-            }
+            })
+            return
 
         tool_calls = extraction["tool_calls"]
 
@@ -415,41 +869,50 @@ class OpenAIFredAgent:
             if self.verbose:
                 print("\nNo tool calls needed. Direct answer:")
                 print(extraction.get("direct_answer", "No response"))
-            return {
+            # already generated by the extraction call
+            if extraction.get("direct_answer"):
+                yield event("token", content=extraction["direct_answer"])
+            yield event("result", result={
                 "question": question,
                 "success": True,
                 "tool_calls": [],
                 "api_results": [],
                 "final_answer": extraction.get("direct_answer", ""),
+                "route": route,
                 "execution_time": time.time() - start_time
-            }
+            })
+            return
 
         if self.verbose:
             print(f"\nExtracted {len(tool_calls)} tool call(s):")
             for i, call in enumerate(tool_calls):
                 print(f"  {i+1}. series_id={call['series_id']}, "
                       f"dates={call['start_date']} to {call['end_date']}")
+        yield event("tool_calls", tool_calls=tool_calls)
 
         # step 2: execute tool calls with auto-fallback
         if self.verbose:
             print("\nStep 2: Executing tool calls with auto-fallback...")
 
-        api_results = self.execute_tool_calls(tool_calls, use_fallback=True)
+        api_results = yield Step("execute_tool_calls", tool_calls, use_fallback=True,
+                                 prefetch=extraction.get("prefetch"))
+        yield event("tool_results", api_results=api_results)
 
         # step 3: build conversation with tool results and generate final answer
         if self.verbose:
             print("\nStep 3: Generating final answer...")
 
-        raw_msg = extraction["raw_response"].choices[0].message
+        # the fast path builds the assistant message itself, without an LLM response
+        raw_msg = extraction.get("assistant_message") or extraction["raw_response"].choices[0].message
 
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    f"You are a US economic data assistant with access to FRED API. "
-                    f"Today is {datetime.today().strftime('%Y-%m-%d')}."
-                )
-            },
+        system_message = {
+            "role": "system",
+            "content": (
+                f"You are a US economic data assistant with access to FRED API. "
+                f"Today is {datetime.today().strftime('%Y-%m-%d')}."
+            )
+        }
+        question_messages = [
             {
                 "role": "user",
                 "content": question
@@ -458,17 +921,25 @@ class OpenAIFredAgent:
             raw_msg
         ]
 
-        # append tool results
-        for idx, result in enumerate(api_results):
+        tool_results = []
+        for result in api_results:
             if result["success"]:
-                tool_result = {
+                tool_results.append({
                     "series_id": result.get("series_id", ""),
                     "indicator": result.get("indicator_name", ""),
                     "analysis": result.get("analysis", {})
-                }
+                })
             else:
-                tool_result = {"error": result.get("error", "Unknown error")}
+                tool_results.append({"error": result.get("error", "Unknown error")})
+
+        # fit the analyses into the prompt budget (a step: upgrading to detailed analyses is CPU-bound)
+        if self.prompt_budget:
+            _, tool_results = yield Step("fit_prompt", [system_message] + question_messages, tool_results, api_results)
 
+        messages = [system_message] + question_messages
+
+        # append tool results
+        for idx, (result, tool_result) in enumerate(zip(api_results, tool_results)):
             if idx == len(api_results) - 1:
                 series_list = ", ".join(r["series_id"] for r in api_results if r["success"])
                 tool_result["reminder"] = (
@@ -479,16 +950,26 @@ class OpenAIFredAgent:
             messages.append({
                 "role": "tool",
                 "tool_call_id": result.get("tool_call_id", f"call_{idx}"),
-                "content": json.dumps(tool_result, ensure_ascii=False)
+                "content": format_tool_result(tool_result, self.wire_format)
             })
 
-        final_response = self.call_llm(messages, use_tools=False)
-        final_answer = final_response.choices[0].message.content or "No response generated"
+        final_answer = yield Step(GENERATE, messages, use_tools=False)
 
         # Check C: self-check completeness and question relevance
         if len(tool_calls) > 2:
             for _ in range(max_self_check_loop):
-                check = self.validate_final_answer_completeness(question, final_answer, api_results)
+                # the LLM verifier only runs when scanning the answer is inconclusive
+                check = check_completeness(final_answer, api_results) if self.heuristic_check else None
+                if check is None:
+                    check = yield Step("validate_final_answer_completeness", question, final_answer, api_results)
+                else:
+                    if self.verbose:
+                        print(f"    [Check C] Answer scan: {'complete' if check['complete'] else 'missing ' + ', '.join(check['missing_series'])}")
+                    if check["complete"]:
+                        # the scan only covers the data, the LLM still judges whether the question is answered
+                        relevance = yield Step("validate_question_addressed", question, final_answer)
+                        check.update(question_addressed=relevance.get("question_addressed", True),
+                                     gap=relevance.get("gap", ""))
 
                 if check.get("complete") and check.get("question_addressed"):
                     break
@@ -510,8 +991,8 @@ class OpenAIFredAgent:
                     )
                 })
 
-                temp = self.call_llm(messages, use_tools=False)
-                final_answer = temp.choices[0].message.content or "No response generated"
+                yield event("revision", reason=(missing_calls + gap_hint).strip())
+                final_answer = yield Step(GENERATE, messages, use_tools=False)
 
         execution_time = time.time() - start_time
 
@@ -523,14 +1004,16 @@ class OpenAIFredAgent:
             print(f"\nExecution time: {execution_time:.2f}s")
             print(f"{"="*60}\n")
 
-        return {
+        yield event("result", result={
             "question": question,
             "success": True,
             "tool_calls": tool_calls,
             "api_results": api_results,
             "final_answer": final_answer,
+            "fast_path": extraction.get("fast_path", False),
+            "route": route,
             "execution_time": execution_time
-        }
+        })
 
 
 def process_question(question, verbose=True):
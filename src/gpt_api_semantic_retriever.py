@@ -1,7 +1,7 @@
 from openai import OpenAI
 from gpt_key import gpt_key
 from fred_api import load_indicator_metadata, call_fred_api
-from series_retriever import SeriesRetriever
+from series_retriever import shared_retriever
 from llama_api import (
     TOOLS,
     fix_date_parameters,
@@ -15,7 +15,8 @@ import time
 client = OpenAI(api_key=gpt_key)
 MODEL = "gpt-4o-mini"
 
-retriever = SeriesRetriever()
+# loaded on first use and shared with the other agents
+retriever = shared_retriever
 
 def convert_tools_to_openai_format(tools):
     """convert Ollama tool format to OpenAI tool format"""
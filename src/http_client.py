@@ -0,0 +1,256 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+"""
+Shared HTTP client layer for the FRED and Ollama clients.
+
+One pooled requests.Session per process (keep-alive, no repeated TCP/TLS setup),
+configurable timeouts, exponential backoff with jitter on 429/5xx that honors
+Retry-After, and a cap on concurrent requests per host.
+
+POSTs (Ollama generation) are not idempotent: a 500 may come after a long generation
+already ran, so by default they are only retried on connection errors, 429 and a 503
+with Retry-After, where the server did not take the request. retry_post=True retries
+them like GETs.
+
+AsyncHttpClient is the asyncio counterpart with the same retry policy, on one pooled
+httpx.AsyncClient per event loop (httpx is installed with openai).
+"""
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _retry_after_seconds(response):
+    """parse a Retry-After header (seconds or HTTP date), None if absent or invalid"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _should_retry(method, response, retry_post):
+    """retry a response with this status for this method"""
+    if response.status_code not in RETRY_STATUS:
+        return False
+    if retry_post or method.upper() in IDEMPOTENT_METHODS:
+        return True
+    return response.status_code == 429 or (response.status_code == 503 and "Retry-After" in response.headers)
+
+
+def _backoff_delay(attempt, response, backoff_base, backoff_max):
+    retry_after = _retry_after_seconds(response) if response is not None else None
+    if retry_after is not None:
+        return min(retry_after, backoff_max)
+    # full jitter
+    return random.uniform(0, min(backoff_max, backoff_base * 2 ** attempt))
+
+
+class HttpClient:
+    def __init__(self, timeout=30, max_retries=3, backoff_base=0.5, backoff_max=30.0,
+                 max_per_host=8, pool_size=16, retry_post=False):
+        """
+        Args:
+            timeout: default request timeout in seconds, (connect, read) tuples are accepted
+            max_retries: retries after the first attempt on 429/5xx and connection errors
+            backoff_base: first backoff delay in seconds, doubled on every retry
+            backoff_max: upper bound for a single backoff delay (also caps Retry-After)
+            max_per_host: maximum number of in-flight requests per host
+            pool_size: keep-alive connections kept per host
+            retry_post: retry non-idempotent requests on every 429/5xx, not only 429 and 503 with Retry-After
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_post = retry_post
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _backoff(self, attempt, response=None):
+        """seconds to wait before retry number `attempt` (0-based)"""
+        return _backoff_delay(attempt, response, self.backoff_base, self.backoff_max)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        send a request through the pooled session, retrying on 429/5xx and connection errors
+
+        Returns:
+            requests.Response of the last attempt
+        Raises:
+            requests.RequestException if the last attempt failed without a response
+        """
+        timeout = self.timeout if timeout is None else timeout
+        slot = self._slot(url)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with slot:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectionError:
+                # includes connect timeouts, read timeouts are not retried since the server got the request
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if not _should_retry(method, response, self.retry_post) or attempt == self.max_retries:
+                return response
+            # release the pooled connection of a discarded (possibly streamed) response
+            response.close()
+            time.sleep(self._backoff(attempt, response))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def _httpx_timeout(timeout):
+    import httpx
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class _LoopState:
+    """pooled session and per-host slots of one event loop"""
+    def __init__(self, session):
+        self.session = session
+        self.slots = {}
+
+    def slot(self, url, max_per_host):
+        host = urlsplit(url).netloc
+        if host not in self.slots:
+            self.slots[host] = asyncio.Semaphore(max_per_host)
+        return self.slots[host]
+
+
+class AsyncHttpClient:
+    def __init__(self, timeout=30, max_retries=3, backoff_base=0.5, backoff_max=30.0,
+                 max_per_host=8, pool_size=16, retry_post=False, session_factory=None, retry_on=None):
+        """
+        Args:
+            same as HttpClient
+            session_factory: callable returning the async session of an event loop,
+                             an httpx.AsyncClient by default
+            retry_on: exception types retried like connection errors, httpx connect errors by default
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_post = retry_post
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+        self.pool_size = pool_size
+        self.session_factory = session_factory or self._httpx_session
+        self.retry_on = retry_on
+
+        # httpx connections and asyncio semaphores belong to the loop that created them
+        self._states = weakref.WeakKeyDictionary()
+
+    def _httpx_session(self):
+        import httpx
+        if self.retry_on is None:
+            # read timeouts are not retried since the server got the request
+            self.retry_on = (httpx.ConnectError, httpx.ConnectTimeout)
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(timeout=_httpx_timeout(self.timeout), limits=limits)
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self.session_factory())
+        return state
+
+    async def _send(self, state, method, url, timeout, stream, kwargs):
+        """send with retries; the returned response is still open when `stream` is set"""
+        slot = state.slot(url, self.max_per_host)
+        if timeout is not None:
+            kwargs["timeout"] = _httpx_timeout(timeout)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with slot:
+                    request = state.session.build_request(method, url, **kwargs)
+                    response = await state.session.send(request, stream=stream)
+            except self.retry_on or ():
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, None, self.backoff_base, self.backoff_max))
+                continue
+
+            if not _should_retry(method, response, self.retry_post) or attempt == self.max_retries:
+                return response
+            if stream:
+                await response.aclose()
+            await asyncio.sleep(_backoff_delay(attempt, response, self.backoff_base, self.backoff_max))
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        """
+        async HttpClient.request
+
+        Returns:
+            httpx.Response of the last attempt, body read
+        """
+        return await self._send(self._state(), method, url, timeout, False, kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method, url, timeout=None, **kwargs):
+        """
+        request whose body is read incrementally (aiter_lines), closed when the block exits;
+        retries only happen before the body is handed out
+        """
+        response = await self._send(self._state(), method, url, timeout, True, kwargs)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+
+# FRED answers quickly but throttles bursts, LLM generation can take minutes
+fred_client = HttpClient(timeout=(5, 30), max_retries=4, max_per_host=8)
+ollama_client = HttpClient(timeout=(5, 600), max_retries=2, max_per_host=4)
+async_fred_client = AsyncHttpClient(timeout=(5, 30), max_retries=4, max_per_host=8)
+async_ollama_client = AsyncHttpClient(timeout=(5, 600), max_retries=2, max_per_host=4)
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+
+"""
+Process-wide registry of the indicator metadata in output_with_descriptions.json.
+
+The file is parsed lazily on first use and only re-parsed when its mtime changes,
+so every FRED call, the retriever and the agents share one in-memory copy.
+"""
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METADATA_PATH = os.path.join(_BASE_DIR, "output_with_descriptions.json")
+
+
+class IndicatorRegistry:
+    def __init__(self, path=METADATA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._indicators = []
+        self._by_series = {}
+
+    def _refresh(self):
+        """(re)load the metadata file if it has not been loaded yet or changed on disk"""
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                indicators = json.load(f)
+            self._indicators = indicators
+            self._by_series = {item["SERIES"]: item for item in indicators}
+            self._mtime = mtime
+
+    def as_list(self) -> list[dict]:
+        """all indicators in file order"""
+        self._refresh()
+        return self._indicators
+
+    def as_map(self) -> dict:
+        """series_id -> indicator dict"""
+        self._refresh()
+        return self._by_series
+
+    def get(self, series_id, default=None):
+        """O(1) lookup of a single indicator by series ID"""
+        return self.as_map().get(series_id, default)
+
+    def series_ids(self) -> set:
+        return set(self.as_map())
+
+    def __contains__(self, series_id):
+        return series_id in self.as_map()
+
+    def __len__(self):
+        return len(self.as_map())
+
+
+indicator_registry = IndicatorRegistry()
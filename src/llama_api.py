@@ -1,4 +1,4 @@
-import requests
+from http_client import ollama_client
 from fred_key import fred_key
 from fred_api import load_indicator_metadata, call_fred_api
 import json
@@ -218,7 +218,7 @@ class FredLLMAgent:
             "stream": False
         }
         
-        response = requests.post(self.api_url, json=payload, timeout=600)
+        response = ollama_client.post(self.api_url, json=payload)
         return response.json()
     
     def estimate_tokens(self, messages):
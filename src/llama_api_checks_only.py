@@ -3,7 +3,7 @@ llama_api_checks_only.py
 Variant: - date_parser   |  - semantic retrieval  |  + self-checks (A / B / C)
 """
 
-import requests
+from http_client import ollama_client
 import json
 import re
 import time
@@ -11,7 +11,8 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
 from fred_api import call_fred_api
-from series_retriever import SeriesRetriever
+from series_retriever import shared_retriever
+from indicator_metadata import indicator_registry
 from few_shot_examples import build_few_shot_messages
 
 OLLAMA_URL = "http://localhost:11434/api/chat"
@@ -41,8 +42,10 @@ IMPORTANT:
 INDICATOR_GUIDE_COMP = indicator_mapping + GUIDE_SUFFIX
 
 # ── Valid series IDs for Check B ──────────────────────────────────────────────
-retriever   = SeriesRetriever()
-VALID_SERIES = retriever.get_all_series_ids()
+# loaded on first use and shared with the other agents
+retriever   = shared_retriever
+# shared registry, supports `in` and follows metadata file changes
+VALID_SERIES = indicator_registry
 
 TOOLS = [
     {
@@ -137,7 +140,7 @@ class FredLLMAgent:
 
     def call_llm(self, messages):
         payload = {"model": self.model, "messages": messages, "tools": TOOLS, "stream": False}
-        return requests.post(self.api_url, json=payload, timeout=600).json()
+        return ollama_client.post(self.api_url, json=payload).json()
 
     # ── date resolution (LLM absolute > LLM relative, NO date_parser) ─────────
     def _resolve_tool_call_dates(self, args):
@@ -3,7 +3,7 @@ llama_api_date_only.py
 Variant: + date_parser   |  - semantic retrieval  |  - self-checks (A / B / C)
 """
 
-import requests
+from http_client import ollama_client
 import json
 import re
 import time
@@ -134,7 +134,7 @@ class FredLLMAgent:
 
     def call_llm(self, messages):
         payload = {"model": self.model, "messages": messages, "tools": TOOLS, "stream": False}
-        return requests.post(self.api_url, json=payload, timeout=600).json()
+        return ollama_client.post(self.api_url, json=payload).json()
 
     # ── date resolution (Priority: date_parser > LLM absolute > LLM relative) ──
     def _resolve_tool_call_dates(self, args, pre_start, pre_end):
@@ -1,21 +1,35 @@
 # self-check version for llama_api.py
-import requests
+from http_client import ollama_client, async_ollama_client
 import re
 from fred_key import fred_key
-from fred_api import load_indicator_metadata, call_fred_api
-from series_retriever import SeriesRetriever
+from fred_api import (load_indicator_metadata, call_fred_api, acall_fred_api, call_fred_api_with_fallback,
+                      acall_fred_api_with_fallback, detailed_analysis)
+from series_retriever import shared_retriever
+from indicator_metadata import indicator_registry
 import json
 from datetime import datetime, timedelta
 from date_parser import parse_date_range
+from fast_path import plan_direct_tool_call, ollama_tool_message
+from prefetch import Prefetch, prefetch_candidates, PREFETCH_SERIES
+from completeness import check_completeness
+from prompt_budget import PROMPT_BUDGET, fit_prompt, get_token_counter
+from wire_format import format_tool_result, DEFAULT_WIRE_FORMAT
+from query_router import get_router, direct_answer_messages, ROUTE_DIRECT, ROUTE_FULL
+from streaming import (event, collect_result, acollect_result, Step, GENERATE, run_pipeline, arun_pipeline,
+                       iter_ollama_chunks, aiter_ollama_chunks)
 from dateutil.relativedelta import relativedelta
 import time
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from few_shot_examples import build_few_shot_messages
 import re
 
 OLLAMA_URL = "http://localhost:11434/api/chat"
 
-retriever = SeriesRetriever()
-VALID_SERIES = retriever.get_all_series_ids()
+# loaded on first use and shared with the other agents
+retriever = shared_retriever
+# shared registry, supports `in` and follows metadata file changes
+VALID_SERIES = indicator_registry
 
 GUIDE_SUFFIX = f"""
 Note: (M)=Monthly, (Q)=Quarterly, (W)=Weekly, (D)=Daily, (Y)=Yearly
@@ -35,12 +49,17 @@ IMPORTANT:
 4. Today is {datetime.today().strftime('%Y-%m-%d')}
 """
 
-def build_indicator_guide(question: str, top_k: int = 8) -> str:
+def build_indicator_guide(question: str, top_k: int = 8, context=None) -> str:
     """
     Dynamically build a prompt section with only the most relevant series
     for the given question, instead of listing all 90+ series every time.
+
+    Args:
+        context: RetrievalContext already computed for this question, retrieved here if None
     """
-    return retriever.build_prompt_section(question, top_k=top_k) + GUIDE_SUFFIX
+    if context is None:
+        context = retriever.build_context(question, top_k=top_k)
+    return context.prompt_section() + GUIDE_SUFFIX
 
 TOOLS = [
     {
@@ -95,44 +114,6 @@ def fix_date_parameters(start_date, end_date):
 
     return start_dt.strftime("%Y-%m-%d"), end_dt.strftime("%Y-%m-%d")
 
-def call_fred_api_with_fallback(series_id, start_date, end_date, max_retries=1, compact_mode=False):
-    """
-    call FRED API, fall back if fail
-    
-    strategy:
-    1. try with original dates
-    2. if no data returns, push start_date 1 year earlier 
-    
-    Args:
-        series_id: FRED series ID
-        start_date
-        end_date
-        max_retries
-    
-    Returns:
-        dict: API results
-    """
-    
-    for attempt in range(max_retries):
-        result = call_fred_api(series_id, start_date, end_date, compact_mode=compact_mode)
-        
-        if result["success"] and result.get("data"):
-            if attempt > 0:
-                print(f"  Retry {attempt} succeeded with date range: {start_date} to {end_date}")
-            return result
-        
-        # fall back
-        if attempt < max_retries - 1:
-            try:
-                start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                start_dt = start_dt - timedelta(days=365)
-                start_date = start_dt.strftime("%Y-%m-%d")
-                print(f"  No data found, retrying with start_date: {start_date}")
-            except:
-                break
-    
-    return result
-
 # relative date resolver e.g.
 # "-1y", "-2y", "-18m", "-6m", "-3y", "today", "now", "-1y6m"
 _REL_PATTERN = re.compile(
@@ -214,25 +195,85 @@ def is_relative_date(value: str) -> bool:
     return resolve_relative_date(value) is not None
 
 class FredLLMAgent:
-    def __init__(self, model="llama3.2", api_url=OLLAMA_URL, verbose=True, top_k=5, few_shot=False):
+    def __init__(self, model="llama3.2", api_url=OLLAMA_URL, verbose=True, top_k=5, few_shot=False, max_workers=4,
+                 fast_path=True, route=False, router=None, prefetch=PREFETCH_SERIES, heuristic_check=True,
+                 prompt_budget=PROMPT_BUDGET, wire_format=DEFAULT_WIRE_FORMAT):
         self.model = model
         self.api_url = api_url
         self.verbose = verbose  # print process or not
         self.top_k = top_k
         self.few_shot = few_shot  # use few-shot prompting for summary generation or not
+        self.max_workers = max_workers  # concurrent FRED fetches per question, 1 runs tool calls sequentially
+        self.fast_path = fast_path  # emit the tool call without the LLM for simple single-series questions
+        # pick direct answer / single series / full pipeline per question, see query_router.py; off until
+        # tests/query_router_evaluation.py has measured it with the real encoder, a wrong "direct" loses the data
+        self.route = route
+        self.router = router  # QueryRouter to use, the shared one trained on data/QA*.json by default
+        self.prefetch = prefetch  # top series fetched while the LLM extracts tool calls, 0 disables, see prefetch.py
+        self.heuristic_check = heuristic_check  # scan the answer before asking the LLM in Check C, see completeness.py
+        self.prompt_budget = prompt_budget  # summarization prompt tokens, None keeps full analyses, see prompt_budget.py
+        self.wire_format = wire_format  # "json" or "terse" tool messages in the summarization prompt, see wire_format.py
         
-    def call_llm(self, messages):
+    def call_llm(self, messages, use_tools=True):
         payload = {
             "model": self.model,
             "messages": messages,
-            "tools": TOOLS,
             "stream": False
         }
+        if use_tools:
+            payload["tools"] = TOOLS
         
-        response = requests.post(self.api_url, json=payload, timeout=600)
+        response = ollama_client.post(self.api_url, json=payload)
         return response.json()
+
+    async def acall_llm(self, messages, use_tools=True):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        }
+        if use_tools:
+            payload["tools"] = TOOLS
+
+        response = await async_ollama_client.post(self.api_url, json=payload)
+        return response.json()
+
+    def stream_llm(self, messages, use_tools=True):
+        """
+        call the LLM through Ollama's streaming API
+
+        Yields:
+            answer text chunks as they are generated
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }
+        if use_tools:
+            payload["tools"] = TOOLS
+
+        response = ollama_client.post(self.api_url, json=payload, stream=True)
+        yield from iter_ollama_chunks(response)
+
+    async def astream_llm(self, messages, use_tools=True):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }
+        if use_tools:
+            payload["tools"] = TOOLS
+
+        async with async_ollama_client.stream("POST", self.api_url, json=payload) as response:
+            async for chunk in aiter_ollama_chunks(response):
+                yield chunk
+
+    def answer_text(self, result):
+        """answer text of a non-streaming LLM response"""
+        return result.get("message", {}).get("content", "No response generated")
     
-    def validate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0):
+    def validate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0, context=None):
         """
         validate tool calls
 
@@ -241,6 +282,7 @@ class FredLLMAgent:
             question
             max_retries: maximum times of retry
             _depth: internal count
+            context: RetrievalContext of the question, reused when re-prompting
 
         Returns:
             tool_calls: list of dict with {series_id, start_date, end_date}
@@ -256,9 +298,23 @@ class FredLLMAgent:
         correction_hint = f"The following series IDs do not exist: {[c['series_id'] for c in invalid]}. Please use only series from the provided list."
 
         # re-call extract_tool_calls()
-        extraction = self.extract_tool_calls(question + f"\n\n[Correction hint: {correction_hint}]")
+        extraction = self.extract_tool_calls(question + f"\n\n[Correction hint: {correction_hint}]", context=context, prefetch=0)
+
+        return self.validate_tool_calls(extraction.get("tool_calls", tool_calls), question, max_retries, _depth + 1, context=context)
+
+    async def avalidate_tool_calls(self, tool_calls, question, max_retries=1, _depth=0, context=None):
+        """validate_tool_calls on the async Ollama client"""
+        invalid = [c for c in tool_calls if c["series_id"] not in VALID_SERIES]
+        if not invalid or _depth >= max_retries:
+            return tool_calls
+        
+        if self.verbose:
+            print(f"  [Check B] Invalid series: {[c['series_id'] for c in invalid]}, re-prompting...")
+        
+        correction_hint = f"The following series IDs do not exist: {[c['series_id'] for c in invalid]}. Please use only series from the provided list."
+        extraction = await self.aextract_tool_calls(question + f"\n\n[Correction hint: {correction_hint}]", context=context, prefetch=0)
 
-        return self.validate_tool_calls(extraction.get("tool_calls", tool_calls), question, max_retries, _depth + 1)
+        return await self.avalidate_tool_calls(extraction.get("tool_calls", tool_calls), question, max_retries, _depth + 1, context=context)
     
     def _resolve_tool_call_dates(self, args, pre_start, pre_end):
         """
@@ -309,23 +365,127 @@ class FredLLMAgent:
         start_date, end_date = fix_date_parameters(start_date, end_date)
         return start_date, end_date
 
-    def extract_tool_calls(self, question, min_similarity=0.35):
+    def extract_tool_calls(self, question, min_similarity=0.35, context=None, fast_path=None, prefetch=None):
         """
         extract tool calls without execution
+
+        Args:
+            question
+            min_similarity: Check A threshold on the best retrieval score
+            context: RetrievalContext of the question; retrieved once here if None and
+                     shared by Check A, the indicator guide and logging
+            fast_path: overrides self.fast_path for this question (the router disables it on the full route)
+            prefetch: overrides self.prefetch for this question
         
         Returns:
             dict: {
                 "success": bool,
                 "tool_calls": list of dict with {series_id, start_date, end_date},
+                "prefetch": Prefetch of the series fetched during the LLM call (if any, pass it to execute_tool_calls),
                 "raw_response": dict,
                 "error": str (if failed)
             }
         """
+        extraction, request = self._prepare_extraction(question, min_similarity, context, fast_path)
+        if extraction is not None:
+            return extraction
+
+        # the LLM call is the slow part, fetch the likely series meanwhile
+        prefetch = self._start_prefetch(request, self.prefetch if prefetch is None else prefetch)
+
+        try:
+            result = self.call_llm(request["messages"])
+            extraction = self._parse_extraction(result, request)
+
+            # Check B: make sure the series ids are available
+            # otherwise reprompt with a correction hint and ask llm to regenerate the parameters
+            if extraction.get("tool_calls"):
+                extraction["tool_calls"] = self.validate_tool_calls(
+                    extraction["tool_calls"], question, context=request["context"]
+                )
+            
+        except Exception as e:
+            extraction = {
+                "success": False,
+                "error": str(e),
+                "raw_response": None
+            }
+
+        return self._attach_prefetch(extraction, prefetch)
+
+    async def aextract_tool_calls(self, question, min_similarity=0.35, context=None, fast_path=None, prefetch=None):
+        """
+        extract_tool_calls on the async Ollama client, retrieval runs in a worker thread
+        """
+        extraction, request = await asyncio.to_thread(
+            self._prepare_extraction, question, min_similarity, context, fast_path
+        )
+        if extraction is not None:
+            return extraction
+
+        prefetch = self._start_prefetch(request, self.prefetch if prefetch is None else prefetch, run_async=True)
+
+        try:
+            result = await self.acall_llm(request["messages"])
+            extraction = self._parse_extraction(result, request)
+
+            if extraction.get("tool_calls"):
+                extraction["tool_calls"] = await self.avalidate_tool_calls(
+                    extraction["tool_calls"], question, context=request["context"]
+                )
+
+        except Exception as e:
+            extraction = {
+                "success": False,
+                "error": str(e),
+                "raw_response": None
+            }
+
+        return self._attach_prefetch(extraction, prefetch)
+
+    def _start_prefetch(self, request, n, run_async=False):
+        """
+        speculatively fetch the top-n retrieved series for the date range parsed from the question;
+        the LLM keeps the parsed range (see _resolve_tool_call_dates), so a pick among them matches
 
+        Returns:
+            Prefetch, None when there is nothing to prefetch
+        """
+        candidates = prefetch_candidates(request["context"], request["pre_start"], request["pre_end"], n)
+        if not candidates:
+            return None
+
+        if self.verbose:
+            print(f"  [Prefetch] fetching {', '.join(c[0] for c in candidates)} during tool extraction")
+
+        # fetched the way _pipeline executes tool calls: no fallback, compact only above 2 calls
+        prefetch = Prefetch(use_fallback=False, compact_mode=False)
+        if run_async:
+            return prefetch.create_tasks(acall_fred_api, candidates)
+        return prefetch.submit(call_fred_api, candidates)
+
+    def _attach_prefetch(self, extraction, prefetch):
+        """hand the prefetch on to execute_tool_calls, or cancel it when there is nothing to execute"""
+        if prefetch is not None:
+            if extraction.get("tool_calls"):
+                extraction["prefetch"] = prefetch
+            else:
+                prefetch.cancel()
+        return extraction
+
+    def _prepare_extraction(self, question, min_similarity, context, fast_path):
+        """
+        everything before the extraction LLM call: retrieval, Check A, date parsing and the fast path
+
+        Returns:
+            (extraction, None) when no LLM call is needed,
+            otherwise (None, {"messages", "context", "pre_start", "pre_end"})
+        """
         # before calling the LLM,  a semantic retriever is used to find the top-k most relevant series for the given question, 
         # and only those are passed into the prompt.
-        relevant = retriever.retrieve(question, top_k=self.top_k)
-        top_score = relevant[0]["similarity"] if relevant else 0
+        if context is None:
+            context = retriever.build_context(question, top_k=self.top_k)
+        top_score = context.top_score
 
         # Check A:
         # if the maximum similarity score is too low, indicating that the question may lie outside the scope of the data
@@ -338,7 +498,7 @@ class FredLLMAgent:
                 "success": False,
                 "error": f"No relevant FRED series found (best score: {top_score:.3f}). "
                         f"This question may be outside FRED's coverage."
-            }
+            }, None
 
         # pre-parse date range from question before calling LLM
         pre_start, pre_end = parse_date_range(question)
@@ -349,13 +509,34 @@ class FredLLMAgent:
             else:
                 print(f"  [DateParser] No unambiguous date found, LLM will decide")
 
+        # fast path: one decisive series and an explicit date range need no LLM round trip
+        if fast_path is None:
+            fast_path = self.fast_path
+        if fast_path:
+            direct = plan_direct_tool_call(question, context, (pre_start, pre_end), VALID_SERIES)
+            if direct:
+                if self.verbose:
+                    print(f"  [FastPath] {direct['series_id']} ({direct['reason']}), skipping LLM tool extraction")
+                call = {
+                    "tool_call_id": "call_0",
+                    "series_id": direct["series_id"],
+                    "start_date": direct["start_date"],
+                    "end_date": direct["end_date"]
+                }
+                return {
+                    "success": True,
+                    "tool_calls": [call],
+                    "assistant_message": ollama_tool_message(call, call["tool_call_id"]),
+                    "fast_path": True,
+                    "raw_response": None
+                }, None
+
         # build dynamic indicator guide for llm
-        guide = build_indicator_guide(question, top_k=self.top_k)
+        guide = build_indicator_guide(question, top_k=self.top_k, context=context)
 
         if self.verbose:
             print(f"\n  [Retriever] top-{self.top_k} series for this question:")
-            relevant = retriever.retrieve(question, top_k=self.top_k)
-            for s in relevant:
+            for s in context.results:
                 print(f"    [{s['similarity']:.3f}] {s['SERIES']}: {s['INDICATOR']}")
 
         messages = [
@@ -368,105 +549,194 @@ class FredLLMAgent:
                 "content": question
             }
         ]
-        
-        try:
-            result = self.call_llm(messages)
+        return None, {"messages": messages, "context": context, "pre_start": pre_start, "pre_end": pre_end}
 
-            if "message" not in result:
-                return {
-                    "success": False,
-                    "error": "No message in LLM response",
-                    "raw_response": result
-                }
-            
-            assistant_message = result["message"]
-            
-            if "tool_calls" not in assistant_message:
-                return {
-                    "success": True,
-                    "tool_calls": [],
-                    "direct_answer": assistant_message.get("content", ""),
-                    "raw_response": result
-                }
-            
-            extracted_calls = []
-            for tool_call in assistant_message["tool_calls"]:
-                args = tool_call["function"]["arguments"]
+    def _parse_extraction(self, result, request):
+        """
+        turn the extraction LLM response into tool calls with resolved dates (before Check B)
+        """
+        if "message" not in result:
+            return {
+                "success": False,
+                "error": "No message in LLM response",
+                "raw_response": result
+            }
+        
+        assistant_message = result["message"]
+        
+        if "tool_calls" not in assistant_message:
+            return {
+                "success": True,
+                "tool_calls": [],
+                "direct_answer": assistant_message.get("content", ""),
+                "raw_response": result
+            }
+        
+        extracted_calls = []
+        for tool_call in assistant_message["tool_calls"]:
+            args = tool_call["function"]["arguments"]
+
+            start_date, end_date = self._resolve_tool_call_dates(
+                args, request["pre_start"], request["pre_end"]
+            )
+
+            extracted_calls.append({
+                "tool_call_id": tool_call.get("id", f"call_{len(extracted_calls)}"),
+                "series_id": args.get("series_id", "").strip(),
+                "start_date": start_date,
+                "end_date": end_date
+            })
 
-                start_date, end_date = self._resolve_tool_call_dates(
-                    args, pre_start, pre_end
-                )
+        return {
+            "success": True,
+            "tool_calls": extracted_calls,
+            "raw_response": result
+        }
+    
+    def _execute_tool_call(self, idx, call, use_fallback, use_compact, prefetch=None):
+        """
+        fetch and analyze a single tool call
 
-                extracted_calls.append({
-                    "tool_call_id": tool_call.get("id", f"call_{len(extracted_calls)}"),
-                    "series_id": args.get("series_id", "").strip(),
-                    "start_date": start_date,
-                    "end_date": end_date
-                })
+        Returns:
+            dict with API result, its tool_call_id and the time spent in seconds
+        """
+        call_start = time.time()
+        series_id = call["series_id"]
+        start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
+        end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
+        tool_call_id = call.get("tool_call_id", f"call_{idx}")
 
-            # Check B: make sure the series ids are available
-            # otherwise reprompt with a correction hint and ask llm to regenerate the parameters
-            extracted_calls = self.validate_tool_calls(extracted_calls, question)
-            
+        if not series_id:
             return {
-                "success": True,
-                "tool_calls": extracted_calls,
-                "raw_response": result
+                "success": False,
+                "error": "No series_id provided",
+                "tool_call_id": tool_call_id
             }
-            
-        except Exception as e:
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
+
+        pending = prefetch.take(series_id, start_date, end_date, use_fallback, use_compact) if prefetch else None
+        if pending is not None:
+            # copied, the prefetched dict is shared with whoever else holds the future
+            api_result = dict(pending.result())
+            api_result["prefetched"] = True
+        elif use_fallback:
+            api_result = call_fred_api_with_fallback(
+                series_id, start_date, end_date, 
+                compact_mode=use_compact
+            )
+        else:
+            api_result = call_fred_api(
+                series_id, start_date, end_date,
+                compact_mode=use_compact
+            )
+
+        api_result["tool_call_id"] = tool_call_id
+        api_result["fetch_time"] = round(time.time() - call_start, 3)
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} done in {api_result['fetch_time']:.2f}s"
+                  f"{' (prefetched)' if api_result.get('prefetched') else ''}")
+
+        return api_result
+
+    async def _aexecute_tool_call(self, idx, call, use_fallback, use_compact, prefetch=None):
+        """_execute_tool_call on the async FRED client"""
+        call_start = time.time()
+        series_id = call["series_id"]
+        start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
+        end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
+        tool_call_id = call.get("tool_call_id", f"call_{idx}")
+
+        if not series_id:
             return {
                 "success": False,
-                "error": str(e),
-                "raw_response": None
+                "error": "No series_id provided",
+                "tool_call_id": tool_call_id
             }
-    
-    def execute_tool_calls(self, tool_calls, use_fallback=False):
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
+
+        pending = prefetch.take(series_id, start_date, end_date, use_fallback, use_compact) if prefetch else None
+        if pending is not None:
+            api_result = dict(await pending)
+            api_result["prefetched"] = True
+        else:
+            fetch = acall_fred_api_with_fallback if use_fallback else acall_fred_api
+            api_result = await fetch(series_id, start_date, end_date, compact_mode=use_compact)
+
+        api_result["tool_call_id"] = tool_call_id
+        api_result["fetch_time"] = round(time.time() - call_start, 3)
+
+        if self.verbose:
+            print(f"  Tool call {idx + 1}: {series_id} done in {api_result['fetch_time']:.2f}s"
+                  f"{' (prefetched)' if api_result.get('prefetched') else ''}")
+
+        return api_result
+
+    def execute_tool_calls(self, tool_calls, use_fallback=False, prefetch=None):
         """
         execute tool calls and return results
+
+        tool calls are fanned out over a thread pool of at most `self.max_workers` threads,
+        results keep the order of `tool_calls`
         
         Args:
             tool_calls: list of dict with {series_id, start_date, end_date}
             use_fallback: whether use fall back or not
+            prefetch: Prefetch from extract_tool_calls, matching calls take its results,
+                      the rest of it is cancelled
         
         Returns:
             list of dict with API results
         """
-        results = []
-        # use compact summary mode for multiple tool calls to save tokens
+        # use compact summary mode for multiple tool calls to save tokens; with a prompt budget
+        # fit_prompt upgrades the series it keeps at the detailed level
         use_compact = len(tool_calls) > 2
-    
-        for idx, call in enumerate(tool_calls):
-            series_id = call["series_id"]
-            start_date = call["start_date"] or (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
-            end_date = call["end_date"] or datetime.today().strftime("%Y-%m-%d")
-            
-            if not series_id:
-                results.append({
-                    "success": False,
-                    "error": "No series_id provided",
-                    "tool_call_id": call.get("tool_call_id", f"call_{idx}")
-                })
-                continue
-            
-            if self.verbose:
-                print(f"  Tool call {idx + 1}: {series_id} ({start_date} to {end_date})")
-            
-            if use_fallback:
-                api_result = call_fred_api_with_fallback(
-                    series_id, start_date, end_date, 
-                    compact_mode=use_compact
-                )
-            else:
-                api_result = call_fred_api(
-                    series_id, start_date, end_date,
-                    compact_mode=use_compact
-                )
-            
-            api_result["tool_call_id"] = call.get("tool_call_id", f"call_{idx}")
-            results.append(api_result)
+        start_time = time.time()
+
+        if self.max_workers <= 1 or len(tool_calls) <= 1:
+            results = [self._execute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                       for idx, call in enumerate(tool_calls)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tool_calls))) as pool:
+                results = list(pool.map(
+                    lambda item: self._execute_tool_call(item[0], item[1], use_fallback, use_compact, prefetch),
+                    enumerate(tool_calls)
+                ))
+        if prefetch:
+            prefetch.cancel()
+
+        if self.verbose and tool_calls:
+            print(f"  Executed {len(tool_calls)} tool call(s) in {time.time() - start_time:.2f}s")
         
         return results
+
+    async def aexecute_tool_calls(self, tool_calls, use_fallback=False, prefetch=None):
+        """
+        execute_tool_calls on the event loop: the calls run concurrently instead of on a
+        thread pool (still sequentially when max_workers <= 1), results keep their order
+        """
+        use_compact = len(tool_calls) > 2
+        start_time = time.time()
+
+        if self.max_workers <= 1:
+            results = [await self._aexecute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                       for idx, call in enumerate(tool_calls)]
+        else:
+            results = list(await asyncio.gather(*(
+                self._aexecute_tool_call(idx, call, use_fallback, use_compact, prefetch)
+                for idx, call in enumerate(tool_calls)
+            )))
+        if prefetch:
+            prefetch.cancel()
+
+        if self.verbose and tool_calls:
+            print(f"  Executed {len(tool_calls)} tool call(s) in {time.time() - start_time:.2f}s")
+
+        return results
     
     def validate_final_answer_completeness(self, question, final_answer, api_results):
         """
@@ -484,6 +754,48 @@ class FredLLMAgent:
             "gap": "one sentence describing what's missing from the answer, or empty string if complete"
             }}
         """
+        check_result = self.call_llm(self._completeness_messages(question, final_answer, api_results))
+        return self._parse_completeness(check_result)
+
+    async def avalidate_final_answer_completeness(self, question, final_answer, api_results):
+        """validate_final_answer_completeness on the async Ollama client"""
+        check_result = await self.acall_llm(self._completeness_messages(question, final_answer, api_results))
+        return self._parse_completeness(check_result)
+
+    def validate_question_addressed(self, question, final_answer):
+        """
+        the question relevance half of validate_final_answer_completeness, asked when the answer
+        scan already found every series
+
+        Returns:
+            JSON: {{"question_addressed": true/false, "gap": "..."}}
+        """
+        check_result = self.call_llm(self._relevance_messages(question, final_answer), use_tools=False)
+        return self._parse_completeness(check_result)
+
+    async def avalidate_question_addressed(self, question, final_answer):
+        """validate_question_addressed on the async Ollama client"""
+        check_result = await self.acall_llm(self._relevance_messages(question, final_answer), use_tools=False)
+        return self._parse_completeness(check_result)
+
+    def _relevance_messages(self, question, final_answer):
+        verification_prompt = f"""
+        You are reviewing an economic data analysis response.
+
+        Original question: "{question}"
+        Answer provided: "{final_answer[:600]}..."
+
+        Does the answer actually address what was asked in the original question?
+
+        Reply with JSON only, no explanation:
+        {{
+        "question_addressed": true/false,
+        "gap": "one sentence describing what's missing from the answer, or empty string if it is addressed"
+        }}
+        """
+        return [{"role": "user", "content": verification_prompt}]
+
+    def _completeness_messages(self, question, final_answer, api_results):
         series_used = [r["series_id"] for r in api_results if r["success"]]
     
         verification_prompt = f"""
@@ -505,10 +817,9 @@ class FredLLMAgent:
         "gap": "one sentence describing what's missing from the answer, or empty string if complete"
         }}
         """
-        check_result = self.call_llm([
-            {"role": "user", "content": verification_prompt}
-        ])
-        
+        return [{"role": "user", "content": verification_prompt}]
+
+    def _parse_completeness(self, check_result):
         try:
             content = check_result.get("message", {}).get("content", "{}")
             parsed = json.loads(content)
@@ -516,43 +827,129 @@ class FredLLMAgent:
         except:
             return {"complete": True, "missing": [], "question_addressed": True, "gap": ""}
 
-    def process_question(self, question, max_self_check_loop=1):
+    def route_question(self, question):
+        """
+        Returns:
+            "direct", "single" or "full" (see query_router.py), None when routing is off
+        """
+        if not self.route:
+            return None
+        decision = (self.router or get_router()).route(question, VALID_SERIES)
+        if self.verbose:
+            print(f"\n[Router] {decision['route']} (confidence {decision['confidence']:.2f}, {decision['reason']})")
+        return decision["route"]
+
+    def fit_prompt(self, fixed_messages, tool_results, api_results, optional_messages=()):
+        """
+        prompt_budget.fit_prompt with this agent's tokenizer and budget, compact analyses upgraded
+        from the raw observations of `api_results`, logged when verbose
+
+        Returns:
+            (optional messages kept, fitted tool results)
+        """
+        optional_messages, tool_results, report = fit_prompt(
+            fixed_messages, tool_results, self.prompt_budget, get_token_counter(self.model), optional_messages,
+            self.wire_format, detail=lambda i: detailed_analysis(api_results[i])
+        )
+        if self.verbose:
+            levels = ", ".join(f"{r.get('series_id', '?')} {level}" for r, level in zip(api_results, report["levels"]))
+            print(f"  [Budget] {report['tokens']}/{report['budget']} prompt tokens ({report['tokenizer']}): {levels}")
+        return optional_messages, tool_results
+
+    def build_context(self, question):
+        """RetrievalContext of the series relevant to `question`"""
+        return retriever.build_context(question, top_k=self.top_k)
+
+    def process_question(self, question, max_self_check_loop=1, stream=False):
         """
         run complete process: tool calls -> execution -> final answer generation
 
         Args:
             question
             max_self_check_loop: the maximum self-check for final answer when len(tool_calls) > 2
+            stream: return a generator of progress events and answer tokens instead, ending with
+                    the result dict (see streaming.py)
         Returns:
             dict: {
                 "question": str,
                 "tool_calls": list,
                 "api_results": list,
                 "final_answer": str,
+                "route": "direct" / "single" / "full", None when routing is off,
                 "execution_time": float,
                 "success": bool
             }
         """
+        events = run_pipeline(self, self._pipeline(question, max_self_check_loop), stream)
+        return events if stream else collect_result(events)
+
+    async def aprocess_question(self, question, max_self_check_loop=1):
+        """
+        process_question as a coroutine: LLM and FRED requests go through the async clients,
+        so many questions can be answered concurrently on one event loop
+        """
+        return await acollect_result(arun_pipeline(self, self._pipeline(question, max_self_check_loop), False))
+
+    def astream_question(self, question, max_self_check_loop=1):
+        """
+        process_question(stream=True) as an async generator of events
+        """
+        return arun_pipeline(self, self._pipeline(question, max_self_check_loop), True)
+
+    def _pipeline(self, question, max_self_check_loop):
+        """
+        process_question as a generator of events and Steps, driven by
+        streaming.run_pipeline / arun_pipeline
+        """
         if self.verbose:
             print(f"\n{"="*60}")
             print(f"Question: {question}")
             print("="*60)
         
         start_time = time.time()
+
+        # step 0: route the question
+        route = yield Step("route_question", question)
+        if route:
+            yield event("route", route=route)
+
+        if route == ROUTE_DIRECT:
+            # a single LLM call without tools; the retrieved series are still listed so the
+            # model can recommend indicators
+            context = yield Step("build_context", question)
+            messages = direct_answer_messages(question, context, datetime.today().strftime('%Y-%m-%d'))
+            final_answer = yield Step(GENERATE, messages, use_tools=False)
+            if self.verbose:
+                print("\nDirect answer:")
+                print(final_answer)
+
+            yield event("result", result={
+                "question": question,
+                "success": True,
+                "tool_calls": [],
+                "api_results": [],
+                "final_answer": final_answer,
+                "route": route,
+                "execution_time": time.time() - start_time
+            })
+            return
         
         # step 1: parse tool calls
         if self.verbose:
             print("\nstep 1: Extracting tool calls from LLM...")
         
-        extraction = self.extract_tool_calls(question)
+        # questions routed to the full pipeline are never single-series, skip the fast path check
+        extraction = yield Step("extract_tool_calls", question, fast_path=False if route == ROUTE_FULL else None)
         
         if not extraction["success"]:
-            return {
+            yield event("result", result={
                 "question": question,
                 "success": False,
                 "error": extraction.get("error"),
+                "route": route,
                 "execution_time": time.time() - start_time
-            }
+            })
+            return
         
         tool_calls = extraction["tool_calls"]
         
@@ -560,64 +957,81 @@ class FredLLMAgent:
             if self.verbose:
                 print("\nNo tool calls needed. Direct answer:")
                 print(extraction.get("direct_answer", "No response"))
+
+            # already generated by the extraction call
+            if extraction.get("direct_answer"):
+                yield event("token", content=extraction["direct_answer"])
             
-            return {
+            yield event("result", result={
                 "question": question,
                 "success": True,
                 "tool_calls": [],
                 "api_results": [],
                 "final_answer": extraction.get("direct_answer", ""),
+                "route": route,
                 "execution_time": time.time() - start_time
-            }
+            })
+            return
         
         if self.verbose:
             print(f"\nExtracted {len(tool_calls)} tool call(s):")
             for i, call in enumerate(tool_calls):
                 print(f"  {i+1}. series_id={call['series_id']}, "
                       f"dates={call['start_date']} to {call['end_date']}")
+        yield event("tool_calls", tool_calls=tool_calls)
         
         # step 2: run tool calls
         if self.verbose:
             print("\nstep 2: Executing tool calls with auto-fallback...")
         
-        api_results = self.execute_tool_calls(tool_calls, use_fallback=False)
+        api_results = yield Step("execute_tool_calls", tool_calls, use_fallback=False,
+                                 prefetch=extraction.get("prefetch"))
+        yield event("tool_results", api_results=api_results)
         
         # step 3: generate final answer
         if self.verbose:
             print("\nstep 3: Generating final answer...")
         
-        messages = [
-            {
-                "role": "system",
-                "content": f"You are an economic data assistant with access to FRED API. Today is {datetime.today().strftime('%Y-%m-%d')}."
-            }
-        ]
-
-        if self.few_shot:
-            messages.extend(build_few_shot_messages())
-        
-        messages.extend([
+        system_message = {
+            "role": "system",
+            "content": f"You are an economic data assistant with access to FRED API. Today is {datetime.today().strftime('%Y-%m-%d')}."
+        }
+        few_shot_messages = build_few_shot_messages() if self.few_shot else []
+        question_messages = [
             {
                 "role": "user",
                 "content": question
             },
-            extraction["raw_response"]["message"]
-        ])
+            # the fast path builds the assistant message itself, without an LLM response
+            extraction.get("assistant_message") or extraction["raw_response"]["message"]
+        ]
         
-        # add tool responses
-        for idx, result in enumerate(api_results):
+        tool_results = []
+        for result in api_results:
             if result["success"]:
-                tool_result = {
+                tool_results.append({
                     "series_id": result.get("series_id", ""),
                     "indicator": result.get("indicator_name", ""),
                     "units": result.get("units", ""),
                     "analysis": result.get("analysis", {})
-                }
+                })
             else:
-                tool_result = {
+                tool_results.append({
                     "error": result.get("error", "Unknown error")
-                }
+                })
+
+        # fit the analyses (and few-shot examples) into the prompt budget
+        # (a step: upgrading to detailed analyses is CPU-bound)
+        if self.prompt_budget:
+            few_shot_messages, tool_results = yield Step(
+                "fit_prompt",
+                [system_message] + question_messages, tool_results, api_results, few_shot_messages
+            )
 
+        messages = [system_message] + few_shot_messages + question_messages
+
+        # add tool responses
+        for idx, (result, tool_result) in enumerate(zip(api_results, tool_results)):
             if idx == len(api_results) - 1:
                 series_list = ", ".join(r["series_id"] for r in api_results if r["success"])
                 tool_result["reminder"] = (
@@ -629,18 +1043,27 @@ class FredLLMAgent:
             messages.append({
                 "role": "tool",
                 "tool_call_id": result.get("tool_call_id", ""),
-                "content": json.dumps(tool_result, ensure_ascii=False)
+                "content": format_tool_result(tool_result, self.wire_format)
             })
 
-        final_result = self.call_llm(messages)
-
-        final_answer = final_result.get("message", {}).get("content", "No response generated")
+        final_answer = yield Step(GENERATE, messages, use_tools=False)
         
         # Check C:
         # self-check the completeness of the final answer when question involves more than 2 series data
         if len(tool_calls) > 2:
             for _ in range(max_self_check_loop):
-                check = self.validate_final_answer_completeness(question, final_answer, api_results)
+                # the LLM verifier only runs when scanning the answer is inconclusive
+                check = check_completeness(final_answer, api_results) if self.heuristic_check else None
+                if check is None:
+                    check = yield Step("validate_final_answer_completeness", question, final_answer, api_results)
+                else:
+                    if self.verbose:
+                        print(f"    [Check C] Answer scan: {'complete' if check['complete'] else 'missing ' + ', '.join(check['missing_series'])}")
+                    if check["complete"]:
+                        # the scan only covers the data, the LLM still judges whether the question is answered
+                        relevance = yield Step("validate_question_addressed", question, final_answer)
+                        check.update(question_addressed=relevance.get("question_addressed", True),
+                                     gap=relevance.get("gap", ""))
                 if check.get("complete") and check.get("question_addressed"):
                     break
 
@@ -658,8 +1081,8 @@ class FredLLMAgent:
                     "role": "user",
                     "content": missing_calls + gap_hint + f"Please revise your answer to fully address the original question: {question}",
                 })
-                temp = self.call_llm(messages)
-                final_answer = temp.get("message", {}).get("content", "No response generated")
+                yield event("revision", reason=(missing_calls + gap_hint).strip())
+                final_answer = yield Step(GENERATE, messages, use_tools=False)
 
         execution_time = time.time() - start_time
         
@@ -671,15 +1094,16 @@ class FredLLMAgent:
             print(f"\nExecution time: {execution_time:.2f}s")
             print(f"{"="*60}\n")
         
-        return {
+        yield event("result", result={
             "question": question,
             "success": True,
             "tool_calls": tool_calls,
             "api_results": api_results,
             "final_answer": final_answer,
+            "fast_path": extraction.get("fast_path", False),
+            "route": route,
             "execution_time": execution_time
-        }
-
+        })
 
 def process_question(question, model="llama3.2", verbose=True, few_shot=False):
 
@@ -1,9 +1,9 @@
 # applying semantic retriever for llama_api.py
 
-import requests
+from http_client import ollama_client
 from fred_key import fred_key
 from fred_api import load_indicator_metadata, call_fred_api
-from series_retriever import SeriesRetriever
+from series_retriever import shared_retriever
 import json
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
@@ -13,7 +13,8 @@ import re
 
 OLLAMA_URL = "http://localhost:11434/api/chat"
 
-retriever = SeriesRetriever()
+# loaded on first use and shared with the other agents
+retriever = shared_retriever
 
 GUIDE_SUFFIX = f"""
 Note: (M)=Monthly, (Q)=Quarterly, (W)=Weekly, (D)=Daily, (Y)=Yearly
@@ -223,7 +224,7 @@ class FredLLMAgent:
             "stream": False
         }
         
-        response = requests.post(self.api_url, json=payload, timeout=600)
+        response = ollama_client.post(self.api_url, json=payload)
         return response.json()
     
     def _resolve_tool_call_dates(self, args: dict) -> tuple[str, str]:
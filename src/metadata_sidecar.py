@@ -0,0 +1,122 @@
+import os
+from collections.abc import Mapping
+import numpy as np
+
+"""
+Columnar, memory-mapped metadata sidecar for the series index.
+
+Two files next to the index:
+    <base>_meta.npy  NumPy structured array, one record per series sorted by faiss id:
+                     "id" (int64) plus an (offset, length) pair per string column
+    <base>_meta.bin  UTF-8 bytes of all string values
+
+Both are memory-mapped read-only, so loading costs nothing up front, lookups by id are a
+binary search over the mapped ids, and fork-based workers share the same pages. Values are
+only decoded when a field is accessed through a SeriesRow view.
+"""
+
+TEXT_COLUMN = "text"   # embedding text, stored but not exposed as a series field
+
+
+def write_sidecar(base_path, ids, series_list, texts):
+    """
+    Write the sidecar for aligned `ids`, `series_list` (dicts of strings) and embedding `texts`.
+    Files are written under temporary names and swapped in.
+    """
+    columns = []
+    for series in series_list:
+        columns.extend(key for key in series if key not in columns)
+    columns.append(TEXT_COLUMN)
+
+    dtype = [("id", "<i8")] + [(column, "<u8", (2,)) for column in columns]
+    order = np.argsort(np.asarray(ids, dtype="int64"), kind="stable")
+    rows = np.zeros(len(order), dtype=dtype)
+
+    chunks = []
+    offset = 0
+    for row, i in enumerate(order):
+        rows["id"][row] = ids[i]
+        values = dict(series_list[i], **{TEXT_COLUMN: texts[i]})
+        for column in columns:
+            data = str(values.get(column, "")).encode("utf-8")
+            rows[column][row] = (offset, len(data))
+            chunks.append(data)
+            offset += len(data)
+
+    for suffix, write in (("npy", lambda f: np.save(f, rows)), ("bin", lambda f: f.write(b"".join(chunks)))):
+        path = f"{base_path}_meta.{suffix}"
+        with open(path + ".tmp", "wb") as f:
+            write(f)
+        os.replace(path + ".tmp", path)
+
+
+class MetadataSidecar:
+    def __init__(self, base_path):
+        self.rows = np.load(f"{base_path}_meta.npy", mmap_mode="r")
+        blob_path = f"{base_path}_meta.bin"
+        # np.memmap cannot map an empty file
+        if os.path.getsize(blob_path):
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.empty(0, dtype=np.uint8)
+
+        self.ids = self.rows["id"]
+        self.columns = [name for name in self.rows.dtype.names if name != "id"]
+        self.series_columns = tuple(c for c in self.columns if c != TEXT_COLUMN)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def find(self, faiss_id):
+        """row number of `faiss_id`, or None"""
+        row = int(np.searchsorted(self.ids, faiss_id))
+        if row < len(self.ids) and self.ids[row] == faiss_id:
+            return row
+        return None
+
+    def value(self, row, column):
+        offset, length = self.rows[column][row]
+        return self.blob[offset:offset + length].tobytes().decode("utf-8")
+
+    def row(self, row, extra=None):
+        return SeriesRow(self, row, extra)
+
+    def texts(self):
+        return [self.value(row, TEXT_COLUMN) for row in range(len(self))]
+
+    def series(self, row):
+        """full series dict of a row"""
+        return {column: self.value(row, column) for column in self.series_columns}
+
+
+class SeriesRow(Mapping):
+    """
+    Read-only dict-like view of one series; fields are decoded on access.
+    `extra` holds per-result values layered on top (e.g. similarity).
+    """
+    __slots__ = ("_sidecar", "_row", "_extra")
+
+    def __init__(self, sidecar, row, extra=None):
+        self._sidecar = sidecar
+        self._row = row
+        self._extra = extra or {}
+
+    def __getitem__(self, key):
+        if key in self._extra:
+            return self._extra[key]
+        if key in self._sidecar.series_columns:
+            return self._sidecar.value(self._row, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._sidecar.series_columns
+        yield from (key for key in self._extra if key not in self._sidecar.series_columns)
+
+    def __len__(self):
+        return len(set(self._sidecar.series_columns) | set(self._extra))
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"SeriesRow({dict(self)!r})"
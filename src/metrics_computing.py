@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
+import hashlib
 from datetime import datetime
+from collections import deque
 from scipy.signal import find_peaks, argrelextrema
 
 """
@@ -8,15 +10,33 @@ A tool that computes statistical metrics and trend analysis for time series data
 Reduces LLM hallucination by providing factual numerical analysis.
 """
 
+# how far the observation found one calendar year back may lie before the exact
+# anniversary, per FRED frequency code (daily series skip weekends/holidays, weekly
+# dates drift by one weekday per year); None means the tolerance is inferred from the data
+YOY_TOLERANCE = {
+    "d": pd.Timedelta(days=4),
+    "w": pd.Timedelta(days=6),
+    "bw": pd.Timedelta(days=13),
+    "m": pd.Timedelta(0),
+    "q": pd.Timedelta(0),
+    "sa": pd.Timedelta(0),
+    "a": pd.Timedelta(0),
+}
+
 class TimeSeriesAnalyzer:
-    def __init__(self, data):
+    def __init__(self, data, frequency=None):
         """
         Args:
             data: list of dicts with "date" and "value" keys
                   Example: [{"date": "2024-01-01", "value": "100.5"}, ...]
+            frequency: FRED frequency code of the series ("D", "W", "M", "Q", "A"), used to
+                       align year-over-year changes on the calendar
         """
         self.data = data.copy()
+        self.frequency = frequency.lower() if frequency else None
         self.df = self._parse_json()
+        self._date_str = None
+        self._yoy_idx = None
     
     def _parse_json(self):
         """parse JSON into DataFrame"""
@@ -131,113 +151,159 @@ class TimeSeriesAnalyzer:
             "assessment": "increased" if recent_volatility > earlier_volatility * 1.2 else "decreased" if recent_volatility < earlier_volatility * 0.8 else "stable"
         }
     
+    def _date_strings(self):
+        """all index dates formatted as YYYY-MM-DD in one bulk call, cached"""
+        if self._date_str is None:
+            self._date_str = np.asarray(self.df.index.strftime("%Y-%m-%d"))
+        return self._date_str
+
+    @staticmethod
+    def _pct_change(values, base_idx):
+        """
+        vectorized percentage change of `values` against `values[base_idx]`
+
+        Args:
+            values: array of observations
+            base_idx: array of base positions, -1 where there is no base observation
+
+        Returns:
+            (absolute, percentage): float arrays, NaN where there is no base or the base is 0
+        """
+        valid = base_idx >= 0
+        base = np.where(valid, values[np.where(valid, base_idx, 0)], np.nan)
+        absolute = values - base
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentage = np.where(base != 0, absolute / base * 100, np.nan)
+        return absolute, percentage
+
+    def _mom_base_index(self):
+        """position of the previous observation for every point (-1 for the first one)"""
+        return np.arange(len(self.df)) - 1
+
+    def _yoy_tolerance(self):
+        if self.frequency in YOY_TOLERANCE:
+            return YOY_TOLERANCE[self.frequency]
+        # unknown frequency: accept up to half the typical spacing between observations
+        if len(self.df) < 2:
+            return pd.Timedelta(0)
+        return pd.Series(self.df.index).diff().median() / 2
+
+    def _yoy_base_index(self):
+        """
+        position of the observation one calendar year earlier for every point (-1 if none),
+        found with a single backward as-of merge and cached
+        """
+        if self._yoy_idx is None:
+            n = len(self.df)
+            targets = pd.DataFrame({"target": self.df.index - pd.DateOffset(years=1)})
+            bases = pd.DataFrame({"base_date": self.df.index, "base_idx": np.arange(n)})
+            merged = pd.merge_asof(
+                targets, bases,
+                left_on="target", right_on="base_date",
+                direction="backward", tolerance=self._yoy_tolerance()
+            )
+            self._yoy_idx = merged["base_idx"].fillna(-1).to_numpy(dtype=int)
+        return self._yoy_idx
+
+    def _largest_changes(self, values, base_idx, percentage):
+        """records of the largest increase and decrease in `percentage`, None if all NaN"""
+        if np.all(np.isnan(percentage)):
+            return None
+
+        dates = self._date_strings()
+        records = []
+        for idx in (np.nanargmax(percentage), np.nanargmin(percentage)):
+            records.append({
+                "date": str(dates[idx]),
+                "percentage": round(float(percentage[idx]), 2),
+                "from_value": float(values[base_idx[idx]]),
+                "to_value": float(values[idx])
+            })
+        return records
+
     def get_notable_periods(self):
         """get notable periods by identifying the greatest MoM and YoY increase and decrease"""
         if len(self.df) < 2:
             return {}
 
         values = self.df["value"].values
-        dates = self.df.index
         
         notable = {}
         
         # find the greatest MoM increase and decrease
-        if len(values) > 1:
-            mom_changes = [(values[i] - values[i-1]) / values[i-1] * 100 
-                          for i in range(1, len(values)) if values[i-1] != 0]
-            if mom_changes:
-                max_increase_idx = np.argmax(mom_changes) + 1
-                max_decrease_idx = np.argmin(mom_changes) + 1
-                
-                notable["largest_mom_increase"] = {
-                    "date": dates[max_increase_idx].strftime("%Y-%m-%d"),
-                    "percentage": round(float(mom_changes[max_increase_idx-1]), 2),
-                    "from_value": float(values[max_increase_idx-1]),
-                    "to_value": float(values[max_increase_idx])
-                }
-                
-                notable["largest_mom_decrease"] = {
-                    "date": dates[max_decrease_idx].strftime("%Y-%m-%d"),
-                    "percentage": round(float(mom_changes[max_decrease_idx-1]), 2),
-                    "from_value": float(values[max_decrease_idx-1]),
-                    "to_value": float(values[max_decrease_idx])
-                }
+        mom_idx = self._mom_base_index()
+        _, mom_pct = self._pct_change(values, mom_idx)
+        mom = self._largest_changes(values, mom_idx, mom_pct)
+        if mom:
+            notable["largest_mom_increase"], notable["largest_mom_decrease"] = mom
         
         # find the greatest YoY increase and decrease
-        if len(values) > 12:
-            yoy_changes = [(values[i] - values[i-12]) / values[i-12] * 100 
-                          for i in range(12, len(values)) if values[i-12] != 0]
-            if yoy_changes:
-                max_yoy_increase_idx = np.argmax(yoy_changes) + 12
-                max_yoy_decrease_idx = np.argmin(yoy_changes) + 12
-                
-                notable["largest_yoy_increase"] = {
-                    "date": dates[max_yoy_increase_idx].strftime("%Y-%m-%d"),
-                    "percentage": round(float(yoy_changes[max_yoy_increase_idx-12]), 2),
-                    "from_value": float(values[max_yoy_increase_idx-12]),
-                    "to_value": float(values[max_yoy_increase_idx])
-                }
-                
-                notable["largest_yoy_decrease"] = {
-                    "date": dates[max_yoy_decrease_idx].strftime("%Y-%m-%d"),
-                    "percentage": round(float(yoy_changes[max_yoy_decrease_idx-12]), 2),
-                    "from_value": float(values[max_yoy_decrease_idx-12]),
-                    "to_value": float(values[max_yoy_decrease_idx])
-                }
+        yoy_idx = self._yoy_base_index()
+        _, yoy_pct = self._pct_change(values, yoy_idx)
+        yoy = self._largest_changes(values, yoy_idx, yoy_pct)
+        if yoy:
+            notable["largest_yoy_increase"], notable["largest_yoy_decrease"] = yoy
         
         return notable
+
+    def detect_inflections(self, inflection_prominence=None):
+        """
+        Returns:
+            (peaks_idx, troughs_idx): positions of peaks and troughs, empty with fewer than 5 points
+        """
+        if len(self.df) < 5:
+            return np.array([], dtype=int), np.array([], dtype=int)
+
+        values = self.df["value"].values
+        if inflection_prominence is None:
+            inflection_prominence = self.df["value"].std() * 0.25
+
+        peaks_idx, _ = find_peaks(values, prominence=inflection_prominence)
+        troughs_idx, _ = find_peaks(-values, prominence=inflection_prominence)
+        return peaks_idx, troughs_idx
     
-    def generate_integrated_timeseries(self, include_inflections=True, inflection_prominence=None):
+    def _integrated_points(self, indices, inflection_types):
+        """build the integrated data point dicts (value, MoM, YoY, inflection) for the given positions"""
         values = self.df["value"].values
-        dates = self.df.index
-        
-        integrated_data = []
-        
-        # inflection point check
-        inflection_dates = {}
-        if include_inflections and len(self.df) >= 5:
-            if inflection_prominence is None:
-                inflection_prominence = self.df["value"].std() * 0.25
-            
-            peaks_idx, _ = find_peaks(values, prominence=inflection_prominence)
-            troughs_idx, _ = find_peaks(-values, prominence=inflection_prominence)
-            
-            for idx in peaks_idx:
-                inflection_dates[dates[idx].strftime("%Y-%m-%d")] = "peak"
-            for idx in troughs_idx:
-                inflection_dates[dates[idx].strftime("%Y-%m-%d")] = "trough"
+        dates = self._date_strings()
+
+        mom_abs, mom_pct = self._pct_change(values, self._mom_base_index())
+        yoy_abs, yoy_pct = self._pct_change(values, self._yoy_base_index())
         
-        # go through all the dates to integrate data
-        for i in range(len(values)):
-            date_str = dates[i].strftime("%Y-%m-%d")
-            
+        # MoM / YoY are only emitted where the base observation exists and is non-zero
+        has_mom = ~np.isnan(mom_pct)
+        has_yoy = ~np.isnan(yoy_pct)
+
+        points = []
+        for i in indices:
             data_point = {
-                "date": date_str,
+                "date": str(dates[i]),
                 "value": float(values[i])
             }
-            
-            # MoM
-            if i >= 1 and values[i-1] != 0:
-                data_point["mom_absolute"] = round(float(values[i] - values[i-1]), 2)
-                data_point["mom_percentage"] = round(float((values[i] - values[i-1]) / values[i-1] * 100), 2)
-            # else:
-            #     data_point["mom_absolute"] = None
-            #     data_point["mom_percentage"] = None
-            
-            # YoY
-            if i >= 12 and values[i-12] != 0:
-                data_point["yoy_absolute"] = round(float(values[i] - values[i-12]), 2)
-                data_point["yoy_percentage"] = round(float((values[i] - values[i-12]) / values[i-12] * 100), 2)
-            # else:
-            #     data_point["yoy_absolute"] = None
-            #     data_point["yoy_percentage"] = None
-            
-            # inflection point target
-            data_point["inflection_type"] = inflection_dates.get(date_str, None)
-            
-            integrated_data.append(data_point)
+            if has_mom[i]:
+                data_point["mom_absolute"] = round(float(mom_abs[i]), 2)
+                data_point["mom_percentage"] = round(float(mom_pct[i]), 2)
+            if has_yoy[i]:
+                data_point["yoy_absolute"] = round(float(yoy_abs[i]), 2)
+                data_point["yoy_percentage"] = round(float(yoy_pct[i]), 2)
+
+            data_point["inflection_type"] = inflection_types[i]
+            points.append(data_point)
         
-        return integrated_data
+        return points
+
+    def _inflection_types(self, include_inflections=True, inflection_prominence=None):
+        """array with "peak" / "trough" / None for every point"""
+        inflection_types = np.full(len(self.df), None, dtype=object)
+        if include_inflections:
+            peaks_idx, troughs_idx = self.detect_inflections(inflection_prominence)
+            inflection_types[peaks_idx] = "peak"
+            inflection_types[troughs_idx] = "trough"
+        return inflection_types
+
+    def generate_integrated_timeseries(self, include_inflections=True, inflection_prominence=None):
+        inflection_types = self._inflection_types(include_inflections, inflection_prominence)
+        return self._integrated_points(range(len(self.df)), inflection_types)
     
     def generate_summary(self,
                             include_full_timeseries=False,
@@ -258,14 +324,6 @@ class TimeSeriesAnalyzer:
         basic_stats = self.calculate_basic_stats()
         changes = self.calculate_changes()
         trend = self.assess_trend()
-        volatility = self.detect_volatility_changes()
-        notable = self.get_notable_periods()
-        
-        # generate complete time series data
-        full_timeseries = self.generate_integrated_timeseries(
-            include_inflections=include_inflections,
-            inflection_prominence=inflection_prominence
-        )
         
         # COMPACT SUMMARY: only return most important information
         if compact_mode:
@@ -285,6 +343,9 @@ class TimeSeriesAnalyzer:
             }
             return summary
         
+        volatility = self.detect_volatility_changes()
+        notable = self.get_notable_periods()
+
         # DETAILED SUMMARY
         summary = {
             # 1. overview
@@ -341,30 +402,36 @@ class TimeSeriesAnalyzer:
         
         # add inflection information
         if include_inflections:
-            peaks = [d for d in full_timeseries if d["inflection_type"] == "peak"]
-            troughs = [d for d in full_timeseries if d["inflection_type"] == "trough"]
+            dates = self._date_strings()
+            peaks_idx, troughs_idx = self.detect_inflections(inflection_prominence)
             
             summary["inflection_points"] = {
-                "total_count": len(peaks) + len(troughs),
+                "total_count": len(peaks_idx) + len(troughs_idx),
                 "peaks": {
-                    "count": len(peaks),
-                    "dates": [p["date"] for p in peaks]
+                    "count": len(peaks_idx),
+                    "dates": dates[peaks_idx].tolist()
                 },
                 "troughs": {
-                    "count": len(troughs),
-                    "dates": [t["date"] for t in troughs]
+                    "count": len(troughs_idx),
+                    "dates": dates[troughs_idx].tolist()
                 },
                 "most_recent_inflection": None
             }
             
-            # find the most recent inflection 
-            all_inflections = sorted(peaks + troughs, key=lambda x: x["date"], reverse=True)
-            if all_inflections:
-                summary["inflection_points"]["most_recent_inflection"] = all_inflections[0]
+            # find the most recent inflection (the index is sorted by date)
+            if len(peaks_idx) or len(troughs_idx):
+                latest_idx = int(max(np.max(peaks_idx, initial=-1), np.max(troughs_idx, initial=-1)))
+                inflection_types = self._inflection_types(include_inflections, inflection_prominence)
+                summary["inflection_points"]["most_recent_inflection"] = self._integrated_points(
+                    [latest_idx], inflection_types
+                )[0]
         
-        # optional: include all data
+        # optional: include all data (only built when it is emitted)
         if include_full_timeseries:
-            summary["full_timeseries"] = full_timeseries
+            summary["full_timeseries"] = self.generate_integrated_timeseries(
+                include_inflections=include_inflections,
+                inflection_prominence=inflection_prominence
+            )
         
         return summary
     
@@ -376,3 +443,195 @@ class TimeSeriesAnalyzer:
         summary = self.generate_summary()
         print(summary)
 
+
+
+def _update_digest(digest, date, value):
+    digest.update(f"{date}\x1f{value}\x1e".encode())
+
+
+class IncrementalTimeSeriesAnalyzer:
+    """
+    Running sufficient statistics of a time series that are updated in O(1) per appended point.
+
+    Produces the same compact summary as TimeSeriesAnalyzer.generate_summary(compact_mode=True)
+    without re-parsing or re-scanning the history when new observations arrive.
+    Observations must be appended in date order. A digest of every consumed (date, value)
+    pair is kept, so a revised or re-fetched history is not mistaken for the consumed one.
+    """
+    def __init__(self, window=6):
+        """
+        Args:
+            window: rolling window used for the volatility statistics
+        """
+        self.window = window
+
+        self.count = 0              # valid (numeric) observations
+        self.raw_count = 0          # observations consumed, including non-numeric ones
+        self.earliest_raw_date = None
+        self.last_raw_date = None
+        self._digest = hashlib.blake2b(digest_size=16)   # of the consumed (date, value) pairs
+        self.earliest = None
+        self.latest = None
+        self.max = None
+        self.min = None
+
+        # Welford mean / variance of the values
+        self.mean = 0.0
+        self._m2 = 0.0
+        # running co-moments of (position, value) for the regression slope and correlation
+        self._mean_x = 0.0
+        self._m2_x = 0.0
+        self._c_xy = 0.0
+
+        # first window (frozen once full) and the trailing values needed for recent rolling stds
+        self._first_window = []
+        self._recent = deque(maxlen=2 * window - 1)
+
+    def append(self, date, value):
+        """add one observation; non-numeric values are counted as consumed but otherwise skipped"""
+        if self.raw_count == 0:
+            self.earliest_raw_date = date
+        self.raw_count += 1
+        self.last_raw_date = date
+        _update_digest(self._digest, date, value)
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        if value != value:  # NaN
+            return
+
+        point = {"value": value, "date": date}
+        x = float(self.count)
+        self.count += 1
+        n = self.count
+
+        if self.earliest is None:
+            self.earliest = point
+        self.latest = point
+        # strict comparison keeps the first occurrence, like idxmax / idxmin
+        if self.max is None or value > self.max["value"]:
+            self.max = point
+        if self.min is None or value < self.min["value"]:
+            self.min = point
+
+        dy = value - self.mean
+        self.mean += dy / n
+        self._m2 += dy * (value - self.mean)
+
+        dx = x - self._mean_x
+        self._mean_x += dx / n
+        self._m2_x += dx * (x - self._mean_x)
+        self._c_xy += dx * (value - self.mean)
+
+        if len(self._first_window) < self.window:
+            self._first_window.append(value)
+        self._recent.append(value)
+
+    def can_extend(self, observations):
+        """
+        whether `observations` starts with exactly the observations consumed so far,
+        same dates and same values (FRED revises published values, e.g. GDP and PAYEMS)
+        """
+        if self.raw_count == 0 or len(observations) < self.raw_count:
+            return False
+        if (observations[0]["date"] != self.earliest_raw_date
+                or observations[self.raw_count - 1]["date"] != self.last_raw_date):
+            return False
+        digest = hashlib.blake2b(digest_size=16)
+        for obs in observations[:self.raw_count]:
+            _update_digest(digest, obs["date"], obs["value"])
+        return digest.digest() == self._digest.digest()
+
+    def extend(self, observations):
+        """
+        append every observation after the ones already consumed
+
+        Args:
+            observations: the full, date-sorted observation list the state was built from plus new points
+        """
+        for obs in observations[self.raw_count:]:
+            self.append(obs["date"], obs["value"])
+
+    def calculate_basic_stats(self):
+        if self.count == 0:
+            raise ValueError("Input data is empty")
+        return {
+            "max": dict(self.max),
+            "min": dict(self.min),
+            "mean": self.mean,
+            "std": float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else float("nan"),
+            "latest": dict(self.latest),
+            "earliest": dict(self.earliest),
+        }
+
+    def assess_trend(self):
+        """same classification as TimeSeriesAnalyzer.assess_trend, from the running co-moments"""
+        if self.count < 2:
+            return {
+                "trend": "insufficient data",
+                "strength": "N/A",
+                "slope": 0.0,
+                "description": "insufficient data for trend analysis"
+            }
+
+        slope = self._c_xy / self._m2_x
+        # same operation order as np.corrcoef so threshold cases classify identically
+        ddof = self.count - 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = np.float64(self._c_xy / ddof) / np.sqrt(self._m2_x / ddof) / np.sqrt(np.float64(self._m2 / ddof))
+
+        if not np.isfinite(correlation) or abs(correlation) < 0.3:
+            trend = "stable"
+        elif slope > 0:
+            trend = "increasing"
+        else:
+            trend = "decreasing"
+
+        strength = "weak" if abs(correlation) < 0.5 else "moderate" if abs(correlation) < 0.8 else "strong"
+
+        return {
+            "trend": trend,
+            "strength": strength,
+            "slope": round(float(slope), 2),
+            "description": f"{strength} {trend} trend"
+        }
+
+    def detect_volatility_changes(self):
+        """same result as TimeSeriesAnalyzer.detect_volatility_changes for the configured window"""
+        window = self.window
+        if self.count < window * 2:
+            return None
+
+        recent = list(self._recent)
+        recent_volatility = float(np.mean([np.std(recent[i:i + window], ddof=1) for i in range(window)]))
+        earlier_volatility = float(np.std(self._first_window, ddof=1))
+
+        return {
+            "recent_volatility": round(recent_volatility, 2),
+            "earlier_volatility": round(earlier_volatility, 2),
+            "change": round((recent_volatility - earlier_volatility) / earlier_volatility * 100, 2) if earlier_volatility > 0 else 0,
+            "assessment": "increased" if recent_volatility > earlier_volatility * 1.2 else "decreased" if recent_volatility < earlier_volatility * 0.8 else "stable"
+        }
+
+    def generate_compact_summary(self):
+        """same dict as TimeSeriesAnalyzer.generate_summary(compact_mode=True)"""
+        basic_stats = self.calculate_basic_stats()
+        start_val = self.earliest["value"]
+        end_val = self.latest["value"]
+
+        return {
+            "data_points": self.count,
+            "time_range": {
+                "start": self.earliest["date"],
+                "end": self.latest["date"]
+            },
+            "current": basic_stats["latest"],
+            "extremes": {
+                "max": basic_stats["max"],
+                "min": basic_stats["min"]
+            },
+            "trend": self.assess_trend()["description"],
+            "total_change_pct": round((end_val - start_val) / start_val * 100, 2) if start_val != 0 else 'N/A',
+        }
@@ -0,0 +1,252 @@
+import os
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+"""
+A local on-disk store for FRED observations.
+
+Remembers which date range is already held for every (series_id, frequency)
+pair, serves fully covered requests locally and only asks FRED for the
+missing head/tail gaps.
+
+Every pair also has a revision, bumped whenever a write changes or inserts
+observations at or before the last one already held (a head gap, a revised
+value), but not when observations are appended after it. A caller holding
+the observations read at a revision only needs the ones after them as long
+as the revision is unchanged (see get_held).
+"""
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.path.join(_BASE_DIR, "../files/fred_observations.sqlite")
+
+# the tail of a held range (after the last observation) may be missing data that
+# FRED had not published yet, so it is only trusted for this long after the fetch
+TAIL_TTL = timedelta(hours=12)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    series_id TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    value     TEXT NOT NULL,
+    PRIMARY KEY (series_id, frequency, date)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    series_id     TEXT NOT NULL,
+    frequency     TEXT NOT NULL,
+    start_date    TEXT NOT NULL,
+    end_date      TEXT NOT NULL,
+    last_obs_date TEXT,
+    fetched_at    TEXT NOT NULL,
+    revision      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (series_id, frequency)
+);
+"""
+
+def _shift(date_str, days):
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class ObservationStore:
+    def __init__(self, path=STORE_PATH, tail_ttl=TAIL_TTL):
+        """
+        Args:
+            path: SQLite file holding the observations and their covered ranges
+            tail_ttl: how long the range after the last held observation stays trusted
+        """
+        self.path = path
+        self.tail_ttl = tail_ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # stores created before revisions were tracked
+            if "revision" not in [row[1] for row in conn.execute("PRAGMA table_info(coverage)")]:
+                conn.execute("ALTER TABLE coverage ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self):
+        """one transaction on a fresh connection, committed on success and always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_coverage(self, conn, series_id, frequency):
+        row = conn.execute(
+            "SELECT start_date, end_date, last_obs_date, fetched_at FROM coverage "
+            "WHERE series_id = ? AND frequency = ?",
+            (series_id, frequency),
+        ).fetchone()
+        if row is None:
+            return None
+
+        start_date, end_date, last_obs_date, fetched_at = row
+        # an old fetch only vouches for the range up to its last observation
+        if datetime.now() - datetime.fromisoformat(fetched_at) > self.tail_ttl:
+            end_date = min(end_date, last_obs_date or start_date)
+        return start_date, end_date
+
+    def missing_ranges(self, series_id, start_date, end_date, frequency=None):
+        """
+        Compute the date ranges that still have to be fetched from FRED.
+
+        Returns:
+            list of (start_date, end_date) tuples, empty if the request is fully covered
+        """
+        with self._connect() as conn:
+            coverage = self._get_coverage(conn, series_id, frequency or "")
+
+        if coverage is None:
+            return [(start_date, end_date)]
+
+        held_start, held_end = coverage
+        gaps = []
+        # head gap (bridges up to the held range to keep coverage contiguous)
+        if start_date < held_start:
+            gaps.append((start_date, _shift(held_start, -1)))
+        # tail gap
+        if end_date > held_end:
+            gaps.append((_shift(held_end, 1), end_date))
+        return gaps
+
+    def _read(self, conn, series_id, start_date, end_date, frequency, after=None):
+        # the date bound is exclusive when reading after already held observations
+        rows = conn.execute(
+            "SELECT date, value FROM observations "
+            f"WHERE series_id = ? AND frequency = ? AND date {'>' if after else '>='} ? AND date <= ? ORDER BY date",
+            (series_id, frequency or "", after or start_date, end_date),
+        ).fetchall()
+        return [{"date": date, "value": value} for date, value in rows]
+
+    def read(self, series_id, start_date, end_date, frequency=None):
+        """read held observations in [start_date, end_date] as FRED-style dicts"""
+        with self._connect() as conn:
+            return self._read(conn, series_id, start_date, end_date, frequency)
+
+    def read_held(self, series_id, start_date, end_date, frequency=None, after=None):
+        """
+        read held observations in one transaction with the revision they belong to
+
+        Args:
+            after: only read the observations dated after it (the caller holds the earlier ones)
+
+        Returns:
+            (observations, revision)
+        """
+        with self._connect() as conn:
+            observations = self._read(conn, series_id, start_date, end_date, frequency, after)
+            row = conn.execute(
+                "SELECT revision FROM coverage WHERE series_id = ? AND frequency = ?",
+                (series_id, frequency or ""),
+            ).fetchone()
+        return observations, row[0] if row else 0
+
+    def write(self, series_id, start_date, end_date, observations, frequency=None):
+        """store fetched observations and extend the covered range to include [start_date, end_date]"""
+        frequency = frequency or ""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT start_date, end_date, last_obs_date, fetched_at, revision FROM coverage "
+                "WHERE series_id = ? AND frequency = ?",
+                (series_id, frequency),
+            ).fetchone()
+            revision = row[4] if row else 0
+            held_last = (row[2] or row[0]) if row else None
+
+            # observations up to the last held one rewrite history readers may hold, later ones extend it
+            rewritten = [o for o in observations if held_last and o["date"] <= held_last]
+            if rewritten:
+                held = dict(conn.execute(
+                    "SELECT date, value FROM observations "
+                    "WHERE series_id = ? AND frequency = ? AND date BETWEEN ? AND ?",
+                    (series_id, frequency, rewritten[0]["date"], rewritten[-1]["date"]),
+                ).fetchall())
+                if any(held.get(o["date"]) != o["value"] for o in rewritten):
+                    revision += 1
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO observations (series_id, frequency, date, value) VALUES (?, ?, ?, ?)",
+                [(series_id, frequency, o["date"], o["value"]) for o in observations],
+            )
+
+            fetched_at = datetime.now().isoformat()
+            if row is not None:
+                held_start, held_end, held_last_obs, held_fetched_at, _ = row
+                # only a fetch past the last held observation refreshes the tail
+                if end_date < (held_last_obs or held_start):
+                    fetched_at = held_fetched_at
+                start_date, end_date = min(start_date, held_start), max(end_date, held_end)
+
+            last_obs_date = conn.execute(
+                "SELECT MAX(date) FROM observations WHERE series_id = ? AND frequency = ?",
+                (series_id, frequency),
+            ).fetchone()[0]
+
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage "
+                "(series_id, frequency, start_date, end_date, last_obs_date, fetched_at, revision) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (series_id, frequency, start_date, end_date, last_obs_date, fetched_at, revision),
+            )
+
+    def get_observations(self, series_id, start_date, end_date, fetch, frequency=None):
+        """
+        Serve observations from the store, fetching only the missing gaps.
+
+        Args:
+            series_id: FRED series ID
+            start_date: YYYY-MM-DD
+            end_date: YYYY-MM-DD
+            fetch: callable (start_date, end_date) -> (observations, error);
+                   error is None on success
+            frequency: FRED frequency code the observations are aggregated to
+
+        Returns:
+            (observations, error): observations in [start_date, end_date], or None with an error message
+        """
+        observations, _, error = self.get_held(series_id, start_date, end_date, fetch, frequency)
+        return observations, error
+
+    def get_held(self, series_id, start_date, end_date, fetch, frequency=None, after=None):
+        """
+        get_observations that also returns the revision the observations were read at
+
+        Args:
+            after: only return the observations dated after it; they extend the ones the caller
+                   holds if the revision is still the one those were read at
+
+        Returns:
+            (observations, revision, error)
+        """
+        for gap_start, gap_end in self.missing_ranges(series_id, start_date, end_date, frequency):
+            observations, error = fetch(gap_start, gap_end)
+            if error is not None:
+                return None, None, error
+            self.write(series_id, gap_start, gap_end, observations, frequency)
+
+        return *self.read_held(series_id, start_date, end_date, frequency, after), None
+
+    async def aget_observations(self, series_id, start_date, end_date, fetch, frequency=None):
+        """
+        get_observations for asyncio: `fetch` is a coroutine function, SQLite work runs in worker threads
+        """
+        observations, _, error = await self.aget_held(series_id, start_date, end_date, fetch, frequency)
+        return observations, error
+
+    async def aget_held(self, series_id, start_date, end_date, fetch, frequency=None, after=None):
+        """get_held for asyncio, see aget_observations"""
+        gaps = await asyncio.to_thread(self.missing_ranges, series_id, start_date, end_date, frequency)
+        for gap_start, gap_end in gaps:
+            observations, error = await fetch(gap_start, gap_end)
+            if error is not None:
+                return None, None, error
+            await asyncio.to_thread(self.write, series_id, gap_start, gap_end, observations, frequency)
+
+        return *await asyncio.to_thread(self.read_held, series_id, start_date, end_date, frequency, after), None
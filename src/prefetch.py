@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Speculative FRED prefetch: while the LLM extracts tool calls, the top retrieved series are
+already fetched and analyzed for the window parse_date_range found in the question. A tool
+call for exactly the same series and window takes the prefetched result instead of fetching
+again, so for typical single-series questions the FRED latency hides behind the LLM call.
+Fetches the LLM did not pick are cancelled; the ones already running finish in the background
+and leave their observations in the observation store.
+"""
+
+PREFETCH_SERIES = 2   # top retrieved series fetched speculatively
+
+# shared by all agents, a prefetch outlives the extract_tool_calls call that started it
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fred-prefetch")
+
+
+def _retrieve_exception(task):
+    """mark a failed task's exception as retrieved; a taken task still raises it when awaited"""
+    if not task.cancelled():
+        task.exception()
+
+
+def prefetch_candidates(context, start_date, end_date, n=PREFETCH_SERIES):
+    """
+    Args:
+        context: RetrievalContext of the question
+        start_date / end_date: window from parse_date_range, nothing is prefetched without it
+        n: number of top series
+
+    Returns:
+        list of (series_id, start_date, end_date)
+    """
+    if n <= 0 or not (start_date and end_date):
+        return []
+    return [(row["SERIES"], start_date, end_date) for row in context.results[:n]]
+
+
+class Prefetch:
+    def __init__(self, use_fallback=False, compact_mode=False):
+        """
+        Args:
+            use_fallback / compact_mode: how the series are fetched, a tool call executed
+                                         differently does not take the prefetched result
+        """
+        self.use_fallback = use_fallback
+        self.compact_mode = compact_mode
+        # (series_id, start_date, end_date) -> concurrent future or asyncio task
+        self.pending = {}
+
+    def submit(self, fetch, candidates):
+        """start `fetch(series_id, start, end, compact_mode=...)` in background threads"""
+        for series_id, start_date, end_date in candidates:
+            self.pending[(series_id, start_date, end_date)] = _executor.submit(
+                fetch, series_id, start_date, end_date, compact_mode=self.compact_mode
+            )
+        return self
+
+    def create_tasks(self, afetch, candidates):
+        """start coroutine function `afetch` as tasks on the running event loop"""
+        for series_id, start_date, end_date in candidates:
+            task = asyncio.ensure_future(afetch(series_id, start_date, end_date, compact_mode=self.compact_mode))
+            # a failed fetch nobody takes would otherwise log "Task exception was never retrieved"
+            task.add_done_callback(_retrieve_exception)
+            self.pending[(series_id, start_date, end_date)] = task
+        return self
+
+    @property
+    def series(self):
+        return [key[0] for key in self.pending]
+
+    def take(self, series_id, start_date, end_date, use_fallback, compact_mode):
+        """
+        Returns:
+            the pending future / task of exactly this call (each is handed out once),
+            None when it was not prefetched
+        """
+        if (use_fallback, compact_mode) != (self.use_fallback, self.compact_mode):
+            return None
+        return self.pending.pop((series_id, start_date, end_date), None)
+
+    def cancel(self):
+        """cancel the fetches nobody took"""
+        for pending in self.pending.values():
+            pending.cancel()
+        self.pending.clear()
@@ -0,0 +1,205 @@
+import os
+import json
+import threading
+from wire_format import format_tool_result, DEFAULT_WIRE_FORMAT
+
+"""
+Token-budgeted tool results for the summarization prompt.
+
+The prompt is measured with the model's own tokenizer:
+    OpenAI models: tiktoken
+    Ollama models: a HuggingFace tokenizer.json read with `tokenizers`, from
+                   files/tokenizers/<model>/tokenizer.json or $FRED_LLAMA_TOKENIZER
+                   (llama3.2: tokenizer.json of meta-llama/Llama-3.2-3B-Instruct)
+tiktoken is in requirements.txt; the Llama 3.2 tokenizer is gated and does not ship with the
+repo. Without a tokenizer it falls back to a 4 characters per token estimate, the budget is
+approximate, and a warning is printed once per model.
+
+Every tool result starts with its full analysis and is degraded one level at a time,
+detailed -> compact -> headline numbers, always the currently largest result first, until
+the prompt fits the budget; few-shot examples are dropped before any series goes below
+compact. Series are never dropped, the answer has to cover all of them.
+
+Above two tool calls the agents fetch compact analyses and pass `detail`: results are then
+upgraded to their detailed analysis, smallest first, while the prompt still fits, so the full
+analysis only runs for series that are sent at the detailed level. One or two series are
+fetched detailed and degraded from there, which computes every analysis once.
+"""
+
+PROMPT_BUDGET = 3072    # tokens for the summarization prompt; Ollama truncates beyond num_ctx
+LEVELS = ("detailed", "compact", "headline")
+MESSAGE_OVERHEAD = 4    # role and separator tokens per chat message
+REMINDER_TOKENS = 60    # "analyze ALL indicators" reminder added to the last tool result
+
+LLAMA_TOKENIZER_ENV = "FRED_LLAMA_TOKENIZER"
+TOKENIZER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../files/tokenizers")
+
+
+class TokenCounter:
+    def __init__(self, encode, name):
+        """
+        Args:
+            encode: text -> list of token ids
+            name: tokenizer used, for logging
+        """
+        self.encode = encode
+        self.name = name
+
+    def count(self, text):
+        return len(self.encode(text))
+
+
+def _estimate(text):
+    return range((len(text) + 3) // 4)
+
+
+def _tiktoken_counter(model):
+    import tiktoken
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return TokenCounter(encoding.encode, f"tiktoken/{encoding.name}")
+
+
+def _hf_counter(model):
+    path = os.environ.get(LLAMA_TOKENIZER_ENV) or os.path.join(TOKENIZER_DIR, model, "tokenizer.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    from tokenizers import Tokenizer
+    tokenizer = Tokenizer.from_file(path)
+    return TokenCounter(lambda text: tokenizer.encode(text, add_special_tokens=False).ids, f"tokenizers/{model}")
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+def get_token_counter(model):
+    """TokenCounter for `model` (an OpenAI or Ollama model name), built once per model"""
+    with _counters_lock:
+        if model not in _counters:
+            load = _tiktoken_counter if model.startswith(("gpt", "o1", "o3", "o4")) else _hf_counter
+            try:
+                _counters[model] = load(model)
+            except (ImportError, FileNotFoundError) as e:
+                print(f"Warning: no tokenizer for {model} ({e!r}), the prompt budget estimates 4 characters "
+                      f"per token and is approximate; see the Prompt Budget section of the README")
+                _counters[model] = TokenCounter(_estimate, "estimate")
+        return _counters[model]
+
+
+def message_tokens(counter, message):
+    """tokens of one chat message; OpenAI message objects are counted on their JSON"""
+    if not isinstance(message, dict):
+        return counter.count(message.model_dump_json(exclude_none=True)) + MESSAGE_OVERHEAD
+    text = message.get("content") or ""
+    if message.get("tool_calls"):
+        text += json.dumps(message["tool_calls"], ensure_ascii=False, default=str)
+    return counter.count(text) + MESSAGE_OVERHEAD
+
+
+def compact_analysis(analysis):
+    """compact summary of a detailed TimeSeriesAnalyzer summary (same keys as compact_mode=True)"""
+    if "overview" not in analysis:
+        return analysis
+    overview = analysis["overview"]
+    stats = analysis["key_statistics"]
+    trend = analysis["trend_analysis"]
+    return {
+        "data_points": overview["data_points"],
+        "time_range": {"start": overview["time_range"]["start"], "end": overview["time_range"]["end"]},
+        "current": overview["latest_value"],
+        "extremes": {"max": stats["all_time_high"], "min": stats["all_time_low"]},
+        "trend": trend["overall_trend"],
+        "total_change_pct": trend["total_change"]["percentage"],
+    }
+
+
+def headline_analysis(analysis):
+    """latest value, trend and total change only"""
+    compact = compact_analysis(analysis)
+    return {key: compact[key] for key in ("current", "trend", "total_change_pct") if key in compact}
+
+
+def analysis_levels(tool_result):
+    """
+    Returns:
+        list of (level, tool_result) from the richest to the smallest
+    """
+    analysis = tool_result.get("analysis")
+    if not analysis:
+        return [("detailed", tool_result)]
+
+    levels = [("detailed", tool_result)] if "overview" in analysis else []
+    levels.append(("compact", {**tool_result, "analysis": compact_analysis(analysis)}))
+    levels.append(("headline", {**tool_result, "analysis": headline_analysis(analysis)}))
+    return levels
+
+
+def tool_message_tokens(counter, tool_result, wire_format=DEFAULT_WIRE_FORMAT):
+    return counter.count(format_tool_result(tool_result, wire_format)) + MESSAGE_OVERHEAD
+
+
+def fit_prompt(fixed_messages, tool_results, budget, counter, optional_messages=(), wire_format=DEFAULT_WIRE_FORMAT,
+               detail=None):
+    """
+    Args:
+        fixed_messages: messages sent in any case (system prompt, question, assistant tool calls)
+        tool_results: one dict per tool message, with the call_fred_api "analysis"
+        budget: prompt tokens
+        counter: TokenCounter of the model
+        optional_messages: dropped when keeping them would push a series below compact (few-shot examples)
+        wire_format: serialization of the tool messages, see wire_format.py
+        detail: index -> detailed analysis of a compact tool result (None if it has none),
+                only called for results upgraded while the prompt fits with them at compact
+
+    Returns:
+        (optional messages kept, fitted tool results, report {"tokens", "budget", "levels", "tokenizer"})
+    """
+    fixed = sum(message_tokens(counter, m) for m in fixed_messages) + REMINDER_TOKENS
+    optional = sum(message_tokens(counter, m) for m in optional_messages)
+
+    variants = [analysis_levels(result) for result in tool_results]
+    sizes = [[tool_message_tokens(counter, r, wire_format) for _, r in levels] for levels in variants]
+    chosen = [0] * len(tool_results)
+
+    def total():
+        return fixed + sum(s[c] for s, c in zip(sizes, chosen))
+
+    def degrade(floor):
+        # shrink the largest result that can still go down a level, until the prompt fits
+        while total() + optional > budget:
+            candidates = [i for i, levels in enumerate(variants)
+                          if chosen[i] + 1 < len(levels) and LEVELS.index(levels[chosen[i] + 1][0]) <= floor]
+            if not candidates:
+                return
+            i = max(candidates, key=lambda i: sizes[i][chosen[i]])
+            chosen[i] += 1
+
+    def upgrade():
+        # swap compact results for their detailed analysis, smallest first, while the prompt fits
+        for i in sorted((i for i, levels in enumerate(variants) if levels[chosen[i]][0] == "compact"),
+                        key=lambda i: sizes[i][chosen[i]]):
+            analysis = detail(i)
+            if analysis is None:
+                continue
+            levels = analysis_levels({**tool_results[i], "analysis": analysis})
+            size = tool_message_tokens(counter, levels[0][1], wire_format)
+            if total() - sizes[i][chosen[i]] + size + optional > budget:
+                return
+            variants[i], chosen[i] = levels, 0
+            sizes[i] = [size] + [tool_message_tokens(counter, r, wire_format) for _, r in levels[1:]]
+
+    degrade(LEVELS.index("compact"))
+    if detail is not None and total() + optional <= budget:
+        upgrade()
+    if optional_messages and total() + optional > budget:
+        optional_messages, optional = [], 0
+    degrade(LEVELS.index("headline"))
+
+    return list(optional_messages), [variants[i][c][1] for i, c in enumerate(chosen)], {
+        "tokens": total() + optional,
+        "budget": budget,
+        "levels": [variants[i][c][0] for i, c in enumerate(chosen)],
+        "tokenizer": counter.name
+    }
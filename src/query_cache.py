@@ -0,0 +1,109 @@
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+
+"""
+Bounded LRU cache for SeriesRetriever queries.
+
+Keyed on normalized query text, it stores the query embedding and the FAISS
+search results per top_k, so recurring phrasings skip model inference entirely.
+Embeddings can optionally be persisted to disk; search results are kept in
+memory only since they depend on the current index.
+"""
+
+def normalize_query(query: str) -> str:
+    """
+    lowercase, trim and collapse whitespace; the MiniLM tokenizer is uncased, so the
+    normalized text embeds exactly like the original query
+    """
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+class QueryCache:
+    def __init__(self, maxsize=1024, path=None):
+        """
+        Args:
+            maxsize: maximum number of distinct normalized queries kept
+            path: optional pickle file the embeddings are loaded from and saved to
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> {"embedding": vector, "results": {top_k: (scores, indices)}}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                for key, embedding in pickle.load(f).items():
+                    self._entries[key] = {"embedding": embedding, "results": {}}
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get_results(self, key, top_k):
+        """cached (scores, indices) for `key` and `top_k`, or None"""
+        with self._lock:
+            entry = self._touch(key)
+            return entry["results"].get(top_k) if entry else None
+
+    def get_embedding(self, key):
+        with self._lock:
+            entry = self._touch(key)
+            return entry["embedding"] if entry else None
+
+    def put_embedding(self, key, embedding):
+        with self._lock:
+            entry = self._entries.setdefault(key, {"embedding": embedding, "results": {}})
+            entry["embedding"] = embedding
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def put_results(self, key, top_k, scores, indices):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["results"][top_k] = (scores, indices)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear_results(self):
+        """drop cached search results (e.g. after the index changed), embeddings stay valid"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry["results"] = {}
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def save(self):
+        """persist the embeddings to `path` (no-op without a path)"""
+        if not self.path:
+            return
+        with self._lock:
+            embeddings = {key: entry["embedding"] for key, entry in self._entries.items()}
+        with open(self.path, "wb") as f:
+            pickle.dump(embeddings, f)
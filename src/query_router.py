@@ -0,0 +1,156 @@
+import os
+import json
+import threading
+import numpy as np
+from query_cache import normalize_query
+from fast_path import MULTI_SERIES_PATTERN
+from series_retriever import SERIES_ID_PATTERN, get_retriever
+
+"""
+Query router: picks the cheapest strategy that can answer a question.
+
+    direct  no FRED data needed (definitions, recommendations, out of scope, too vague):
+            one LLM call without tools
+    single  one series: fast path or a single LLM tool extraction, then the summary
+    full    several series or analysis: LLM extraction, execution, summary and Check C
+
+The classifier is a similarity-weighted k-nearest-neighbour vote over the embeddings of the
+labelled questions in data/QA*.json, labels derived from their annotations. The labelled
+questions are precomputed in the shared embedding cache and routed questions go through the
+retriever's query cache, so routing a question costs no extra model inference. On top of the vote, rules
+only ever escalate: comparison phrasing or several named series turn `single` into `full`,
+and a vote below the confidence threshold of its route falls back to `full`.
+"""
+
+ROUTE_DIRECT = "direct"
+ROUTE_SINGLE = "single"
+ROUTE_FULL = "full"
+ROUTES = (ROUTE_DIRECT, ROUTE_SINGLE, ROUTE_FULL)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data")
+TRAINING_FILES = ("QA.json", "QA_new.json")
+
+K_NEIGHBORS = 7
+# minimum vote share to take a route; a wrong `direct` loses the data, so it needs more agreement
+MIN_CONFIDENCE = {ROUTE_DIRECT: 0.8, ROUTE_SINGLE: 0.6}
+
+
+def route_label(item) -> str:
+    """route a labelled QA item should take"""
+    if item.get("tool_call_required") is False:
+        return ROUTE_DIRECT
+    if len(item.get("expected_series_ids") or []) == 1:
+        return ROUTE_SINGLE
+    return ROUTE_FULL
+
+
+def load_labelled_questions(files=TRAINING_FILES, exclude=()):
+    """
+    Args:
+        files: QA files in data/, later files win for questions that appear twice
+        exclude: questions to leave out (e.g. a held-out test set)
+
+    Returns:
+        (questions, routes), one entry per distinct normalized question
+    """
+    excluded = {normalize_query(q) for q in exclude}
+    labelled = {}
+    for name in files:
+        with open(os.path.join(DATA_DIR, name), "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                key = normalize_query(item.get("question") or "")
+                if key and key not in excluded:
+                    labelled[key] = route_label(item)
+    return list(labelled), list(labelled.values())
+
+
+class QueryRouter:
+    def __init__(self, encoder, questions, routes, k=K_NEIGHBORS, min_confidence=None, encode_queries=None):
+        """
+        Args:
+            encoder: encoder with the CachedEncoder `encode` contract (normalized vectors)
+            questions / routes: labelled training questions
+            k: neighbours voting on a route
+            min_confidence: {route: minimum vote share}, MIN_CONFIDENCE by default
+            encode_queries: callable with the `encode` contract for the routed questions,
+                            encoder.encode by default
+        """
+        self.encoder = encoder
+        self.encode_queries = encode_queries or encoder.encode
+        self.k = min(k, len(questions))
+        self.min_confidence = dict(MIN_CONFIDENCE, **(min_confidence or {}))
+        self.routes = np.array([ROUTES.index(r) for r in routes], dtype="int64")
+        self.embeddings = encoder.encode([normalize_query(q) for q in questions], batch_size=32)
+
+    @classmethod
+    def from_files(cls, encoder, files=TRAINING_FILES, exclude=(), **kwargs):
+        questions, routes = load_labelled_questions(files, exclude)
+        return cls(encoder, questions, routes, **kwargs)
+
+    def votes(self, question):
+        """similarity-weighted vote share per route"""
+        query = self.encode_queries([normalize_query(question)], batch_size=1)[0]
+        similarity = self.embeddings @ query
+        nearest = np.argpartition(-similarity, self.k - 1)[:self.k]
+        weights = np.clip(similarity[nearest], 1e-6, None)
+        totals = np.bincount(self.routes[nearest], weights=weights, minlength=len(ROUTES))
+        return dict(zip(ROUTES, (totals / totals.sum()).tolist()))
+
+    def route(self, question, valid_series=()):
+        """
+        Args:
+            valid_series: known series IDs, used to count the series a question names
+
+        Returns:
+            dict: {"route", "confidence", "votes", "reason"}
+        """
+        votes = self.votes(question)
+        route = max(votes, key=votes.get)
+        confidence = votes[route]
+        reason = "nearest labelled questions"
+
+        if route != ROUTE_FULL and confidence < self.min_confidence[route]:
+            route, reason = ROUTE_FULL, f"low confidence for {route}"
+        elif route == ROUTE_SINGLE:
+            named = {token for token in SERIES_ID_PATTERN.findall(question) if token in valid_series}
+            if len(named) > 1:
+                route, reason = ROUTE_FULL, "several series named"
+            elif MULTI_SERIES_PATTERN.search(question.lower()):
+                route, reason = ROUTE_FULL, "comparison phrasing"
+
+        return {"route": route, "confidence": round(confidence, 3), "votes": votes, "reason": reason}
+
+
+DIRECT_ANSWER_PROMPT = """You are an economic data assistant with access to FRED API. Today is {today}.
+Answer the question directly, without fetching data.
+- For definitions or how an indicator works, explain it briefly.
+- When asked which data to use, recommend series from the list below by SERIES ID.
+- If the question is outside FRED's coverage (stocks, crypto, state-level or future data), say so.
+- If the question is too vague, ask which indicator and time period they mean.
+
+{indicators}"""
+
+
+def direct_answer_messages(question, context, today):
+    """messages of the direct route; `context` is the RetrievalContext of the question"""
+    return [
+        {"role": "system", "content": DIRECT_ANSWER_PROMPT.format(today=today, indicators=context.prompt_section())},
+        {"role": "user", "content": question},
+    ]
+
+
+_shared_router = None
+_shared_lock = threading.Lock()
+
+def get_router() -> QueryRouter:
+    """
+    Process-wide QueryRouter trained on data/QA*.json; shares the retriever's encoder
+    and embedding cache, and its query cache for the routed questions, built on first use.
+    """
+    global _shared_router
+    if _shared_router is None:
+        with _shared_lock:
+            if _shared_router is None:
+                retriever = get_retriever()
+                _shared_router = QueryRouter.from_files(retriever.model, encode_queries=retriever.encode_queries)
+    return _shared_router
@@ -0,0 +1,502 @@
+import os
+import re
+import json
+import pickle
+import hashlib
+import numpy as np
+import faiss
+from encoders import MODEL_NAME
+from metadata_sidecar import MetadataSidecar, write_sidecar
+from sparse_index import BM25Index
+
+"""
+FAISS index of the series catalog keyed by stable series IDs.
+
+Vectors live under ids derived from the series ID, so series can be added, updated and
+removed in place. A manifest next to the index records the embedding model and the hash
+of the text embedded for every series; `sync` compares it with the current catalog and
+only touches the series whose text changed.
+
+Files (base path files/series_index, generation N):
+    series_index.N.faiss          faiss index, see index types below
+    series_index.N_meta.npy/.bin  columnar metadata sidecar (series fields + embedding text), see metadata_sidecar.py
+    series_index.N_bm25.npz       BM25 postings of the same series, see sparse_index.py
+    series_index_manifest.json    {"generation", "model", "backend", "dimension", "index": {"type", params},
+                                   "series": {SERIES: {"id", "text_hash"}}}
+
+Every save writes a new generation of the index and sidecar files and then swaps the manifest,
+so the manifest is the single pointer readers follow and they always open a matched set. The
+previous generation is kept for readers that opened the old manifest; older ones are deleted.
+Generation 0 is the unversioned layout (series_index.faiss, ...) of earlier versions; it is
+tracked in git, so saves never delete it, the manifest just stops pointing at it.
+
+Loaded read-only (mmap=True, as SeriesRetriever does) both the index and the sidecar stay
+memory-mapped and hits are returned as SeriesRow views; loaded writable the metadata is
+materialized for add/update/remove/sync.
+
+Indexes written by older versions of build_series_index (pickled series_index_meta.pkl,
+plain IndexFlatIP, no manifest) are migrated on load without re-encoding.
+
+Index types (INDEX_TYPES), chosen at build time and recorded in the manifest:
+    flat:  IndexIDMap(IndexFlatIP), exact search, fine up to tens of thousands of series
+    hnsw:  IndexIDMap(IndexHNSWFlat), graph ANN tuned with ef_search; removals rebuild the graph
+    ivfpq: IndexIVFPQ with native ids, compressed codes for very large catalogs, tuned with nprobe;
+           trained on the first batch added: nlist is scaled down to that batch (TRAIN_POINTS_PER_LIST
+           series per list), and below 2**nbits series the PQ codebooks cannot be trained, so the
+           index falls back to flat
+
+A change of model, encoder backend, index type or build parameters makes `sync` rebuild the
+whole index (vectors of unchanged series come from the embedding cache).
+"""
+
+INDEX_BASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../files/series_index")
+
+INDEX_TYPES = {
+    "flat":  {},
+    "hnsw":  {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 1024, "pq_m": 96, "nbits": 8, "nprobe": 16},
+}
+
+# parameters that only affect search and can change without rebuilding the index
+SEARCH_PARAMS = {"nprobe", "ef_search"}
+# faiss k-means wants at least this many training points per centroid
+TRAIN_POINTS_PER_LIST = 39
+
+# read-only memory mapping of the index file (flat codes and IVF lists) where faiss supports it
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def build_text(series: dict) -> str:
+    """
+    Combine all fields into a single string for embedding.
+    Richer text = better retrieval.
+    """
+    period_map = {"M": "Monthly", "Q": "Quarterly", "W": "Weekly", "D": "Daily", "A": "Annual"}
+    period = period_map.get(series.get("PERIOD", ""), series.get("PERIOD", ""))
+
+    return (
+        f"{series['SERIES']}: {series['INDICATOR']}. "
+        f"Category: {series['CATEGORY']} - {series['SUB-CATEGORY']}. "
+        f"Unit: {series['UNITS']}. Frequency: {period}. "
+        f"{series.get('description', '')}"
+    )
+
+
+def series_faiss_id(series_id: str) -> int:
+    """stable non-negative int64 id for a series ID (60 bits of its sha1)"""
+    return int(hashlib.sha1(series_id.encode("utf-8")).hexdigest()[:15], 16)
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def generation_base(base_path, generation):
+    """base path of the index and sidecar files of a generation"""
+    return f"{base_path}.{generation}" if generation else base_path
+
+
+def read_manifest(base_path=INDEX_BASE_PATH):
+    """manifest of the index at `base_path`, {} for legacy indexes without one"""
+    manifest_path = f"{base_path}_manifest.json"
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index_version(base_path=INDEX_BASE_PATH):
+    """changes whenever a save switches the index; the manifest mtime, the index mtime for legacy layouts"""
+    manifest_path = f"{base_path}_manifest.json"
+    if os.path.exists(manifest_path):
+        return os.path.getmtime(manifest_path)
+    return os.path.getmtime(f"{base_path}.faiss")
+
+
+def _generation_files(base_path, generation):
+    files_base = generation_base(base_path, generation)
+    return [f"{files_base}.faiss", f"{files_base}_meta.npy", f"{files_base}_meta.bin", f"{files_base}_bm25.npz",
+            f"{files_base}_meta.pkl"]
+
+
+def _prune_generations(base_path, keep):
+    """
+    delete the files of every numbered generation not in `keep`; generation 0, the unversioned
+    layout tracked in git (files/series_index.faiss, series_index_meta.pkl), is left in place
+    """
+    directory, name = os.path.split(os.path.abspath(base_path))
+    pattern = re.compile(rf"{re.escape(name)}\.(\d+)(?:\.faiss|_meta\.npy|_meta\.bin|_bm25\.npz)$")
+    generations = {int(m.group(1)) for m in map(pattern.match, os.listdir(directory)) if m} - {0}
+    for generation in generations - set(keep):
+        for path in _generation_files(base_path, generation):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # still mapped by a reader on platforms that forbid it, removed by a later save
+                pass
+
+
+def _atomic_write(path, write, mode="wb"):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class SeriesIndex:
+    def __init__(self, dimension, model=MODEL_NAME, backend=None, index_type="flat", **index_params):
+        """
+        Empty index; use SeriesIndex.load for the one on disk.
+
+        Args:
+            index_type: key of INDEX_TYPES
+            index_params: overrides of the INDEX_TYPES defaults (e.g. nlist=4096, ef_search=128)
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}', expected one of {list(INDEX_TYPES)}")
+
+        self.dimension = dimension
+        self.model = model
+        self.backend = backend
+        self.index_type = index_type
+        self.index_params = {**INDEX_TYPES[index_type], **index_params}
+        self.read_only = False
+        self.index = self._new_faiss_index()
+        self.entries = {}   # SERIES -> {"id", "series", "text", "text_hash"}, in insertion order
+        self.by_id = {}     # faiss id -> SERIES
+        self.sidecar = None # set instead of entries when loaded read-only
+        self.files_base = None  # generation files the index was loaded from
+
+    def _new_faiss_index(self):
+        d, p = self.dimension, self.index_params
+        if self.index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(d, p["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = p["ef_construction"]
+            index = faiss.IndexIDMap(hnsw)
+        elif self.index_type == "ivfpq":
+            # IVF lists store ids natively and support removal, no IDMap needed
+            index = faiss.IndexIVFPQ(faiss.IndexFlatIP(d), d, p["nlist"], p["pq_m"], p["nbits"],
+                                     faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIDMap(faiss.IndexFlatIP(d))
+        self._apply_search_params(index)
+        return index
+
+    def _apply_search_params(self, index):
+        params = faiss.ParameterSpace()
+        if self.index_type == "hnsw":
+            params.set_index_parameter(index, "efSearch", self.index_params["ef_search"])
+        elif self.index_type == "ivfpq":
+            params.set_index_parameter(index, "nprobe", self.index_params["nprobe"])
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """
+        Trade recall for latency at query time: nprobe (ivfpq lists visited), ef_search (hnsw beam width).
+        Parameters that do not apply to the index type are ignored.
+        """
+        if nprobe is not None and self.index_type == "ivfpq":
+            self.index_params["nprobe"] = nprobe
+        if ef_search is not None and self.index_type == "hnsw":
+            self.index_params["ef_search"] = ef_search
+        self._apply_search_params(self.index)
+
+    def __len__(self):
+        return len(self.sidecar) if self.sidecar is not None else len(self.entries)
+
+    def __contains__(self, series_id):
+        if self.sidecar is not None:
+            return self.sidecar.find(series_faiss_id(series_id)) is not None
+        return series_id in self.entries
+
+    @classmethod
+    def load(cls, base_path=INDEX_BASE_PATH, mmap=False):
+        """
+        Args:
+            mmap: memory-map the index file read-only instead of reading it into memory
+                  (for serving; an mmapped index cannot be modified)
+        """
+        for attempt in range(2):
+            manifest = read_manifest(base_path)
+            try:
+                return cls._load_generation(generation_base(base_path, manifest.get("generation", 0)),
+                                            manifest, mmap)
+            except FileNotFoundError:
+                # the generation was pruned by two saves since the manifest was read
+                if attempt:
+                    raise
+
+    @classmethod
+    def _load_generation(cls, files_base, manifest, mmap):
+        index = faiss.read_index(f"{files_base}.faiss", MMAP_FLAGS if mmap else 0)
+
+        # legacy indexes were built with MODEL_NAME as flat indexes, the backend is unknown
+        index_config = dict(manifest.get("index", {"type": "flat"}))
+        self = cls(index.d, model=manifest.get("model", MODEL_NAME), backend=manifest.get("backend"),
+                   index_type=index_config.pop("type"), **index_config)
+        self.files_base = files_base
+
+        if os.path.exists(f"{files_base}_meta.npy"):
+            self.index = index
+            self._apply_search_params(index)
+            sidecar = MetadataSidecar(files_base)
+            if mmap:
+                self.read_only = True
+                self.sidecar = sidecar
+                return self
+            ids = [int(i) for i in sidecar.ids]
+            series_list = [sidecar.series(row) for row in range(len(sidecar))]
+            texts = sidecar.texts()
+        else:
+            with open(f"{files_base}_meta.pkl", "rb") as f:
+                meta = pickle.load(f)
+            series_list, texts = meta["series"], meta["texts"]
+            if "ids" in meta:
+                self.index = index
+                self._apply_search_params(index)
+                ids = meta["ids"]
+            else:
+                # legacy IndexFlatIP: positions are ids, move the stored vectors under stable ids
+                ids = [series_faiss_id(s["SERIES"]) for s in series_list]
+                vectors = index.reconstruct_n(0, index.ntotal)
+                self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
+
+        hashes = manifest.get("series", {})
+        for faiss_id, series, text in zip(ids, series_list, texts):
+            text_hash = hashes.get(series["SERIES"], {}).get("text_hash") or hash_text(text)
+            self._set_entry(series, text, text_hash, faiss_id)
+
+        return self
+
+    def _set_entry(self, series, text, text_hash, faiss_id):
+        self.entries[series["SERIES"]] = {"id": faiss_id, "series": series, "text": text, "text_hash": text_hash}
+        self.by_id[faiss_id] = series["SERIES"]
+
+    def add(self, series_list, embeddings):
+        """
+        Add new series with their embeddings (rows aligned with series_list).
+        Series already in the index are rejected, use `update` for those.
+        """
+        if not series_list:
+            return
+        self._check_writable()
+        ids = []
+        for series in series_list:
+            series_id = series["SERIES"]
+            faiss_id = series_faiss_id(series_id)
+            if series_id in self.entries:
+                raise ValueError(f"Series '{series_id}' is already indexed, use update()")
+            if faiss_id in self.by_id:
+                raise ValueError(f"Id collision between '{series_id}' and '{self.by_id[faiss_id]}'")
+            ids.append(faiss_id)
+
+        embeddings = np.array(embeddings, dtype="float32")
+        faiss.normalize_L2(embeddings)
+        if not self.index.is_trained:
+            self._fit_to_catalog(len(embeddings))
+            if not self.index.is_trained:
+                self.index.train(embeddings)
+        self.index.add_with_ids(embeddings, np.array(ids, dtype="int64"))
+
+        for series, faiss_id in zip(series_list, ids):
+            text = build_text(series)
+            self._set_entry(series, text, hash_text(text), faiss_id)
+
+    def _fit_to_catalog(self, n):
+        """size an untrained ivfpq index for its `n` training series, or fall back to flat"""
+        p = self.index_params
+        if n < 2 ** p["nbits"]:
+            print(f"Warning: ivfpq needs at least {2 ** p['nbits']} series to train its codebooks, "
+                  f"got {n}; using a flat index")
+            self.index_type, self.index_params = "flat", dict(INDEX_TYPES["flat"])
+            self.index = self._new_faiss_index()
+            return
+        nlist = max(1, min(p["nlist"], n // TRAIN_POINTS_PER_LIST))
+        if nlist != p["nlist"]:
+            print(f"ivfpq: nlist {p['nlist']} -> {nlist} for {n} series")
+            p["nlist"] = nlist
+            p["nprobe"] = min(p["nprobe"], nlist)
+            self.index = self._new_faiss_index()
+
+    def remove(self, series_ids):
+        """Remove series by ID; unknown IDs are ignored. Returns the number removed."""
+        self._check_writable()
+        ids = [self.entries[s]["id"] for s in series_ids if s in self.entries]
+        if not ids:
+            return 0
+        if self.index_type == "hnsw":
+            self._rebuild_without(ids)
+        else:
+            self.index.remove_ids(np.array(ids, dtype="int64"))
+        for faiss_id in ids:
+            del self.entries[self.by_id.pop(faiss_id)]
+        return len(ids)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Index was loaded memory-mapped (read-only), load it with mmap=False to modify it")
+
+    def _rebuild_without(self, removed_ids):
+        """HNSW graphs do not support deletion: rebuild from the vectors that stay"""
+        stored_ids = faiss.vector_to_array(self.index.id_map)
+        keep = ~np.isin(stored_ids, removed_ids)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)[keep]
+        self.index = self._new_faiss_index()
+        if keep.any():
+            self.index.add_with_ids(vectors, stored_ids[keep])
+
+    def update(self, series_list, embeddings):
+        """Replace the vectors and metadata of existing (or new) series."""
+        self.remove([s["SERIES"] for s in series_list])
+        self.add(series_list, embeddings)
+
+    def _target_config(self, index_type=None, **index_params):
+        """(index type, params) requested by a sync; None keeps the current type and its parameters"""
+        if index_type is None or index_type == self.index_type:
+            return self.index_type, {**self.index_params, **index_params}
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}', expected one of {list(INDEX_TYPES)}")
+        return index_type, {**INDEX_TYPES[index_type], **index_params}
+
+    def needs_rebuild(self, model=MODEL_NAME, backend=None, index_type=None, **index_params):
+        """
+        Whether the vectors or the faiss structure are incompatible with the requested setup:
+        another model or encoder backend, another index type or other build parameters.
+        """
+        target_type, target_params = self._target_config(index_type, **index_params)
+        build_params = {k: v for k, v in self.index_params.items() if k not in SEARCH_PARAMS}
+        target_build = {k: v for k, v in target_params.items() if k not in SEARCH_PARAMS}
+        return (model != self.model
+                or (backend is not None and backend != self.backend)
+                or target_type != self.index_type
+                or target_build != build_params)
+
+    def diff(self, series_list, model=MODEL_NAME, backend=None, index_type=None, **index_params):
+        """
+        Compare the index with a catalog.
+
+        Returns:
+            dict of added / updated / removed / unchanged series ID lists and "rebuild";
+            everything is "updated" when the index has to be rebuilt (see needs_rebuild)
+        """
+        current = {s["SERIES"]: s for s in series_list}
+        rebuild = self.needs_rebuild(model, backend, index_type, **index_params)
+        changes = {"added": [], "updated": [], "removed": [], "unchanged": [], "rebuild": rebuild}
+
+        for series_id, series in current.items():
+            entry = self.entries.get(series_id)
+            if entry is None:
+                changes["added"].append(series_id)
+            elif rebuild or entry["text_hash"] != hash_text(build_text(series)):
+                changes["updated"].append(series_id)
+            else:
+                changes["unchanged"].append(series_id)
+
+        changes["removed"] = [s for s in self.entries if s not in current]
+        return changes
+
+    def sync(self, series_list, encoder, dry_run=False, index_type=None, **index_params):
+        """
+        Bring the index in line with `series_list`, encoding only added and updated series.
+        Unchanged series keep their vectors but pick up metadata-only edits (e.g. units) anyway.
+
+        Args:
+            index_type / index_params: switch the index type or its parameters, None keeps them;
+                                       search-only parameters (nprobe, ef_search) never rebuild
+
+        Returns:
+            dict from `diff`
+        """
+        changes = self.diff(series_list, backend=encoder.name, index_type=index_type, **index_params)
+        if dry_run:
+            return changes
+
+        current = {s["SERIES"]: s for s in series_list}
+        self._check_writable()
+        if changes["rebuild"]:
+            self.index_type, self.index_params = self._target_config(index_type, **index_params)
+            self.index = self._new_faiss_index()
+            self.entries, self.by_id = {}, {}
+        else:
+            self.index_params.update(index_params)
+            self._apply_search_params(self.index)
+            self.remove(changes["removed"])
+
+        changed = [current[s] for s in changes["added"] + changes["updated"]]
+        if changed:
+            embeddings = encoder.encode([build_text(s) for s in changed], batch_size=32)
+            self.update(changed, embeddings)
+
+        for series_id in changes["unchanged"]:
+            self.entries[series_id]["series"] = current[series_id]
+
+        self.model = MODEL_NAME
+        self.backend = encoder.name
+        return changes
+
+    def search(self, query_vecs, top_k):
+        """
+        Returns:
+            (scores, faiss ids) as returned by faiss, ids are -1 past the number of indexed series
+        """
+        return self.index.search(query_vecs, top_k)
+
+    def series_for_id(self, faiss_id, **extra):
+        """
+        Series stored under `faiss_id` with `extra` fields (e.g. similarity) layered on top,
+        or None. Read-only indexes return a SeriesRow view instead of a dict.
+        """
+        if self.sidecar is not None:
+            row = self.sidecar.find(int(faiss_id))
+            return self.sidecar.row(row, extra) if row is not None else None
+        series_id = self.by_id.get(int(faiss_id))
+        return dict(self.entries[series_id]["series"], **extra) if series_id is not None else None
+
+    def iter_series(self):
+        """(faiss id, series) for every indexed series"""
+        if self.sidecar is not None:
+            for row, faiss_id in enumerate(self.sidecar.ids):
+                yield int(faiss_id), self.sidecar.row(row)
+        else:
+            for entry in self.entries.values():
+                yield entry["id"], entry["series"]
+
+    def bm25(self):
+        """BM25Index of the indexed series, read from the saved postings when the generation has them"""
+        if self.files_base is not None and os.path.exists(f"{self.files_base}_bm25.npz"):
+            return BM25Index.load(f"{self.files_base}_bm25.npz")
+        return BM25Index.from_series(self.iter_series())
+
+    def texts(self):
+        """embedding texts of all indexed series"""
+        if self.sidecar is not None:
+            return self.sidecar.texts()
+        return [e["text"] for e in self.entries.values()]
+
+    def save(self, base_path=INDEX_BASE_PATH):
+        """write index and metadata as a new generation, then switch the manifest to it"""
+        self._check_writable()
+        previous = read_manifest(base_path).get("generation", 0)
+        generation = previous + 1
+        files_base = generation_base(base_path, generation)
+        entries = list(self.entries.values())
+        manifest = {
+            "generation": generation,
+            "model": self.model,
+            "backend": self.backend,
+            "dimension": self.dimension,
+            "index": {"type": self.index_type, **self.index_params},
+            "series": {sid: {"id": e["id"], "text_hash": e["text_hash"]} for sid, e in self.entries.items()},
+        }
+
+        write_sidecar(files_base, [e["id"] for e in entries], [e["series"] for e in entries],
+                      [e["text"] for e in entries])
+        BM25Index.from_series((e["id"], e["series"]) for e in entries).save(f"{files_base}_bm25.npz")
+        tmp_path = f"{files_base}.faiss.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, f"{files_base}.faiss")
+        # the switch: readers follow the manifest, so they see either generation complete
+        _atomic_write(f"{base_path}_manifest.json", lambda f: json.dump(manifest, f, indent=2), mode="w")
+
+        _prune_generations(base_path, keep=(previous, generation))
@@ -1,71 +1,286 @@
 import numpy as np
 import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
-import os
+from indicator_metadata import indicator_registry
+from series_index import SeriesIndex, INDEX_BASE_PATH, series_faiss_id, index_version
+from query_cache import QueryCache, normalize_query
+from embedding_cache import CachedEncoder
+import atexit
+import re
+import threading
 
-INDEX_PATH = "series_index"
-MODEL_NAME = "all-MiniLM-L6-v2"
+# upper-case tokens that may be series IDs ("DGS10", "GDP"); lower-case words like "consumer"
+# or "permit" are left to BM25 even though they are IDs too
+SERIES_ID_PATTERN = re.compile(r"\b[A-Z][A-Z0-9]+\b")
+RRF_K = 60
+
+def format_prompt_section(relevant: list[dict]) -> str:
+    """
+    Format retrieved series as the indicator section of the system prompt.
+    """
+    period_map = {"M": "Monthly", "Q": "Quarterly", "W": "Weekly", "D": "Daily", "A": "Annual"}
+
+    lines = [
+        "Relevant FRED Economic Indicators for this query:",
+        "Format: - SERIES ID - Indicator Name - Unit - Frequency",
+    ]
+    for s in relevant:
+        period = period_map.get(s.get("PERIOD", ""), s.get("PERIOD", ""))
+        lines.append(f"- {s['SERIES']} - {s['INDICATOR']} - {s['UNITS']} - {period}")
+
+    return "\n".join(lines)
+
+
+class RetrievalContext:
+    """
+    Retrieval results for one question, computed once per request.
+    """
+    def __init__(self, query: str, results: list[dict], top_k: int):
+        self.query = query
+        self.results = results
+        self.top_k = top_k
+
+    @property
+    def top_score(self) -> float:
+        # hybrid ranking is by fused rank, so the best dense similarity need not come first
+        return max(r["similarity"] for r in self.results) if self.results else 0
+
+    def prompt_section(self) -> str:
+        return format_prompt_section(self.results)
 
-_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class SeriesRetriever:
-    def __init__(self):
-        self.model = SentenceTransformer(MODEL_NAME)
-        self.index = faiss.read_index(os.path.join(_BASE_DIR, f"../files/{INDEX_PATH}.faiss"))
+    def __init__(self, cache_size=1024, cache_path=None, encoder=None, nprobe=None, ef_search=None, mmap=True,
+                 hybrid=True, rrf_k=RRF_K):
+        """
+        Args:
+            cache_size: number of normalized queries whose embeddings and results are cached
+            cache_path: optional file the query embeddings are persisted to at exit
+            encoder: query encoder, defaults to the backend selected by $FRED_ENCODER_BACKEND
+                     (torch SentenceTransformer or the int8 onnx export, see encoders.py)
+            nprobe / ef_search: search-time overrides for ivfpq / hnsw indexes,
+                                None keeps the values recorded when the index was built
+            mmap: memory-map the index file instead of reading it into memory
+            hybrid: fuse BM25 with the dense results and short-circuit exact series-ID mentions,
+                    False gives pure dense retrieval
+            rrf_k: reciprocal-rank fusion constant, larger values flatten the rank weights
+        """
+        # queries precomputed in the shared embedding cache (e.g. the benchmark questions) never
+        # reach the model, which is only loaded on the first miss; new queries are kept in the
+        # bounded query cache only, the embedding cache is read-only here
+        self.model = CachedEncoder(encoder=encoder, store=False)
+
+        self.index_path = INDEX_BASE_PATH
+        self.search_params = {"nprobe": nprobe, "ef_search": ef_search}
+        self.mmap = mmap
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self._index_lock = threading.Lock()
+        self._load_index()
+
+        self.query_cache = QueryCache(maxsize=cache_size, path=cache_path)
+        if cache_path:
+            atexit.register(self.query_cache.save)
+
+    def _index_mtime(self):
+        return index_version(self.index_path)
 
-        with open(os.path.join(_BASE_DIR, f"../files/{INDEX_PATH}_meta.pkl"), "rb") as f:
-            meta = pickle.load(f)
+    def _load_index(self):
+        self.index_mtime = self._index_mtime()
+        series_index = SeriesIndex.load(self.index_path, mmap=self.mmap)
+        series_index.set_search_params(**self.search_params)
+        self.sparse_index = series_index.bm25()
+        self.series_index = series_index
+        print(f"SeriesRetriever loaded: {len(series_index)} series available ({series_index.index_type} index)")
 
-        self.series_list = meta["series"]
-        print(f"SeriesRetriever loaded: {len(self.series_list)} series available")
+    def _refresh_index(self):
+        """
+        Reload the index after a sync rewrote it, so live agents never serve stale vectors.
+        """
+        if self._index_mtime() == self.index_mtime:
+            return
+        with self._index_lock:
+            if self._index_mtime() != self.index_mtime:
+                self._load_index()
+                self.query_cache.clear_results()
+
+    def cache_stats(self):
+        """
+        Query cache hit/miss counters; a hit is a query answered without model inference.
+        """
+        return self.query_cache.stats()
 
     def get_all_series_ids(self):
         """
         Get all series ids.
         """
-        return set([s['SERIES'] for s in self.series_list])
+        return indicator_registry.series_ids()
 
     def retrieve(self, query: str, top_k: int = 8) -> list[dict]:
         """
         Retrieve the most relevant series for a given query.
 
         Returns:
-            list of dicts with series info + similarity score
+            list of dicts with series info + similarity score (dense cosine, 1.0 for exact ID
+            mentions, 0.0 for BM25-only hits) + match ("exact", "hybrid", "dense" or "sparse")
+        """
+        return self.retrieve_batch([query], top_k)[0]
+
+    def retrieve_batch(self, queries: list[str], top_k: int = 8) -> list[list[dict]]:
+        """
+        Retrieve the most relevant series for several queries at once.
+        Queries missing from the query cache are encoded in one batched forward pass
+        and searched with a single FAISS call.
+
+        With hybrid retrieval the dense candidates are fused with BM25 candidates by
+        reciprocal rank; queries naming series IDs (e.g. "DGS10") skip the dense search,
+        the named series come first and BM25 fills the remaining slots.
+
+        Returns:
+            list with one result list (as returned by `retrieve`) per query, in input order
         """
-        query_vec = self.model.encode([query]).astype("float32")
-        faiss.normalize_L2(query_vec)
+        if not queries:
+            return []
+
+        self._refresh_index()
+        series_index = self.series_index
+        sparse_index = self.sparse_index
 
-        scores, indices = self.index.search(query_vec, top_k)
+        exact = [self._exact_hits(series_index, q) for q in queries]
+        depth = max(top_k * 3, 20) if self.hybrid else top_k
 
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            # if score < 0.25:  # skip those with similarity lower than 0.25
-            #     continue
-            series = self.series_list[idx].copy()
-            series["similarity"] = float(score)
-            results.append(series)
+        dense_queries = [i for i, hits in enumerate(exact) if not hits]
+        dense = dict(zip(dense_queries, self._dense_search(series_index, [queries[i] for i in dense_queries], depth)))
 
-        return results
+        batch_results = []
+        for i, query in enumerate(queries):
+            if exact[i]:
+                ranked = [(faiss_id, 1.0, "exact") for faiss_id in exact[i]]
+                _, sparse_ids = sparse_index.search(query, top_k)
+                ranked += [(int(faiss_id), 0.0, "sparse") for faiss_id in sparse_ids if faiss_id not in exact[i]]
+            elif self.hybrid:
+                ranked = self._fuse(dense[i], sparse_index.search(query, depth))
+            else:
+                ranked = [(int(idx), float(score), "dense") for score, idx in zip(*dense[i])]
+
+            results = []
+            for faiss_id, similarity, match in ranked:
+                # if similarity < 0.25:  # skip those with similarity lower than 0.25
+                #     continue
+                # lightweight view over the memory-mapped metadata, fields decode on access
+                series = series_index.series_for_id(faiss_id, similarity=similarity, match=match)
+                if series is None:  # fewer series than top_k (-1)
+                    continue
+                results.append(series)
+                if len(results) == top_k:
+                    break
+            batch_results.append(results)
+
+        return batch_results
+
+    def _exact_hits(self, series_index, query):
+        """faiss ids of series whose ID appears verbatim (upper case) in the query, in query order"""
+        if not self.hybrid:
+            return []
+        hits = []
+        for token in SERIES_ID_PATTERN.findall(query):
+            faiss_id = series_faiss_id(token)
+            if token in series_index and faiss_id not in hits:
+                hits.append(faiss_id)
+        return hits
+
+    def _fuse(self, dense, sparse):
+        """
+        Reciprocal-rank fusion of dense and sparse candidates.
+
+        Returns:
+            [(faiss id, dense similarity or 0.0, match)] best first,
+            match is "hybrid" when both retrievers found the series
+        """
+        fused = {}
+        for source, (scores, ids) in (("dense", dense), ("sparse", sparse)):
+            rank = 0
+            for score, faiss_id in zip(scores, ids):
+                if faiss_id < 0:
+                    continue
+                rank += 1
+                entry = fused.setdefault(int(faiss_id), {"rrf": 0.0, "similarity": 0.0, "sources": []})
+                entry["rrf"] += 1.0 / (self.rrf_k + rank)
+                entry["sources"].append(source)
+                if source == "dense":
+                    entry["similarity"] = float(score)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1]["rrf"], reverse=True)
+        return [(faiss_id, e["similarity"], "hybrid" if len(e["sources"]) == 2 else e["sources"][0])
+                for faiss_id, e in ranked]
+
+    def _dense_search(self, series_index, queries, depth):
+        """
+        FAISS search for `queries`, served from the query cache where possible.
+
+        Returns:
+            list of (scores, faiss ids) per query
+        """
+        if not queries:
+            return []
+
+        keys = [normalize_query(q) for q in queries]
+        searched = [self.query_cache.get_results(key, depth) for key in keys]
+
+        # queries still to search, and the distinct ones among them that need the model
+        pending = [i for i, res in enumerate(searched) if res is None]
+        embeddings = {keys[i]: self.query_cache.get_embedding(keys[i]) for i in pending}
+        to_encode = [key for key, vec in embeddings.items() if vec is None]
+
+        for key in keys:
+            self.query_cache.record(hit=key not in to_encode)
+
+        embeddings.update(self._encode_keys(to_encode))
+
+        if pending:
+            query_vecs = np.stack([embeddings[keys[i]] for i in pending])
+            scores, indices = series_index.search(query_vecs, depth)
+            for row, i in enumerate(pending):
+                searched[i] = (scores[row], indices[row])
+                self.query_cache.put_results(keys[i], depth, scores[row], indices[row])
+
+        return searched
+
+    def _encode_keys(self, keys):
+        """embed normalized queries with the model and keep them in the query cache"""
+        if not keys:
+            return {}
+        encoded = self.model.encode(keys, batch_size=32).astype("float32")
+        faiss.normalize_L2(encoded)
+        for key, vec in zip(keys, encoded):
+            self.query_cache.put_embedding(key, vec)
+        return dict(zip(keys, encoded))
+
+    def encode_queries(self, queries, batch_size=32, **kwargs):
+        """
+        Query embeddings through the query cache, with the encoder `encode` contract, so other
+        components embedding the user question (the query router) share the retriever's inference.
+
+        Returns:
+            float32 array of shape (len(queries), dim), L2-normalized
+        """
+        keys = [normalize_query(q) for q in queries]
+        embeddings = {key: self.query_cache.get_embedding(key) for key in keys}
+        embeddings.update(self._encode_keys([key for key, vec in embeddings.items() if vec is None]))
+        return np.stack([embeddings[key] for key in keys]).astype("float32")
 
     def build_prompt_section(self, query: str, top_k: int = 8) -> str:
         """
         Generate a prompt section with only the relevant series.
         Replaces the full INDICATOR_GUIDE in the system prompt.
         """
-        relevant = self.retrieve(query, top_k)
-
-        period_map = {"M": "Monthly", "Q": "Quarterly", "W": "Weekly", "D": "Daily", "A": "Annual"}
-
-        lines = [
-            "Relevant FRED Economic Indicators for this query:",
-            "Format: - SERIES ID - Indicator Name - Unit - Frequency",
-        ]
-        for s in relevant:
-            period = period_map.get(s.get("PERIOD", ""), s.get("PERIOD", ""))
-            lines.append(f"- {s['SERIES']} - {s['INDICATOR']} - {s['UNITS']} - {period}")
+        return format_prompt_section(self.retrieve(query, top_k))
 
-        return "\n".join(lines)
+    def build_context(self, query: str, top_k: int = 8) -> "RetrievalContext":
+        """
+        Retrieve once for a question and wrap the results for reuse by the relevance gate,
+        the prompt builder and logging.
+        """
+        return RetrievalContext(query, self.retrieve(query, top_k), top_k)
 
     def test_retrieval(self, query: str, top_k: int = 8):
         """
@@ -78,8 +293,36 @@ class SeriesRetriever:
             print(f"{i+1}. [{s['similarity']:.3f}] {s['SERIES']}: {s['INDICATOR']}")
 
 
+_shared_retriever = None
+_shared_lock = threading.Lock()
+
+def get_retriever() -> SeriesRetriever:
+    """
+    Process-wide SeriesRetriever shared by all agents.
+    The model and the FAISS index are loaded once, on first use.
+    """
+    global _shared_retriever
+    if _shared_retriever is None:
+        with _shared_lock:
+            if _shared_retriever is None:
+                _shared_retriever = SeriesRetriever()
+    return _shared_retriever
+
+
+class LazyRetriever:
+    """
+    Module-level stand-in for the shared retriever: importing an agent module costs nothing,
+    the first attribute access loads the shared SeriesRetriever.
+    """
+    def __getattr__(self, name):
+        return getattr(get_retriever(), name)
+
+
+shared_retriever = LazyRetriever()
+
+
 if __name__ == "__main__":
-    retriever = SeriesRetriever()
+    retriever = get_retriever()
 
     # test some queries
     test_queries = [
@@ -93,5 +336,8 @@ if __name__ == "__main__":
         "What's the dollar exchange rate?",
     ]
 
-    for query in test_queries:
-        retriever.test_retrieval(query, top_k=5)
\ No newline at end of file
+    for query, results in zip(test_queries, retriever.retrieve_batch(test_queries, top_k=5)):
+        print(f"\nQuery: {query}")
+        print("-" * 60)
+        for i, s in enumerate(results):
+            print(f"{i+1}. [{s['similarity']:.3f}] {s['SERIES']}: {s['INDICATOR']}")
\ No newline at end of file
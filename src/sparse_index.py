@@ -0,0 +1,138 @@
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+"""
+BM25 inverted index over the series catalog, the sparse half of hybrid retrieval.
+
+Catches what the MiniLM embedding misses: series IDs ("DGS10"), short tickers and acronyms
+("M2", "PCE") and exact terms from indicator names and descriptions. Documents are the
+series ID, indicator name, category and description; ID and indicator tokens are counted
+more than once so a match there outweighs a passing mention in a description.
+
+The postings are flat arrays saved next to the index sidecar (<base>_bm25.npz), so loading
+the index does not tokenize the catalog, and a query only scores the documents in the
+posting lists of its tokens.
+"""
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "has",
+    "have", "how", "in", "is", "it", "its", "me", "of", "on", "or", "over", "s", "show", "since",
+    "than", "that", "the", "this", "to", "was", "were", "what", "whats", "when", "which", "with",
+}
+
+# field -> repetitions in the document
+FIELD_WEIGHTS = {"SERIES": 3, "INDICATOR": 2, "CATEGORY": 1, "SUB-CATEGORY": 1, "description": 1}
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def series_document(series) -> list[str]:
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        tokens.extend(tokenize(str(series.get(field, ""))) * weight)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, documents, doc_ids, k1=1.5, b=0.75):
+        """
+        Args:
+            documents: token list per document
+            doc_ids: id returned for each document (faiss ids for the series index)
+        """
+        postings = defaultdict(lambda: ([], []))
+        for doc, tokens in enumerate(documents):
+            for token, tf in Counter(tokens).items():
+                postings[token][0].append(doc)
+                postings[token][1].append(tf)
+
+        tokens = list(postings)
+        lengths = [len(postings[t][0]) for t in tokens]
+        self._set_arrays(
+            k1, b,
+            doc_ids=np.asarray(doc_ids, dtype="int64"),
+            doc_len=np.array([len(d) for d in documents], dtype="float32"),
+            vocabulary=np.array(tokens, dtype="U"),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype("int64"),
+            docs=np.array([d for t in tokens for d in postings[t][0]], dtype="int64"),
+            tfs=np.array([tf for t in tokens for tf in postings[t][1]], dtype="float32"),
+        )
+
+    def _set_arrays(self, k1, b, doc_ids, doc_len, vocabulary, offsets, docs, tfs):
+        """
+        postings as flat arrays: the documents of vocabulary[i] are docs[offsets[i]:offsets[i + 1]]
+        """
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.doc_ids = doc_ids
+        self.doc_len = doc_len
+        self.avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        n = len(doc_ids)
+        df = np.diff(offsets).astype("float64")
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        self.token_index = {token: i for i, token in enumerate(vocabulary.tolist())}
+
+    @classmethod
+    def from_series(cls, items, **kwargs):
+        """index (doc_id, series mapping) pairs"""
+        doc_ids, documents = [], []
+        for doc_id, series in items:
+            doc_ids.append(doc_id)
+            documents.append(series_document(series))
+        return cls(documents, doc_ids, **kwargs)
+
+    def save(self, path):
+        """write the postings to `path` (.npz), so loading skips tokenizing the catalog"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, k1=self.k1, b=self.b, doc_ids=self.doc_ids, doc_len=self.doc_len,
+                 vocabulary=self.vocabulary, offsets=self.offsets, docs=self.docs, tfs=self.tfs)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        self = cls.__new__(cls)
+        self._set_arrays(arrays.pop("k1"), arrays.pop("b"), **arrays)
+        return self
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query: str, top_k: int):
+        """
+        Scores only the documents in the posting lists of the query tokens.
+
+        Returns:
+            (scores, doc ids) of the best `top_k` documents with a positive score, best first
+        """
+        docs, contributions = [], []
+        for token in set(tokenize(query)):
+            i = self.token_index.get(token)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            token_docs, tfs = self.docs[start:end], self.tfs[start:end]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[token_docs] / self.avg_len)
+            docs.append(token_docs)
+            contributions.append(self.idf[i] * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not docs:
+            return np.zeros(0, dtype="float32"), np.zeros(0, dtype="int64")
+        # sum per candidate document; candidates come out in document order, as ties did before
+        candidates, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype("float32")
+
+        best = np.argsort(-scores, kind="stable")[:top_k]
+        best = best[scores[best] > 0]
+        return scores[best], self.doc_ids[candidates[best]]
@@ -0,0 +1,159 @@
+import json
+import asyncio
+
+"""
+Event stream of the agents' process_question(..., stream=True) and astream_question().
+
+Each event is a dict with a "type":
+    route         {"route"}: query router decision
+    tool_calls    {"tool_calls"}: extracted tool calls, before they are executed
+    tool_results  {"api_results"}: FRED results, before the answer is generated (enough to draw charts)
+    token         {"content"}: next chunk of the answer as the LLM generates it
+    revision      {"reason"}: Check C regenerates the answer, the tokens streamed so far are replaced
+    result        {"result"}: the dict process_question returns without streaming, always last
+
+The pipeline itself is written once per agent as a generator that yields these events and
+Step requests for everything that waits on the network or the encoder. run_pipeline serves
+the steps with the agent's blocking methods, arun_pipeline with their `a`-prefixed coroutines
+(or a worker thread where there is none), so the sync and asyncio pipelines cannot drift apart.
+"""
+
+GENERATE = "generate"   # step producing answer text, streamed as token events when streaming
+
+
+def event(type, **fields):
+    return {"type": type, **fields}
+
+
+def collect_result(events):
+    """run an event stream to the end and return its result"""
+    for item in events:
+        if item["type"] == "result":
+            return item["result"]
+    raise RuntimeError("event stream ended without a result")
+
+
+async def acollect_result(events):
+    """collect_result for an async event stream"""
+    async for item in events:
+        if item["type"] == "result":
+            return item["result"]
+    raise RuntimeError("event stream ended without a result")
+
+
+class Step:
+    """
+    I/O step requested by a pipeline generator: the driver calls the agent method `name`
+    with the given arguments and sends the return value back into the generator.
+    """
+    __slots__ = ("name", "args", "kwargs")
+
+    def __init__(self, name, *args, **kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+
+def run_pipeline(agent, pipeline, stream):
+    """drive `pipeline` with blocking calls, yielding its events"""
+    value = None
+    while True:
+        try:
+            item = pipeline.send(value)
+        except StopIteration:
+            return
+        value = None
+
+        if not isinstance(item, Step):
+            yield item
+        elif item.name != GENERATE:
+            value = getattr(agent, item.name)(*item.args, **item.kwargs)
+        elif not stream:
+            value = agent.answer_text(agent.call_llm(*item.args, **item.kwargs))
+        else:
+            chunks = []
+            for chunk in agent.stream_llm(*item.args, **item.kwargs):
+                chunks.append(chunk)
+                yield event("token", content=chunk)
+            value = "".join(chunks) or "No response generated"
+
+
+async def arun_pipeline(agent, pipeline, stream):
+    """drive `pipeline` on the running event loop, yielding its events"""
+    value = None
+    while True:
+        try:
+            item = pipeline.send(value)
+        except StopIteration:
+            return
+        value = None
+
+        if not isinstance(item, Step):
+            yield item
+        elif item.name != GENERATE:
+            coroutine = getattr(agent, "a" + item.name, None)
+            if coroutine is not None:
+                value = await coroutine(*item.args, **item.kwargs)
+            else:
+                # CPU-bound steps (routing, retrieval) keep the loop free in a worker thread
+                value = await asyncio.to_thread(getattr(agent, item.name), *item.args, **item.kwargs)
+        elif not stream:
+            value = agent.answer_text(await agent.acall_llm(*item.args, **item.kwargs))
+        else:
+            chunks = []
+            async for chunk in agent.astream_llm(*item.args, **item.kwargs):
+                chunks.append(chunk)
+                yield event("token", content=chunk)
+            value = "".join(chunks) or "No response generated"
+
+
+def _ollama_line(line):
+    """(content, done) of one line of an Ollama chat stream"""
+    data = json.loads(line)
+    if "error" in data:
+        raise RuntimeError(data["error"])
+    return data.get("message", {}).get("content"), data.get("done", False)
+
+
+def iter_ollama_chunks(response):
+    """
+    answer text chunks of an Ollama /api/chat response posted with "stream": true
+    (newline-delimited JSON, one message delta per line)
+    """
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            content, done = _ollama_line(line)
+            if content:
+                yield content
+            if done:
+                break
+    finally:
+        response.close()
+
+
+async def aiter_ollama_chunks(response):
+    """iter_ollama_chunks for an httpx streaming response, closed by the caller"""
+    async for line in response.aiter_lines():
+        if not line:
+            continue
+        content, done = _ollama_line(line)
+        if content:
+            yield content
+        if done:
+            break
+
+
+def iter_openai_chunks(stream):
+    """answer text chunks of an OpenAI chat completion created with stream=True"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def aiter_openai_chunks(stream):
+    """iter_openai_chunks for an AsyncOpenAI stream"""
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
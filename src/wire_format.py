@@ -0,0 +1,106 @@
+import json
+
+"""
+Serialization of tool results in the summarization prompt.
+
+    json   json.dumps of the tool result, the default
+    terse  the same content without repeated field names:
+               series_id=UNRATE; indicator=Unemployment Rate; units=Percent
+               data_points=240; time_range.start=2005-01-01; ...; overall_trend=strong increasing trend
+               points: name,date,value
+               latest_value,2024-12-01,4.2
+               points: name,date,percentage,from_value,to_value
+               largest_yoy_increase,2020-04-01,260.53,4.4,14.9
+           scalars become one key=value line (the detailed summary's section names are dropped),
+           every dict with a date (latest value, extremes, notable changes, inflections) becomes
+           a row of a table under a one-line schema header, one table per record shape
+
+Both carry every number of the analysis, so the answer can be checked against the same
+api_results (tests/wire_format_benchmark.py compares tokens and answer factuality).
+"""
+
+WIRE_FORMATS = ("json", "terse")
+DEFAULT_WIRE_FORMAT = "json"
+
+# top-level sections of TimeSeriesAnalyzer.generate_summary whose names add nothing to their keys
+SECTIONS = {"overview", "key_statistics", "trend_analysis"}
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _walk(obj, path, scalars, points):
+    """split a summary into scalar (name, value) pairs and (name, dated record) rows"""
+    if isinstance(obj, dict):
+        if "date" in obj and len(obj) > 1:
+            points.append((path[-1] if path else "point", obj))
+            return
+        for key, value in obj.items():
+            _walk(value, path + [key], scalars, points)
+    elif isinstance(obj, list):
+        if all(not isinstance(v, (dict, list)) for v in obj):
+            scalars.append((path, "|".join(_cell(v) for v in obj)))
+        else:
+            for i, value in enumerate(obj):
+                _walk(value, path[:-1] + [f"{path[-1]}_{i}"] if path else [str(i)], scalars, points)
+    elif obj is not None:
+        scalars.append((path, obj))
+
+
+def _name(path):
+    if len(path) > 1 and path[0] in SECTIONS:
+        path = path[1:]
+    return ".".join(path)
+
+
+def terse_analysis(analysis):
+    """
+    Returns:
+        list of lines: the scalar line and the points tables
+    """
+    scalars, points = [], []
+    _walk(analysis, [], scalars, points)
+
+    lines = []
+    if scalars:
+        lines.append("; ".join(f"{_name(path)}={_cell(value)}" for path, value in scalars))
+    # one table per record shape, so no row carries empty cells
+    tables = {}
+    for name, record in points:
+        columns = ("date",) + tuple(key for key in record if key != "date")
+        tables.setdefault(columns, []).append((name, record))
+    for columns, rows in tables.items():
+        lines.append("points: " + ",".join(("name",) + columns))
+        lines += [",".join([name] + [_cell(record[c]) for c in columns]) for name, record in rows]
+    return lines
+
+
+def to_terse(tool_result):
+    """terse text of a tool result dict (series fields, "analysis", optional "reminder")"""
+    header = "; ".join(f"{key}={_cell(value)}" for key, value in tool_result.items()
+                       if key not in ("analysis", "reminder"))
+    lines = [header] if header else []
+
+    analysis = tool_result.get("analysis")
+    if isinstance(analysis, dict):
+        lines += terse_analysis(analysis)
+    elif analysis:
+        lines.append(f"analysis={_cell(analysis)}")
+
+    if tool_result.get("reminder"):
+        lines.append(tool_result["reminder"])
+    return "\n".join(lines)
+
+
+def format_tool_result(tool_result, wire_format=DEFAULT_WIRE_FORMAT):
+    """content of the tool message for `tool_result`"""
+    if wire_format == "json":
+        return json.dumps(tool_result, ensure_ascii=False)
+    if wire_format == "terse":
+        return to_terse(tool_result)
+    raise ValueError(f"Unknown wire format '{wire_format}', expected one of {WIRE_FORMATS}")
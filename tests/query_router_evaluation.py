@@ -0,0 +1,197 @@
+import json
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from query_router import QueryRouter, ROUTES, ROUTE_DIRECT, ROUTE_SINGLE, ROUTE_FULL, route_label, load_labelled_questions
+from series_retriever import get_retriever
+from indicator_metadata import indicator_registry
+
+"""
+query router evaluation, used to tune query_router.MIN_CONFIDENCE
+
+1. routing: the router is trained on data/QA.json + QA_new.json without the test questions and
+   routes data/QA_test.json; reports accuracy, a confusion matrix, routing latency and a sweep
+   over the confidence thresholds
+2. pipeline (--pipeline llama / gpt): runs process_question on every test question and reports
+   latency and accuracy per route; --no-route runs the unrouted pipeline on the same questions,
+   grouped by the route the router would have picked, as the baseline
+
+accuracy per question:
+    tool call expected: expected series IDs all fetched
+    no tool call expected: no tool call made
+"""
+
+TEST_FILE = Path(__file__).parent.parent / "data" / "QA_test.json"
+
+# (direct, single) vote share thresholds swept
+THRESHOLDS = [(d, s) for d in (0.6, 0.7, 0.8, 0.9) for s in (0.5, 0.6, 0.7, 0.8)]
+
+
+def load_test_cases(path=TEST_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def train_router(test_cases, **kwargs):
+    """router trained on the labelled questions minus the test questions"""
+    exclude = [case["question"] for case in test_cases]
+    return QueryRouter.from_files(get_retriever().model, exclude=exclude, **kwargs)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def evaluate_routing(router, test_cases):
+    """
+    Returns:
+        dataframe with question_id, expected, predicted, confidence, reason, latency_ms
+    """
+    rows = []
+    for case in test_cases:
+        start = time.perf_counter()
+        decision = router.route(case["question"], indicator_registry)
+        latency = (time.perf_counter() - start) * 1000
+        rows.append({
+            "question_id": case["question_id"],
+            "expected": route_label(case),
+            "predicted": decision["route"],
+            "confidence": decision["confidence"],
+            "reason": decision["reason"],
+            "latency_ms": latency
+        })
+    return pd.DataFrame(rows)
+
+
+def print_routing_report(df):
+    accuracy = (df["expected"] == df["predicted"]).mean()
+    # the only costly mistake: a data question answered without data
+    lost = ((df["predicted"] == ROUTE_DIRECT) & (df["expected"] != ROUTE_DIRECT)).sum()
+    saved = (df["predicted"] != ROUTE_FULL).mean()
+
+    print(f"\n{"#"*60}")
+    print("ROUTING")
+    print(f"{"#"*60}")
+    print(f"Routing accuracy:         {accuracy:.3f} ({len(df)} questions)")
+    print(f"Data questions -> direct: {lost}")
+    print(f"Not routed to full:       {saved:.3f}")
+    print("\nConfusion (rows expected, columns predicted):")
+    print(pd.crosstab(df["expected"], df["predicted"]).reindex(index=ROUTES, columns=ROUTES, fill_value=0))
+
+    print("\nPer route:")
+    for route in ROUTES:
+        predicted = df[df["predicted"] == route]
+        expected = df[df["expected"] == route]
+        precision = (predicted["expected"] == route).mean() if len(predicted) else 0.0
+        recall = (expected["predicted"] == route).mean() if len(expected) else 0.0
+        print(f"  {route:<7} precision {precision:.3f}  recall {recall:.3f}  "
+              f"latency mean {predicted["latency_ms"].mean() if len(predicted) else 0:.2f}ms  "
+              f"p95 {percentile(predicted["latency_ms"].tolist(), 95):.2f}ms")
+
+
+def sweep_thresholds(router, test_cases):
+    """routing accuracy and savings for every (direct, single) threshold pair"""
+    rows = []
+    original = dict(router.min_confidence)
+    for direct, single in THRESHOLDS:
+        router.min_confidence.update({ROUTE_DIRECT: direct, ROUTE_SINGLE: single})
+        df = evaluate_routing(router, test_cases)
+        rows.append({
+            "min_direct": direct,
+            "min_single": single,
+            "accuracy": round((df["expected"] == df["predicted"]).mean(), 3),
+            "data_to_direct": int(((df["predicted"] == ROUTE_DIRECT) & (df["expected"] != ROUTE_DIRECT)).sum()),
+            "not_full": round((df["predicted"] != ROUTE_FULL).mean(), 3),
+        })
+    router.min_confidence = original
+
+    print(f"\nThreshold sweep:")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def score_answer(case, result):
+    if not result.get("success"):
+        return 0.0
+    called = {call["series_id"] for call in result.get("tool_calls", [])}
+    if route_label(case) == ROUTE_DIRECT:
+        return float(not called)
+    return float(set(case.get("expected_series_ids", [])) <= called)
+
+
+def evaluate_pipeline(agent, router, test_cases):
+    """
+    Returns:
+        dataframe with question_id, route (taken, or the router's pick for an unrouted agent),
+        expected, score, latency_s, fast_path
+    """
+    rows = []
+    for i, case in enumerate(test_cases, 1):
+        print(f"[{i}/{len(test_cases)}] {case["question"]}")
+        start = time.perf_counter()
+        try:
+            result = agent.process_question(case["question"])
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        latency = time.perf_counter() - start
+
+        route = result.get("route") or router.route(case["question"], indicator_registry)["route"]
+        rows.append({
+            "question_id": case["question_id"],
+            "route": route,
+            "expected": route_label(case),
+            "score": score_answer(case, result),
+            "latency_s": latency,
+            "fast_path": result.get("fast_path", False)
+        })
+    return pd.DataFrame(rows)
+
+
+def print_pipeline_report(df, label):
+    print(f"\n{"#"*60}")
+    print(f"PIPELINE ({label})")
+    print(f"{"#"*60}")
+    summary = df.groupby("route").agg(
+        questions=("score", "size"),
+        accuracy=("score", "mean"),
+        latency_mean_s=("latency_s", "mean"),
+        latency_p95_s=("latency_s", lambda s: percentile(s.tolist(), 95)),
+        fast_path=("fast_path", "mean"),
+    ).reindex(ROUTES).dropna(how="all")
+    print(summary.round(3).to_string())
+    print(f"\nOverall: accuracy {df["score"].mean():.3f}, "
+          f"latency mean {df["latency_s"].mean():.2f}s, total {df["latency_s"].sum():.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipeline", choices=["llama", "gpt"], help="also run the full pipeline")
+    parser.add_argument("--model", default="llama3.2", help="ollama model for --pipeline llama")
+    parser.add_argument("--no-route", action="store_true", help="run the pipeline without the router (baseline)")
+    args = parser.parse_args()
+
+    test_cases = load_test_cases()
+    training, _ = load_labelled_questions(exclude=[case["question"] for case in test_cases])
+    print(f"{len(training)} training questions, {len(test_cases)} test questions")
+
+    router = train_router(test_cases)
+    print_routing_report(evaluate_routing(router, test_cases))
+    sweep_thresholds(router, test_cases)
+
+    if args.pipeline:
+        # the routed agent uses the held-out router as well
+        if args.pipeline == "llama":
+            from llama_api_final import FredLLMAgent
+            agent = FredLLMAgent(model=args.model, verbose=False, route=not args.no_route, router=router)
+        else:
+            from gpt_api_final import OpenAIFredAgent
+            agent = OpenAIFredAgent(verbose=False, route=not args.no_route, router=router)
+
+        df = evaluate_pipeline(agent, router, test_cases)
+        print_pipeline_report(df, "unrouted, grouped by router pick" if args.no_route else "routed")
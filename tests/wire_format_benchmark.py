@@ -0,0 +1,149 @@
+import json
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from wire_format import WIRE_FORMATS, format_tool_result
+from prompt_budget import get_token_counter, MESSAGE_OVERHEAD
+from summary_evaluation import evaluate_summary_factuality
+
+"""
+tool result wire format benchmark (json vs terse, see src/wire_format.py)
+
+1. tokens: serializes the api_results saved by an earlier run (files/<model>/QA_test_*.json)
+   in every wire format and reports tool message tokens per question
+2. pipeline (--pipeline llama / gpt): answers data/QA_test.json once per wire format with the
+   prompt budget off, so only the serialization differs, and reports latency, key fact coverage
+   and hallucination rate (summary_evaluation.evaluate_summary_factuality)
+"""
+
+BASE_DIR = Path(__file__).parent.parent
+TEST_FILE = BASE_DIR / "data" / "QA_test.json"
+SAVED_RESULTS = BASE_DIR / "files" / "llama3.2" / "QA_test_llama_api_final.json"
+
+
+def tool_results_of(api_results):
+    """tool message dicts as the agents build them"""
+    tool_results = []
+    for result in api_results:
+        if result.get("success"):
+            tool_results.append({
+                "series_id": result.get("series_id", ""),
+                "indicator": result.get("indicator_name", ""),
+                "units": result.get("units", ""),
+                "analysis": result.get("analysis", {})
+            })
+        else:
+            tool_results.append({"error": result.get("error", "Unknown error")})
+    return tool_results
+
+
+def count_tokens(results, counter):
+    """
+    Returns:
+        dataframe with question, tool_calls and the tool message tokens per wire format
+    """
+    rows = []
+    for result in results:
+        tool_results = tool_results_of(result.get("api_results") or [])
+        if not tool_results:
+            continue
+        row = {"question": result["question"], "tool_calls": len(tool_results)}
+        for wire_format in WIRE_FORMATS:
+            row[wire_format] = sum(counter.count(format_tool_result(r, wire_format)) + MESSAGE_OVERHEAD
+                                   for r in tool_results)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def print_token_report(df, tokenizer):
+    print(f"\n{"#"*60}")
+    print(f"TOOL MESSAGE TOKENS ({tokenizer}, {len(df)} questions with tool calls)")
+    print(f"{"#"*60}")
+    summary = pd.DataFrame({
+        wire_format: {
+            "mean": df[wire_format].mean(),
+            "median": df[wire_format].median(),
+            "p95": float(np.percentile(df[wire_format], 95)),
+            "total": df[wire_format].sum(),
+            "vs json": df[wire_format].sum() / df["json"].sum(),
+        } for wire_format in WIRE_FORMATS
+    }).T
+    print(summary.round(3).to_string())
+
+
+def evaluate_pipeline(agent, test_cases):
+    """
+    Returns:
+        dataframe with question_id, latency_s, key_fact_coverage, hallucination_rate
+    """
+    rows = []
+    for i, case in enumerate(test_cases, 1):
+        print(f"[{i}/{len(test_cases)}] {case["question"]}")
+        start = time.perf_counter()
+        try:
+            result = agent.process_question(case["question"])
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        latency = time.perf_counter() - start
+
+        row = {"question_id": case["question_id"], "latency_s": latency,
+               "key_fact_coverage": np.nan, "hallucination_rate": np.nan}
+        if result.get("success") and result.get("api_results"):
+            factuality = evaluate_summary_factuality(result["final_answer"], result["api_results"],
+                                                     case.get("key_facts"))
+            row["key_fact_coverage"] = factuality["key_fact_coverage"]
+            row["hallucination_rate"] = factuality["numeric_faithfulness"]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def print_pipeline_report(reports):
+    print(f"\n{"#"*60}")
+    print("PIPELINE")
+    print(f"{"#"*60}")
+    summary = pd.DataFrame({
+        wire_format: {
+            "latency_mean_s": df["latency_s"].mean(),
+            "latency_p95_s": float(np.percentile(df["latency_s"], 95)),
+            "key_fact_coverage": df["key_fact_coverage"].mean(),
+            "hallucination_rate": df["hallucination_rate"].mean(),
+        } for wire_format, df in reports.items()
+    }).T
+    print(summary.round(3).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", default=str(SAVED_RESULTS), help="saved process_question results to count tokens on")
+    parser.add_argument("--pipeline", choices=["llama", "gpt"], help="also answer the test questions in every wire format")
+    parser.add_argument("--model", default="llama3.2", help="ollama model for --pipeline llama")
+    args = parser.parse_args()
+
+    model = "gpt-4o-mini" if args.pipeline == "gpt" else args.model
+    counter = get_token_counter(model)
+    with open(args.results, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    print_token_report(count_tokens(saved, counter), counter.name)
+
+    if args.pipeline:
+        with open(TEST_FILE, "r", encoding="utf-8") as f:
+            test_cases = json.load(f)
+
+        reports = {}
+        for wire_format in WIRE_FORMATS:
+            # no budget: both formats send the same analyses
+            if args.pipeline == "llama":
+                from llama_api_final import FredLLMAgent
+                agent = FredLLMAgent(model=args.model, verbose=False, prompt_budget=None, wire_format=wire_format)
+            else:
+                from gpt_api_final import OpenAIFredAgent
+                agent = OpenAIFredAgent(verbose=False, prompt_budget=None, wire_format=wire_format)
+            reports[wire_format] = evaluate_pipeline(agent, test_cases)
+        print_pipeline_report(reports)
@@ -3,14 +3,42 @@ import json
 import pandas as pd
 import numpy as np
 import os
+import re
 import sys
+import tempfile
+import asyncio
+import gc
+import sqlite3
+import io
+from contextlib import redirect_stdout
+from unittest import mock
+from types import SimpleNamespace
+import faiss
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(base_dir, "../tests"))
 sys.path.insert(0, os.path.join(base_dir, "../src"))
 
 from summary_evaluation import _extract_numbers, _numbers_match, _extract_floats_recursive
-from metrics_computing import TimeSeriesAnalyzer
+from metrics_computing import TimeSeriesAnalyzer, IncrementalTimeSeriesAnalyzer
+from observation_store import ObservationStore
+from indicator_metadata import IndicatorRegistry
+from http_client import HttpClient, AsyncHttpClient
+from query_cache import QueryCache, normalize_query
+from encoders import OnnxEncoder, get_encoder
+from embedding_cache import EmbeddingCache, CachedEncoder
+from series_index import SeriesIndex, series_faiss_id, read_manifest, generation_base
+from metadata_sidecar import MetadataSidecar, SeriesRow, write_sidecar
+from sparse_index import BM25Index, tokenize
+from series_retriever import SeriesRetriever, RetrievalContext
+from fast_path import plan_direct_tool_call
+from query_router import QueryRouter, route_label
+from prefetch import Prefetch, prefetch_candidates
+from completeness import check_completeness
+from prompt_budget import TokenCounter, compact_analysis, fit_prompt, get_token_counter
+from wire_format import format_tool_result
+from streaming import (event, collect_result, acollect_result, Step, GENERATE, run_pipeline, arun_pipeline,
+                       iter_ollama_chunks, aiter_ollama_chunks, iter_openai_chunks)
 from retrieval_accuracy_test import AccuracyEvaluator
 
 class TestExtractNumbers(unittest.TestCase):
@@ -134,6 +162,49 @@ class TestTimeSeriesAnalyzer(unittest.TestCase):
         # MIXED has 6 rows, 1 non-numeric → expect 5 rows
         self.assertEqual(len(analyzer.df), 5)
 
+    def test_notable_periods_skip_zero_base(self):
+        """
+        get_notable_periods should ignore changes from a zero base without shifting dates
+        """
+        data = [
+            {"date": "2024-01-01", "value": "0"},
+            {"date": "2024-02-01", "value": "10"},
+            {"date": "2024-03-01", "value": "15"},
+            {"date": "2024-04-01", "value": "12"},
+        ]
+        notable = TimeSeriesAnalyzer(data).get_notable_periods()
+
+        self.assertEqual(notable["largest_mom_increase"]["date"], "2024-03-01")
+        self.assertEqual(notable["largest_mom_increase"]["percentage"], 50.0)
+        self.assertEqual(notable["largest_mom_decrease"]["date"], "2024-04-01")
+        self.assertEqual(notable["largest_mom_decrease"]["from_value"], 15.0)
+
+    def test_yoy_aligned_on_calendar(self):
+        """
+        year-over-year changes should compare against the same date one year earlier, not 12 points back
+        """
+        quarterly = [{"date": f"{2020 + i // 4}-{3 * (i % 4) + 1:02d}-01", "value": str(100 + i)} for i in range(8)]
+        notable = TimeSeriesAnalyzer(quarterly, frequency="Q").get_notable_periods()
+
+        # 2021-01-01 (104) vs 2020-01-01 (100) is the largest increase
+        self.assertEqual(notable["largest_yoy_increase"]["date"], "2021-01-01")
+        self.assertEqual(notable["largest_yoy_increase"]["from_value"], 100.0)
+        self.assertEqual(notable["largest_yoy_increase"]["percentage"], 4.0)
+
+    def test_yoy_daily_falls_back_to_previous_business_day(self):
+        """
+        daily YoY should use the last observation on or before the anniversary
+        """
+        daily = [
+            {"date": "2023-01-06", "value": "50"},   # Friday
+            {"date": "2023-01-09", "value": "55"},
+            {"date": "2024-01-08", "value": "60"},   # one year later falls on Sunday 2023-01-08
+        ]
+        series = TimeSeriesAnalyzer(daily, frequency="D").generate_integrated_timeseries()
+
+        self.assertEqual(series[2]["yoy_absolute"], 10.0)
+        self.assertNotIn("yoy_absolute", series[1])
+
     def test_generate_summary_compact_keys(self):
         """
         compact summary should contain exactly the expected top-level keys
@@ -147,6 +218,1288 @@ class TestTimeSeriesAnalyzer(unittest.TestCase):
         self.assertNotIn("full_timeseries", summary)
 
 
+class TestIncrementalTimeSeriesAnalyzer(unittest.TestCase):
+
+    def test_compact_summary_matches_full_analysis(self):
+        """
+        incremental compact summary should equal the full analyzer's compact summary
+        """
+        for data in (INCREASING, STABLE, MIXED):
+            incremental = IncrementalTimeSeriesAnalyzer()
+            incremental.extend(data)
+            expected = TimeSeriesAnalyzer(data).generate_summary(compact_mode=True)
+
+            self.assertEqual(incremental.generate_compact_summary(), expected)
+
+    def test_extend_only_consumes_new_points(self):
+        """
+        extending with the grown list should only append the new observations
+        """
+        incremental = IncrementalTimeSeriesAnalyzer()
+        incremental.extend(INCREASING[:4])
+        self.assertTrue(incremental.can_extend(INCREASING))
+        incremental.extend(INCREASING)
+
+        self.assertEqual(incremental.count, 6)
+        self.assertAlmostEqual(incremental.mean, 35.0)
+        self.assertEqual(incremental.generate_compact_summary()["current"], {"value": 60.0, "date": "2024-06-01"})
+
+    def test_cannot_extend_different_history(self):
+        """
+        can_extend should reject observation lists that do not start with the consumed ones
+        """
+        incremental = IncrementalTimeSeriesAnalyzer()
+        incremental.extend(INCREASING[:4])
+
+        self.assertFalse(incremental.can_extend(INCREASING[1:]))
+        self.assertFalse(incremental.can_extend(INCREASING[:3]))
+
+    def test_cannot_extend_revised_history(self):
+        """
+        can_extend should reject a history whose consumed values were revised
+        """
+        incremental = IncrementalTimeSeriesAnalyzer()
+        incremental.extend(INCREASING[:4])
+        revised = [dict(o) for o in INCREASING]
+        revised[1]["value"] = "25"
+
+        self.assertFalse(incremental.can_extend(revised))
+        self.assertTrue(incremental.can_extend([dict(o) for o in INCREASING]))
+
+
+class TestObservationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ObservationStore(path=os.path.join(self.tmpdir.name, "obs.sqlite"))
+        self.fetched = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def fake_fetch(self, start_date, end_date):
+        """record the requested range and return the INCREASING observations inside it"""
+        self.fetched.append((start_date, end_date))
+        return [o for o in INCREASING if start_date <= o["date"] <= end_date], None
+
+    def test_covered_range_served_locally(self):
+        """
+        a second request inside an already fetched range should not call fetch
+        """
+        self.store.get_observations("TEST", "2024-01-01", "2024-06-30", self.fake_fetch, "m")
+        result, error = self.store.get_observations("TEST", "2024-02-01", "2024-04-30", self.fake_fetch, "m")
+
+        self.assertIsNone(error)
+        self.assertEqual(self.fetched, [("2024-01-01", "2024-06-30")])
+        self.assertEqual([o["date"] for o in result], ["2024-02-01", "2024-03-01", "2024-04-01"])
+
+    def test_only_gaps_fetched(self):
+        """
+        a wider request should only fetch the missing head and tail gaps
+        """
+        self.store.get_observations("TEST", "2024-02-01", "2024-04-30", self.fake_fetch, "m")
+        result, _ = self.store.get_observations("TEST", "2024-01-01", "2024-06-30", self.fake_fetch, "m")
+
+        self.assertEqual(self.fetched[1:], [("2024-01-01", "2024-01-31"), ("2024-05-01", "2024-06-30")])
+        self.assertEqual(len(result), 6)
+
+    def test_fetch_error_propagated(self):
+        """
+        fetch errors should be returned and leave the store empty
+        """
+        result, error = self.store.get_observations("TEST", "2024-01-01", "2024-06-30",
+                                                    lambda s, e: (None, "Status 400"), "m")
+
+        self.assertIsNone(result)
+        self.assertEqual(error, "Status 400")
+        self.assertEqual(self.store.missing_ranges("TEST", "2024-01-01", "2024-06-30", "m"),
+                         [("2024-01-01", "2024-06-30")])
+
+    def test_revision_bumped_only_by_rewrites(self):
+        """
+        appending after the held observations should keep the revision, revising or prepending them should bump it
+        """
+        self.store.write("TEST", "2024-02-01", "2024-04-30", INCREASING[1:4], "m")
+        _, revision = self.store.read_held("TEST", "2024-01-01", "2024-06-30", "m")
+
+        self.store.write("TEST", "2024-05-01", "2024-06-30", INCREASING[4:], "m")
+        tail, tail_revision = self.store.read_held("TEST", "2024-01-01", "2024-06-30", "m", after="2024-04-01")
+        self.assertEqual(tail_revision, revision)
+        self.assertEqual([o["date"] for o in tail], ["2024-05-01", "2024-06-01"])
+
+        self.store.write("TEST", "2024-02-01", "2024-04-30", INCREASING[1:4], "m")
+        self.assertEqual(self.store.read_held("TEST", "2024-01-01", "2024-06-30", "m")[1], revision)
+
+        self.store.write("TEST", "2024-03-01", "2024-03-31", [{"date": "2024-03-01", "value": "31"}], "m")
+        self.assertEqual(self.store.read_held("TEST", "2024-01-01", "2024-06-30", "m")[1], revision + 1)
+
+        self.store.write("TEST", "2024-01-01", "2024-01-31", INCREASING[:1], "m")
+        self.assertEqual(self.store.read_held("TEST", "2024-01-01", "2024-06-30", "m")[1], revision + 2)
+
+    def test_connections_closed(self):
+        """
+        every read, write and coverage lookup should close its SQLite connection
+        """
+        connect = sqlite3.connect
+        opened = []
+        def tracking_connect(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            opened.append(conn)
+            return conn
+
+        with mock.patch("observation_store.sqlite3.connect", tracking_connect):
+            self.store.get_observations("TEST", "2024-01-01", "2024-06-30", self.fake_fetch, "m")
+            self.store.get_observations("TEST", "2024-01-01", "2024-03-31", self.fake_fetch, "m")
+
+        self.assertGreater(len(opened), 0)
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class TestIndicatorRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "metadata.json")
+        self._write([{"SERIES": "GDP", "PERIOD": "Q"}])
+        self.registry = IndicatorRegistry(path=self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, indicators, mtime=None):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(indicators, f)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_lookup_by_series_id(self):
+        """
+        registry should support O(1) lookup and membership by series ID
+        """
+        self.assertIn("GDP", self.registry)
+        self.assertNotIn("UNRATE", self.registry)
+        self.assertEqual(self.registry.get("GDP")["PERIOD"], "Q")
+        self.assertIsNone(self.registry.get("UNRATE"))
+
+    def test_reload_on_mtime_change(self):
+        """
+        registry should re-parse the file only after its mtime changes
+        """
+        self.assertEqual(self.registry.series_ids(), {"GDP"})
+        self._write([{"SERIES": "GDP", "PERIOD": "Q"}, {"SERIES": "UNRATE", "PERIOD": "M"}],
+                    mtime=os.path.getmtime(self.path) + 10)
+
+        self.assertEqual(self.registry.series_ids(), {"GDP", "UNRATE"})
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """returns the queued responses in order and counts the requests"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = HttpClient(max_retries=2, backoff_base=0, backoff_max=0)
+
+    def test_retry_on_throttling(self):
+        """
+        429/5xx responses should be retried until a successful response arrives
+        """
+        self.client.session = FakeSession([FakeResponse(429, {"Retry-After": "0"}), FakeResponse(503), FakeResponse(200)])
+        response = self.client.get("https://api.stlouisfed.org/fred/series/observations")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.session.calls, 3)
+
+    def test_no_retry_on_client_error(self):
+        """
+        4xx responses other than 429 should be returned immediately
+        """
+        self.client.session = FakeSession([FakeResponse(400), FakeResponse(200)])
+        response = self.client.get("https://api.stlouisfed.org/fred/series/observations")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.session.calls, 1)
+
+    def test_last_response_returned_when_retries_exhausted(self):
+        """
+        after max_retries the last throttled response should be returned
+        """
+        self.client.session = FakeSession([FakeResponse(429)] * 3)
+        response = self.client.get("https://api.stlouisfed.org/fred/series/observations")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.session.calls, 3)
+
+    def test_discarded_responses_closed(self):
+        """
+        retried responses should be closed so their pooled connections are released
+        """
+        throttled = [FakeResponse(503), FakeResponse(502)]
+        self.client.session = FakeSession(throttled + [FakeResponse(200)])
+        response = self.client.get("https://api.stlouisfed.org/fred/series/observations", stream=True)
+
+        self.assertTrue(all(r.closed for r in throttled))
+        self.assertFalse(response.closed)
+
+    def test_post_retried_only_when_server_did_not_take_it(self):
+        """
+        POSTs should not be retried on a plain 5xx, only on 429 and 503 with Retry-After,
+        unless retry_post is set
+        """
+        self.client.session = FakeSession([FakeResponse(500), FakeResponse(200)])
+        self.assertEqual(self.client.post("http://localhost:11434/api/chat").status_code, 500)
+
+        self.client.session = FakeSession([FakeResponse(429), FakeResponse(503, {"Retry-After": "0"}), FakeResponse(200)])
+        self.assertEqual(self.client.post("http://localhost:11434/api/chat").status_code, 200)
+        self.assertEqual(self.client.session.calls, 3)
+
+        client = HttpClient(max_retries=2, backoff_base=0, backoff_max=0, retry_post=True)
+        client.session = FakeSession([FakeResponse(500), FakeResponse(200)])
+        self.assertEqual(client.post("http://localhost:11434/api/chat").status_code, 200)
+
+
+class FakeAsyncSession:
+    """async counterpart of FakeSession, queued exceptions are raised by send"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def build_request(self, method, url, **kwargs):
+        return (method, url, kwargs)
+
+    async def send(self, request, stream=False):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class TestAsyncHttpClient(unittest.TestCase):
+
+    def _client(self, responses):
+        session = FakeAsyncSession(responses)
+        client = AsyncHttpClient(max_retries=2, backoff_base=0, backoff_max=0,
+                                 session_factory=lambda: session, retry_on=(ConnectionError,))
+        return client, session
+
+    def test_retry_on_throttling_and_connection_errors(self):
+        """
+        429/5xx responses and connection errors should be retried until a successful response arrives
+        """
+        client, session = self._client([ConnectionError(), FakeResponse(503), FakeResponse(200)])
+        response = asyncio.run(client.get("https://api.stlouisfed.org/fred/series/observations"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.calls, 3)
+
+    def test_no_retry_on_client_error(self):
+        """
+        4xx responses other than 429 should be returned immediately
+        """
+        client, session = self._client([FakeResponse(404), FakeResponse(200)])
+        response = asyncio.run(client.get("https://api.stlouisfed.org/fred/series/observations"))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(session.calls, 1)
+
+    def test_connection_error_raised_when_retries_exhausted(self):
+        """
+        after max_retries the connection error should propagate
+        """
+        client, session = self._client([ConnectionError()] * 3)
+        with self.assertRaises(ConnectionError):
+            asyncio.run(client.get("https://api.stlouisfed.org/fred/series/observations"))
+        self.assertEqual(session.calls, 3)
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_normalize_query(self):
+        """
+        normalize_query should lowercase and collapse whitespace
+        """
+        self.assertEqual(normalize_query("  How's   the Job\tmarket? "), "how's the job market?")
+
+    def test_lru_eviction(self):
+        """
+        the least recently used query should be evicted first
+        """
+        cache = QueryCache(maxsize=2)
+        cache.put_embedding("a", np.zeros(3))
+        cache.put_embedding("b", np.ones(3))
+        cache.get_embedding("a")   # "b" is now least recently used
+        cache.put_embedding("c", np.ones(3))
+
+        self.assertIsNotNone(cache.get_embedding("a"))
+        self.assertIsNone(cache.get_embedding("b"))
+
+    def test_results_cleared_but_embeddings_kept(self):
+        """
+        clear_results should drop search results while keeping embeddings
+        """
+        cache = QueryCache()
+        cache.put_embedding("gdp", np.ones(3))
+        cache.put_results("gdp", 5, np.array([0.9]), np.array([1]))
+        cache.clear_results()
+
+        self.assertIsNone(cache.get_results("gdp", 5))
+        self.assertIsNotNone(cache.get_embedding("gdp"))
+
+    def test_persisted_embeddings_reloaded(self):
+        """
+        saved embeddings should be available to a new cache on the same path
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "queries.pkl")
+            cache = QueryCache(path=path)
+            cache.put_embedding("gdp", np.ones(3))
+            cache.save()
+
+            reloaded = QueryCache(path=path)
+            np.testing.assert_array_equal(reloaded.get_embedding("gdp"), np.ones(3))
+
+
+class FakeEncoding:
+    def __init__(self, ids, attention_mask):
+        self.ids = ids
+        self.attention_mask = attention_mask
+
+
+class FakeTokenizer:
+    def encode_batch(self, texts):
+        # second text is padded to the length of the first
+        return [FakeEncoding([1, 2], [1, 1]), FakeEncoding([3, 0], [1, 0])][:len(texts)]
+
+
+class FakeOnnxSession:
+    def run(self, output_names, feeds):
+        # token embeddings: real tokens [3, 4] / [1, 0], the padding token is [100, 100]
+        return [np.array([[[3.0, 4.0], [3.0, 4.0]],
+                          [[1.0, 0.0], [100.0, 100.0]]])]
+
+
+class TestEncoders(unittest.TestCase):
+
+    def test_unknown_backend_rejected(self):
+        """
+        get_encoder should reject unknown backends
+        """
+        with self.assertRaises(ValueError):
+            get_encoder("tensorflow")
+
+    def test_onnx_mean_pooling_ignores_padding(self):
+        """
+        onnx embeddings should be mean-pooled over real tokens and L2-normalized
+        """
+        encoder = OnnxEncoder.__new__(OnnxEncoder)
+        encoder.tokenizer = FakeTokenizer()
+        encoder.session = FakeOnnxSession()
+        encoder.input_names = {"input_ids", "attention_mask"}
+
+        embeddings = encoder.encode(["gdp", "cpi"])
+
+        self.assertEqual(embeddings.dtype, np.float32)
+        np.testing.assert_allclose(embeddings, [[0.6, 0.8], [1.0, 0.0]], rtol=1e-6)
+
+
+class CountingEncoder:
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), 1.0] for t in texts], dtype="float32")
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_only_changed_texts_encoded(self):
+        """
+        unchanged texts should come from the cache, only new or edited ones hit the encoder
+        """
+        fake = CountingEncoder()
+        encoder = CachedEncoder(cache=EmbeddingCache(path=None), encoder=fake)
+        first = encoder.encode(["GDP: Gross Domestic Product", "UNRATE: Unemployment Rate"])
+        second = encoder.encode(["GDP: Gross Domestic Product", "UNRATE: Unemployment Rate, edited"])
+
+        self.assertEqual(fake.encoded, ["GDP: Gross Domestic Product", "UNRATE: Unemployment Rate",
+                                        "UNRATE: Unemployment Rate, edited"])
+        np.testing.assert_array_equal(first[0], second[0])
+        self.assertEqual(second.shape, (2, 2))
+
+    def test_saved_cache_skips_model(self):
+        """
+        a saved cache should serve the same texts without loading an encoder
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "embeddings.pkl")
+            cache = EmbeddingCache(path=path)
+            CachedEncoder(cache=cache, encoder=CountingEncoder()).encode(["cpi"])
+            cache.save()
+
+            # no encoder given: a miss would try to load the "fake" backend and fail
+            reloaded = CachedEncoder(cache=EmbeddingCache(path=path), backend="fake")
+            np.testing.assert_array_equal(reloaded.encode(["cpi"]), [[3.0, 1.0]])
+
+    def test_read_only_encoder_does_not_grow_cache(self):
+        """
+        store=False should serve cached vectors but leave new texts out of the cache
+        """
+        cache = EmbeddingCache(path=None)
+        CachedEncoder(cache=cache, encoder=CountingEncoder()).encode(["cpi"])
+        fake = CountingEncoder()
+        reader = CachedEncoder(cache=cache, encoder=fake, store=False)
+        reader.encode(["cpi", "new user query"])
+        reader.encode(["new user query"])
+
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(fake.encoded, ["new user query", "new user query"])
+
+
+def make_series(series_id, description=""):
+    return {"SERIES": series_id, "INDICATOR": series_id, "CATEGORY": "Test", "SUB-CATEGORY": "Test",
+            "UNITS": "Percent", "PERIOD": "M", "description": description}
+
+
+class TestSeriesIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = CountingEncoder()
+        self.index = SeriesIndex(2)
+        self.index.sync([make_series("GDP"), make_series("UNRATE")], self.encoder)
+        self.encoder.encoded = []
+
+    def test_sync_only_encodes_changes(self):
+        """
+        sync should embed added and edited series only and drop removed ones
+        """
+        changes = self.index.sync([make_series("GDP", "edited"), make_series("CPIAUCSL")], self.encoder)
+
+        self.assertEqual(changes["added"], ["CPIAUCSL"])
+        self.assertEqual(changes["updated"], ["GDP"])
+        self.assertEqual(changes["removed"], ["UNRATE"])
+        self.assertEqual(len(self.encoder.encoded), 2)
+        self.assertEqual(self.index.index.ntotal, 2)
+        self.assertNotIn("UNRATE", self.index)
+
+    def test_search_returns_stable_ids(self):
+        """
+        search should return series ids that map back to the indexed series
+        """
+        _, ids = self.index.search(np.array([[1.0, 0.0]], dtype="float32"), 2)
+
+        self.assertEqual({self.index.series_for_id(i)["SERIES"] for i in ids[0]}, {"GDP", "UNRATE"})
+        self.assertEqual(self.index.entries["GDP"]["id"], series_faiss_id("GDP"))
+
+    def test_add_existing_series_rejected(self):
+        """
+        adding a series that is already indexed should raise
+        """
+        with self.assertRaises(ValueError):
+            self.index.add([make_series("GDP")], np.ones((1, 2), dtype="float32"))
+
+    def test_save_and_load_roundtrip(self):
+        """
+        a saved index should load with the same series and report no changes
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base_path = os.path.join(tmpdir, "series_index")
+            self.index.save(base_path)
+            loaded = SeriesIndex.load(base_path)
+
+        changes = loaded.diff([make_series("GDP"), make_series("UNRATE")])
+        self.assertEqual(sorted(changes["unchanged"]), ["GDP", "UNRATE"])
+        self.assertEqual(loaded.index.ntotal, 2)
+
+    def test_save_switches_generations_via_manifest(self):
+        """
+        a reader holding the previous manifest should still open a matched set after a save,
+        and generations older than the previous one should be deleted
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base_path = os.path.join(tmpdir, "series_index")
+            self.index.save(base_path)
+            old_manifest = read_manifest(base_path)
+            self.index.sync([make_series("GDP"), make_series("UNRATE"), make_series("CPIAUCSL")], self.encoder)
+            self.index.save(base_path)
+
+            old = SeriesIndex._load_generation(generation_base(base_path, old_manifest["generation"]),
+                                               old_manifest, mmap=False)
+            self.assertEqual(sorted(old.entries), ["GDP", "UNRATE"])
+            self.assertEqual(len(SeriesIndex.load(base_path)), 3)
+            _, ids = SeriesIndex.load(base_path, mmap=True).bm25().search("cpiaucsl", 3)
+            self.assertEqual(list(ids), [series_faiss_id("CPIAUCSL")])
+
+            self.index.save(base_path)
+            self.assertEqual(read_manifest(base_path)["generation"], 3)
+            self.assertEqual(sorted(f for f in os.listdir(tmpdir) if f.endswith(".faiss")),
+                             ["series_index.2.faiss", "series_index.3.faiss"])
+
+    def test_save_keeps_unversioned_generation(self):
+        """
+        saves should never delete the unversioned generation 0 files, which are tracked in git
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base_path = os.path.join(tmpdir, "series_index")
+            legacy = [base_path + ".faiss", base_path + "_meta.pkl"]
+            for path in legacy:
+                with open(path, "wb") as f:
+                    f.write(b"legacy")
+
+            for _ in range(3):
+                self.index.save(base_path)
+
+            self.assertEqual(read_manifest(base_path)["generation"], 3)
+            for path in legacy:
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), b"legacy")
+
+    def test_read_only_load_returns_row_views(self):
+        """
+        a memory-mapped load should return SeriesRow views and refuse modifications
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base_path = os.path.join(tmpdir, "series_index")
+            self.index.save(base_path)
+            loaded = SeriesIndex.load(base_path, mmap=True)
+
+            series = loaded.series_for_id(series_faiss_id("UNRATE"), similarity=0.5)
+            self.assertIsInstance(series, SeriesRow)
+            self.assertEqual(series["SERIES"], "UNRATE")
+            self.assertEqual(series["similarity"], 0.5)
+            self.assertIn("GDP", loaded)
+            with self.assertRaises(RuntimeError):
+                loaded.remove(["GDP"])
+            del loaded, series   # release the mapped files before the directory is removed
+
+    def test_backend_or_index_type_change_rebuilds(self):
+        """
+        a different encoder backend or index type should re-embed everything, search params should not
+        """
+        changes = self.index.sync([make_series("GDP"), make_series("UNRATE")], self.encoder, index_type="hnsw")
+
+        self.assertTrue(changes["rebuild"])
+        self.assertEqual(sorted(changes["updated"]), ["GDP", "UNRATE"])
+        self.assertEqual(self.index.index_type, "hnsw")
+        self.assertEqual(self.index.index.ntotal, 2)
+
+        self.assertFalse(self.index.diff([make_series("GDP")], backend="fake", ef_search=128)["rebuild"])
+        self.assertTrue(self.index.diff([make_series("GDP")], backend="onnx")["rebuild"])
+        self.assertTrue(self.index.diff([make_series("GDP")], backend="fake", hnsw_m=16)["rebuild"])
+
+    def test_small_catalog_ivfpq_scaled_or_flat(self):
+        """
+        ivfpq with default parameters should shrink nlist to the catalog and fall back to flat below 2**nbits
+        """
+        rng = np.random.default_rng(0)
+        ivfpq = SeriesIndex(8, index_type="ivfpq", pq_m=2, nbits=4)
+        series = [make_series(f"S{i}") for i in range(100)]
+        ivfpq.add(series, rng.standard_normal((100, 8)))
+
+        self.assertEqual(ivfpq.index_type, "ivfpq")
+        self.assertEqual(ivfpq.index_params["nlist"], 2)
+        self.assertEqual(ivfpq.index.ntotal, 100)
+
+        tiny = SeriesIndex(8, index_type="ivfpq", pq_m=2)
+        tiny.add(series[:10], rng.standard_normal((10, 8)))
+        self.assertEqual(tiny.index_type, "flat")
+        self.assertEqual(tiny.index.ntotal, 10)
+
+    def test_hnsw_remove_rebuilds_graph(self):
+        """
+        removing from an hnsw index should keep the other series searchable
+        """
+        index = SeriesIndex(2, index_type="hnsw", ef_search=16)
+        index.sync([make_series("GDP"), make_series("UNRATE"), make_series("CPIAUCSL")], self.encoder)
+        index.remove(["UNRATE"])
+        _, ids = index.search(np.array([[1.0, 0.0]], dtype="float32"), 3)
+
+        self.assertEqual({index.series_for_id(i)["SERIES"] for i in ids[0] if i >= 0}, {"GDP", "CPIAUCSL"})
+        self.assertEqual(faiss.downcast_index(index.index.index).hnsw.efSearch, 16)
+
+
+class TestMetadataSidecar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.tmpdir.name, "series_index")
+        series = [make_series("UNRATE", "Unemployment ä"), make_series("GDP")]
+        write_sidecar(self.base_path, [20, 10], series, ["unrate text", "gdp text"])
+        self.sidecar = MetadataSidecar(self.base_path)
+
+    def tearDown(self):
+        del self.sidecar
+        self.tmpdir.cleanup()
+
+    def test_rows_found_by_id(self):
+        """
+        rows should be found by faiss id regardless of write order, unknown ids give None
+        """
+        self.assertEqual(self.sidecar.row(self.sidecar.find(20))["SERIES"], "UNRATE")
+        self.assertEqual(self.sidecar.row(self.sidecar.find(10))["SERIES"], "GDP")
+        self.assertIsNone(self.sidecar.find(15))
+
+    def test_row_view_behaves_like_dict(self):
+        """
+        a row view should decode fields on access and copy to a plain dict with extras
+        """
+        row = self.sidecar.row(self.sidecar.find(20), {"similarity": 0.9})
+
+        self.assertEqual(row["description"], "Unemployment ä")
+        self.assertEqual(row.get("missing", "-"), "-")
+        self.assertNotIn("text", row)
+        self.assertEqual(row.copy(), dict(make_series("UNRATE", "Unemployment ä"), similarity=0.9))
+
+
+class TestHybridRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        catalog = [
+            (1, make_series("DGS10", "Market yield on 10-year treasury securities")),
+            (2, make_series("WM2NS", "M2 money stock")),
+            (3, make_series("UNRATE", "Unemployment rate of the labor force")),
+        ]
+        self.bm25 = BM25Index.from_series(catalog)
+        self.retriever = SeriesRetriever.__new__(SeriesRetriever)
+        self.retriever.rrf_k = 60
+
+    def test_tokenize_drops_stopwords(self):
+        """
+        tokenize should lowercase, split on punctuation and drop stopwords
+        """
+        self.assertEqual(tokenize("What's the DGS10 yield?"), ["dgs10", "yield"])
+
+    def test_bm25_matches_ids_and_terms(self):
+        """
+        BM25 should rank exact IDs and description terms, and return nothing for unknown terms
+        """
+        _, ids = self.bm25.search("dgs10", 3)
+        self.assertEqual(ids[0], 1)
+        _, ids = self.bm25.search("How much M2 is there?", 3)
+        self.assertEqual(list(ids), [2])
+        scores, ids = self.bm25.search("weather forecast", 3)
+        self.assertEqual(len(ids), 0)
+
+    def test_saved_postings_search_like_built_index(self):
+        """
+        postings saved with the index should load without the catalog and give the same results
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "series_index_bm25.npz")
+            self.bm25.save(path)
+            loaded = BM25Index.load(path)
+
+        for query in ("dgs10", "How much M2 is there?", "unemployment labor force yield", "weather"):
+            expected, got = self.bm25.search(query, 3), loaded.search(query, 3)
+            np.testing.assert_array_equal(got[1], expected[1])
+            np.testing.assert_allclose(got[0], expected[0])
+
+    def test_rrf_prefers_series_found_by_both(self):
+        """
+        reciprocal-rank fusion should rank a series found by both retrievers first and keep its cosine
+        """
+        dense = (np.array([0.6, 0.5]), np.array([3, 1]))
+        sparse = (np.array([4.0, 2.0]), np.array([1, 2]))
+        ranked = self.retriever._fuse(dense, sparse)
+
+        self.assertEqual(ranked[0], (1, 0.5, "hybrid"))
+        self.assertEqual({faiss_id for faiss_id, _, _ in ranked}, {1, 2, 3})
+        self.assertEqual(dict((i, m) for i, _, m in ranked)[2], "sparse")
+
+    def test_new_queries_stay_in_query_cache(self):
+        """
+        query embeddings should be kept in the bounded query cache, not the shared embedding cache
+        """
+        fake = CountingEncoder()
+        self.retriever.model = CachedEncoder(cache=EmbeddingCache(path=None), encoder=fake, store=False)
+        self.retriever.query_cache = QueryCache(maxsize=1)
+        self.retriever.encode_queries(["Unemployment  rate", "unemployment rate"])
+        self.retriever.encode_queries(["unemployment rate"])
+
+        self.assertEqual(fake.encoded, ["unemployment rate"])
+        self.assertEqual(len(self.retriever.model.cache), 0)
+        self.retriever.encode_queries(["gdp"])
+        self.assertEqual(self.retriever.query_cache.stats()["size"], 1)
+
+
+def make_hit(series_id, similarity, match="dense"):
+    return dict(make_series(series_id), similarity=similarity, match=match)
+
+
+class TestFastPath(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = ("2026-01-01", "2026-03-01")
+        self.valid = {"UNRATE", "UEMPMED", "GDP", "CPIAUCSL"}
+
+    def plan(self, question, results, dates=None):
+        context = RetrievalContext(question, results, len(results))
+        return plan_direct_tool_call(question, context, dates or self.dates, self.valid)
+
+    def test_decisive_single_series(self):
+        """
+        a confident top hit with a clear margin and parsed dates should give a direct tool call
+        """
+        call = self.plan("What's the current unemployment rate?", [make_hit("UNRATE", 0.72), make_hit("UEMPMED", 0.51)])
+
+        self.assertEqual(call["series_id"], "UNRATE")
+        self.assertEqual((call["start_date"], call["end_date"]), self.dates)
+
+    def test_ambiguous_retrieval_goes_to_llm(self):
+        """
+        a small margin between the top hits should leave the decision to the LLM
+        """
+        self.assertIsNone(self.plan("What's the current unemployment rate?",
+                                    [make_hit("UNRATE", 0.62), make_hit("UEMPMED", 0.58)]))
+
+    def test_missing_dates_go_to_llm(self):
+        """
+        without a parsed date range the LLM should decide
+        """
+        self.assertIsNone(self.plan("What's the unemployment rate?", [make_hit("UNRATE", 0.72)], dates=(None, None)))
+
+    def test_comparisons_go_to_llm(self):
+        """
+        comparison questions should never take the fast path
+        """
+        results = [make_hit("GDP", 1.0, "exact"), make_hit("UNRATE", 0.0, "sparse")]
+        self.assertIsNone(self.plan("Compare GDP and unemployment in 2024", results))
+
+    def test_exact_series_id(self):
+        """
+        a single series ID named in the question should be used regardless of similarity margins
+        """
+        call = self.plan("Show me CPIAUCSL in 2024", [make_hit("CPIAUCSL", 1.0, "exact"), make_hit("GDP", 0.0, "sparse")])
+        self.assertEqual(call["series_id"], "CPIAUCSL")
+
+
+class WordEncoder:
+    """normalized bag-of-words vectors over a fixed vocabulary"""
+    name = "words"
+    vocabulary = ["what", "does", "mean", "unemployment", "rate", "gdp", "inflation", "compare", "show"]
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        vectors = np.array([[t.lower().split().count(w) for w in self.vocabulary] for t in texts], dtype="float32")
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+
+
+class TestQueryRouter(unittest.TestCase):
+
+    def setUp(self):
+        questions = [
+            "What does CPI mean", "What does GDP mean", "What does inflation mean",
+            "Show unemployment rate", "Show GDP", "Show inflation rate",
+            "Compare GDP inflation", "Compare unemployment rate inflation",
+        ]
+        routes = ["direct"] * 3 + ["single"] * 3 + ["full"] * 2
+        self.router = QueryRouter(WordEncoder(), questions, routes, k=3, min_confidence={"direct": 0.6, "single": 0.6})
+
+    def test_route_labels(self):
+        """
+        QA annotations should map to direct / single / full
+        """
+        self.assertEqual(route_label({"expected_series_ids": [], "tool_call_required": False}), "direct")
+        self.assertEqual(route_label({"expected_series_ids": ["UNRATE"]}), "single")
+        self.assertEqual(route_label({"expected_series_ids": ["GDP", "UNRATE"]}), "full")
+
+    def test_nearest_questions_vote(self):
+        """
+        questions should take the route of their nearest labelled neighbours
+        """
+        self.assertEqual(self.router.route("What does unemployment mean")["route"], "direct")
+        self.assertEqual(self.router.route("Show unemployment rate")["route"], "single")
+        self.assertEqual(self.router.route("Compare GDP inflation")["route"], "full")
+
+    def test_rules_only_escalate(self):
+        """
+        comparison phrasing or two named series should send a single-series vote to the full pipeline
+        """
+        self.assertEqual(self.router.route("Show GDP and inflation rate")["route"], "full")
+        self.assertEqual(self.router.route("Show GDP UNRATE", valid_series={"GDP", "UNRATE"})["route"], "full")
+
+    def test_low_confidence_falls_back_to_full(self):
+        """
+        a vote below the route threshold should fall back to the full pipeline
+        """
+        self.assertEqual(self.router.route("Show inflation mean")["route"], "single")
+
+        self.router.min_confidence["single"] = 0.8
+        decision = self.router.route("Show inflation mean")
+        self.assertEqual(decision["route"], "full")
+        self.assertTrue(decision["reason"].startswith("low confidence"))
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.fetched = []
+
+    def fetch(self, series_id, start_date, end_date, compact_mode=False):
+        self.fetched.append(series_id)
+        return {"success": True, "series_id": series_id, "compact": compact_mode}
+
+    def test_candidates_need_parsed_window(self):
+        """
+        the top-n retrieved series should be prefetched only when the question has a date range
+        """
+        context = SimpleNamespace(results=[{"SERIES": "UNRATE"}, {"SERIES": "U6RATE"}, {"SERIES": "CPIAUCSL"}])
+
+        self.assertEqual(prefetch_candidates(context, "2020-01-01", "2021-01-01", n=2),
+                         [("UNRATE", "2020-01-01", "2021-01-01"), ("U6RATE", "2020-01-01", "2021-01-01")])
+        self.assertEqual(prefetch_candidates(context, None, None), [])
+        self.assertEqual(prefetch_candidates(context, "2020-01-01", "2021-01-01", n=0), [])
+
+    def test_take_matching_call_once(self):
+        """
+        only a call with the same series, window and fetch options should take the result, once
+        """
+        prefetch = Prefetch().submit(self.fetch, [("UNRATE", "2020-01-01", "2021-01-01")])
+
+        self.assertIsNone(prefetch.take("UNRATE", "2019-01-01", "2021-01-01", False, False))
+        self.assertIsNone(prefetch.take("UNRATE", "2020-01-01", "2021-01-01", True, False))
+        pending = prefetch.take("UNRATE", "2020-01-01", "2021-01-01", False, False)
+        self.assertEqual(pending.result()["series_id"], "UNRATE")
+        self.assertIsNone(prefetch.take("UNRATE", "2020-01-01", "2021-01-01", False, False))
+
+    def test_async_tasks_and_cancel(self):
+        """
+        tasks should run on the event loop, and the ones nobody took should be cancelled
+        """
+        async def afetch(series_id, start_date, end_date, compact_mode=False):
+            await asyncio.sleep(0)
+            return self.fetch(series_id, start_date, end_date, compact_mode)
+
+        async def run():
+            prefetch = Prefetch().create_tasks(afetch, [("GDP", "2020-01-01", "2021-01-01"),
+                                                        ("GDPC1", "2020-01-01", "2021-01-01")])
+            result = await prefetch.take("GDP", "2020-01-01", "2021-01-01", False, False)
+            leftover = prefetch.pending[("GDPC1", "2020-01-01", "2021-01-01")]
+            prefetch.cancel()
+            await asyncio.sleep(0)
+            return result, leftover, prefetch.pending
+
+        result, leftover, pending = asyncio.run(run())
+        self.assertEqual(result["series_id"], "GDP")
+        self.assertTrue(leftover.done())
+        self.assertEqual(pending, {})
+
+    def test_failed_untaken_task_not_reported(self):
+        """
+        a prefetch that failed and was dropped without being taken (e.g. the pipeline raised before
+        cancel) should not log "Task exception was never retrieved"
+        """
+        async def afetch(series_id, start_date, end_date, compact_mode=False):
+            raise ConnectionError("FRED unreachable")
+
+        async def run():
+            errors = []
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            prefetch = Prefetch().create_tasks(afetch, [("GDP", "2020-01-01", "2021-01-01")])
+            await asyncio.sleep(0)
+            del prefetch
+            gc.collect()
+            return errors
+
+        self.assertEqual(asyncio.run(run()), [])
+
+
+def compact_result(series_id, indicator_name, current, low, high):
+    return {
+        "success": True,
+        "series_id": series_id,
+        "indicator_name": indicator_name,
+        "analysis": {
+            "current": {"date": "2024-01-01", "value": current},
+            "extremes": {"max": {"date": "2020-04-01", "value": high}, "min": {"date": "2023-01-01", "value": low}},
+            "trend": "weak stable trend",
+            "total_change_pct": 2.5
+        }
+    }
+
+
+class TestCompleteness(unittest.TestCase):
+
+    def setUp(self):
+        self.results = [
+            compact_result("UNRATE", "Unemployment Rate", 3.7, 3.4, 14.8),
+            compact_result("CPIAUCSL", "Consumer Price Index for All Urban Consumers: All Items in U.S. City Average", 308.4, 258.7, 308.4),
+            compact_result("GDP", "Gross Domestic Product", 27360.9, 19636.7, 27360.9),
+            {"success": False, "series_id": "PAYEMS", "error": "No data"},
+        ]
+
+    def test_complete_answer(self):
+        """
+        every series named with one of its numbers (units rescaled, thousands separators) should be complete
+        """
+        answer = ("Unemployment was 3.7% in January 2024, down from a 14.8% peak. The CPI (CPIAUCSL) reached 308.4, "
+                  "and gross domestic product grew to $27.4 trillion from 19,636.7 billion.")
+        check = check_completeness(answer, self.results)
+
+        self.assertTrue(check["complete"])
+        # whether the question is answered is left to the LLM
+        self.assertIsNone(check["question_addressed"])
+
+    def test_number_needs_its_own_series(self):
+        """
+        one number shared by several series, or a number outside the sentence naming the series, should not count
+        """
+        results = [
+            compact_result("FEDFUNDS", "Federal Funds Effective Rate", 4.33, 0.05, 5.33),
+            compact_result("UNRATE", "Unemployment Rate", 4.3, 3.4, 14.8),
+            compact_result("DGS10", "Market Yield on U.S. Treasury Securities at 10-Year Constant Maturity", 4.3, 0.5, 5.0),
+        ]
+        self.assertIsNone(check_completeness("FEDFUNDS, UNRATE and DGS10 all sit near 4.3 percent.", results))
+        self.assertIsNone(check_completeness("FEDFUNDS fell to 0 in 2020. UNRATE is 4.3%; DGS10 yields 4.3.", results))
+        self.assertIsNone(check_completeness("FEDFUNDS moved. UNRATE is 4.3%; DGS10 yields 4.3. It was 4.33.", results))
+
+        check = check_completeness("FEDFUNDS is at 4.33%. UNRATE is 4.3%; DGS10 yields 4.3.", results)
+        self.assertTrue(check["complete"])
+
+    def test_missing_series(self):
+        """
+        a series neither named nor quoted should be reported missing without the LLM
+        """
+        answer = "Unemployment was 3.7% in January 2024. The CPI (CPIAUCSL) reached 308.4."
+        check = check_completeness(answer, self.results)
+
+        self.assertFalse(check["complete"])
+        self.assertEqual(check["missing_series"], ["GDP"])
+
+    def test_uncertain_falls_back(self):
+        """
+        a series named without any of its numbers should leave the decision to the LLM
+        """
+        answer = "Unemployment was 3.7% in 2024. The CPI (CPIAUCSL) reached 308.4. GDP kept growing."
+        self.assertIsNone(check_completeness(answer, self.results))
+
+
+class TestPromptBudget(unittest.TestCase):
+
+    def setUp(self):
+        # one token per character keeps the arithmetic visible
+        self.counter = TokenCounter(list, "chars")
+        observations = [{"date": f"{2000 + i // 12}-{i % 12 + 1:02d}-01", "value": str(100 + i % 7 + i / 10)}
+                        for i in range(240)]
+        self.detailed = TimeSeriesAnalyzer(observations).generate_summary(compact_mode=False)
+        self.compact = TimeSeriesAnalyzer(observations).generate_summary(compact_mode=True)
+        self.fixed = [{"role": "system", "content": "s" * 100}]
+
+    def tool_results(self, n):
+        return [{"series_id": f"S{i}", "analysis": self.detailed} for i in range(n)]
+
+    def test_compact_from_detailed(self):
+        """
+        the compact level derived from a detailed summary should match the analyzer's compact summary
+        """
+        self.assertEqual(compact_analysis(self.detailed), self.compact)
+        self.assertIs(compact_analysis(self.compact), self.compact)
+
+    def test_fits_without_degrading(self):
+        """
+        results that fit the budget should be sent as they are
+        """
+        _, results, report = fit_prompt(self.fixed, self.tool_results(2), 100000, self.counter)
+
+        self.assertEqual(report["levels"], ["detailed", "detailed"])
+        self.assertIs(results[0]["analysis"], self.detailed)
+        self.assertLessEqual(report["tokens"], 100000)
+
+    def test_degrades_largest_first(self):
+        """
+        the budget should be met by degrading results one level at a time, evenly across series
+        """
+        _, full, full_report = fit_prompt(self.fixed, self.tool_results(3), 100000, self.counter)
+        budget = full_report["tokens"] - 10
+
+        _, results, report = fit_prompt(self.fixed, self.tool_results(3), budget, self.counter)
+        self.assertEqual(sorted(report["levels"]), ["compact", "detailed", "detailed"])
+        self.assertLessEqual(report["tokens"], budget)
+
+        _, results, report = fit_prompt(self.fixed, self.tool_results(3), 300, self.counter)
+        self.assertEqual(report["levels"], ["headline"] * 3)
+        self.assertEqual(set(results[0]["analysis"]), {"current", "trend", "total_change_pct"})
+
+    def test_optional_messages_dropped_before_headline(self):
+        """
+        few-shot examples should be kept while compact results fit, and dropped before going to headlines
+        """
+        few_shot = [{"role": "user", "content": "q" * 300}, {"role": "assistant", "content": "a" * 300}]
+        _, _, compact_report = fit_prompt(self.fixed, self.tool_results(2), 0, self.counter)
+        headline_tokens = compact_report["tokens"]
+
+        kept, _, report = fit_prompt(self.fixed, self.tool_results(2), 100000, self.counter, few_shot)
+        self.assertEqual(kept, few_shot)
+
+        kept, _, report = fit_prompt(self.fixed, self.tool_results(2), headline_tokens + 100, self.counter, few_shot)
+        self.assertEqual(kept, [])
+        self.assertNotIn("detailed", report["levels"])
+
+    def test_missing_tokenizer_warns_once(self):
+        """
+        falling back to the character estimate should print a warning the first time only
+        """
+        output = io.StringIO()
+        with redirect_stdout(output), mock.patch.dict(os.environ, {"FRED_LLAMA_TOKENIZER": "/nonexistent/tokenizer.json"}):
+            counter = get_token_counter("test-model-without-tokenizer")
+            get_token_counter("test-model-without-tokenizer")
+
+        self.assertEqual(counter.name, "estimate")
+        self.assertEqual(counter.count("a" * 8), 2)
+        self.assertEqual(output.getvalue().count("Warning"), 1)
+
+    def test_detailed_analysis_only_for_kept_series(self):
+        """
+        compact results should only be upgraded to their detailed analysis while the prompt fits
+        """
+        compact_results = [{"series_id": f"S{i}", "analysis": self.compact} for i in range(3)]
+        requested = []
+        def detail(i):
+            requested.append(i)
+            return self.detailed
+
+        _, _, compact_report = fit_prompt(self.fixed, compact_results, 100000, self.counter)
+        _, _, one_detailed = fit_prompt(self.fixed, self.tool_results(1), 100000, self.counter)
+        _, _, one_compact = fit_prompt(self.fixed, compact_results[:1], 100000, self.counter)
+        budget = compact_report["tokens"] + one_detailed["tokens"] - one_compact["tokens"]
+
+        _, results, report = fit_prompt(self.fixed, compact_results, budget, self.counter, detail=detail)
+        self.assertEqual(sorted(report["levels"]), ["compact", "compact", "detailed"])
+        self.assertLessEqual(report["tokens"], budget)
+        self.assertEqual(len(requested), 2)
+
+        requested.clear()
+        _, _, report = fit_prompt(self.fixed, compact_results, 100000, self.counter, detail=detail)
+        self.assertEqual(report["levels"], ["detailed"] * 3)
+
+        requested.clear()
+        _, _, report = fit_prompt(self.fixed, compact_results, 300, self.counter, detail=detail)
+        self.assertEqual(report["levels"], ["headline"] * 3)
+        self.assertEqual(requested, [])
+
+
+class TestWireFormat(unittest.TestCase):
+
+    def setUp(self):
+        observations = [{"date": f"{2000 + i // 12}-{i % 12 + 1:02d}-01", "value": str(100 + i % 7 + i / 10)}
+                        for i in range(240)]
+        self.analysis = TimeSeriesAnalyzer(observations).generate_summary(compact_mode=False)
+        self.tool_result = {"series_id": "CPIAUCSL", "indicator": "Consumer Price Index, All Items",
+                            "units": "Index 1982-1984=100", "analysis": self.analysis}
+
+    def test_terse_keeps_every_value(self):
+        """
+        every number and date of the analysis should appear in the terse text, which should be shorter than JSON
+        """
+        terse = format_tool_result(self.tool_result, "terse")
+        tokens = set(re.split(r"[,;=|\n ]", terse))
+
+        for value in _extract_floats_recursive(self.analysis):
+            self.assertIn(str(int(value)) if value == int(value) else str(value), tokens)
+        for date in self.analysis["inflection_points"]["peaks"]["dates"]:
+            self.assertIn(date, tokens)
+        self.assertLess(len(terse), len(format_tool_result(self.tool_result, "json")))
+
+    def test_terse_tables(self):
+        """
+        dated records should become table rows under a schema header, one table per record shape
+        """
+        lines = format_tool_result(self.tool_result, "terse").split("\n")
+
+        self.assertEqual(lines[0], "series_id=CPIAUCSL; indicator=Consumer Price Index, All Items; units=Index 1982-1984=100")
+        header = lines.index("points: name,date,value")
+        latest = self.analysis["overview"]["latest_value"]
+        self.assertEqual(lines[header + 1], f"latest_value,{latest['date']},{latest['value']}")
+        self.assertIn("points: name,date,percentage,from_value,to_value", lines)
+
+    def test_compact_and_errors(self):
+        """
+        compact analyses, error results and the reminder should serialize as well
+        """
+        compact = {"series_id": "GDP", "analysis": compact_analysis(self.analysis), "reminder": "IMPORTANT: analyze ALL"}
+        lines = format_tool_result(compact, "terse").split("\n")
+        self.assertIn("points: name,date,value", lines)
+        self.assertEqual(lines[-1], "IMPORTANT: analyze ALL")
+
+        self.assertEqual(format_tool_result({"error": "No data"}, "terse"), "error=No data")
+        with self.assertRaises(ValueError):
+            format_tool_result(compact, "xml")
+
+
+class FakeStreamResponse:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncStreamResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+
+class PipelineAgent:
+    """agent with a blocking and an async variant of every step, recording which one ran"""
+    def __init__(self):
+        self.ran = []
+
+    def lookup(self, series_id):
+        self.ran.append("lookup")
+        return series_id.lower()
+
+    async def alookup(self, series_id):
+        self.ran.append("alookup")
+        return series_id.lower()
+
+    def plan(self):
+        self.ran.append("plan")
+        return "plan"
+
+    def call_llm(self, messages):
+        return {"message": {"content": messages[-1]["content"].upper()}}
+
+    async def acall_llm(self, messages):
+        return self.call_llm(messages)
+
+    def answer_text(self, result):
+        return result["message"]["content"]
+
+    def stream_llm(self, messages):
+        yield from ["x", "y"]
+
+    async def astream_llm(self, messages):
+        for chunk in ["x", "y"]:
+            yield chunk
+
+    def pipeline(self):
+        series = yield Step("lookup", "GDP")
+        plan = yield Step("plan")
+        yield event("tool_calls", tool_calls=[series])
+        answer = yield Step(GENERATE, [{"role": "user", "content": f"{series} {plan}"}])
+        yield event("result", result={"final_answer": answer})
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_ollama_chunks(self):
+        """
+        content deltas should be yielded in order until the done line, and the response closed
+        """
+        response = FakeStreamResponse([
+            b'{"message": {"content": "Unemployment "}, "done": false}',
+            b'',
+            b'{"message": {"content": "was 4.4%."}, "done": false}',
+            b'{"message": {"content": ""}, "done": true}',
+            b'{"message": {"content": "ignored"}, "done": false}',
+        ])
+        self.assertEqual(list(iter_ollama_chunks(response)), ["Unemployment ", "was 4.4%."])
+        self.assertTrue(response.closed)
+
+    def test_ollama_error_raised(self):
+        """
+        an error line from Ollama should raise instead of ending the answer silently
+        """
+        response = FakeStreamResponse([b'{"error": "model not found"}'])
+        with self.assertRaises(RuntimeError):
+            list(iter_ollama_chunks(response))
+        self.assertTrue(response.closed)
+
+    def test_openai_chunks(self):
+        """
+        empty deltas (role and finish chunks) should be skipped
+        """
+        def chunk(content):
+            return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+        stream = [chunk(None), chunk("GDP "), SimpleNamespace(choices=[]), chunk("grew."), chunk(None)]
+        self.assertEqual(list(iter_openai_chunks(stream)), ["GDP ", "grew."])
+
+    def test_collect_result(self):
+        """
+        the non-streaming result should be the result event at the end of the stream
+        """
+        events = [event("route", route="single"), event("token", content="a"), event("result", result={"success": True})]
+        self.assertEqual(collect_result(iter(events)), {"success": True})
+        with self.assertRaises(RuntimeError):
+            collect_result(iter(events[:2]))
+
+    def test_async_ollama_chunks(self):
+        """
+        the async reader should stop at the done line like the blocking one
+        """
+        response = FakeAsyncStreamResponse([
+            '{"message": {"content": "CPI "}, "done": false}',
+            '',
+            '{"message": {"content": "rose."}, "done": true}',
+            '{"message": {"content": "ignored"}, "done": false}',
+        ])
+
+        async def collect():
+            return [chunk async for chunk in aiter_ollama_chunks(response)]
+
+        self.assertEqual(asyncio.run(collect()), ["CPI ", "rose."])
+
+    def test_run_pipeline(self):
+        """
+        blocking driver: steps call the agent methods, GENERATE returns the answer text
+        or streams it as token events
+        """
+        agent = PipelineAgent()
+        self.assertEqual(collect_result(run_pipeline(agent, agent.pipeline(), False)), {"final_answer": "GDP PLAN"})
+        self.assertEqual(agent.ran, ["lookup", "plan"])
+
+        types = [item["type"] for item in run_pipeline(agent, agent.pipeline(), True)]
+        self.assertEqual(types, ["tool_calls", "token", "token", "result"])
+
+    def test_arun_pipeline(self):
+        """
+        async driver: `a`-prefixed coroutines are preferred, other steps run in a worker thread,
+        and the events match the blocking driver
+        """
+        agent = PipelineAgent()
+        result = asyncio.run(acollect_result(arun_pipeline(agent, agent.pipeline(), False)))
+        self.assertEqual(result, {"final_answer": "GDP PLAN"})
+        self.assertEqual(agent.ran, ["alookup", "plan"])
+
+        async def stream():
+            return [item async for item in arun_pipeline(agent, agent.pipeline(), True)]
+
+        items = asyncio.run(stream())
+        self.assertEqual([item["type"] for item in items], ["tool_calls", "token", "token", "result"])
+        self.assertEqual(items[-1]["result"], {"final_answer": "xy"})
+
+
 class TestAccuracyEvaluator(unittest.TestCase):
 
     def setUp(self):
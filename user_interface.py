@@ -218,8 +218,29 @@ if prompt := st.chat_input("Ask me about economic data..."):
 
     st.session_state.messages.append({"role": "user", "content": prompt})
 
-    with st.spinner("Thinking..."):
-        result = st.session_state.agent.process_question(prompt)
+    # progress and answer tokens are rendered as they arrive
+    status = st.empty()
+    answer_box = st.empty()
+    streamed = ""
+    result = {}
+    status.caption("Thinking...")
+    for event in st.session_state.agent.process_question(prompt, stream=True):
+        if event["type"] == "route":
+            status.caption(f"Route: {event['route']}")
+        elif event["type"] == "tool_calls":
+            series = ", ".join(call["series_id"] for call in event["tool_calls"])
+            status.caption(f"Fetching {series} from FRED...")
+        elif event["type"] == "tool_results":
+            status.caption("Writing the answer...")
+        elif event["type"] == "revision":
+            status.caption("Revising the answer...")
+            streamed = ""
+        elif event["type"] == "token":
+            streamed += event["content"]
+            answer_box.markdown(streamed + "▌")
+        elif event["type"] == "result":
+            result = event["result"]
+    status.empty()
 
     if result.get("success"):
         full_response = result["final_answer"]